@@ -1,13 +1,22 @@
 # __init__.py
+import time
+_import_started = time.perf_counter()
+
 import os
+from dotenv import load_dotenv
+# The one .env load; modules below read their settings at import time
+load_dotenv()
+
 from flask import Flask
 from .db import db
 from .routes import bp as routes_bp
+from . import blobstore, facets, importer, metrics, migrations, responsecache, replicas, search, snapshots, startup
+
+_import_seconds = time.perf_counter() - _import_started
 
-from dotenv import load_dotenv
-load_dotenv()
 
 def create_app():
+    started = time.perf_counter()
     app = Flask(__name__)
 
     database_url = os.getenv("DATABASE_URL")
@@ -20,15 +29,85 @@ def create_app():
     app.config["SECRET_KEY"] = os.getenv("SECRET_KEY", "dev")
 
     # Only add the bind if TIMESCALE_URL is provided (avoid putting None in binds)
+    binds = {}
     timescale_url = os.getenv("TIMESCALE_URL")
     if timescale_url:
-        app.config["SQLALCHEMY_BINDS"] = {"timescale": timescale_url}
+        binds["timescale"] = timescale_url
+    # Read replicas of DATABASE_URL (comma-separated), as binds replica1, replica2, ...
+    replica_urls = [url.strip() for url in os.getenv("READ_REPLICA_URLS", "").split(",") if url.strip()]
+    replica_binds = replicas.replica_binds(replica_urls, int(os.getenv("REPLICA_CONNECT_TIMEOUT", "2")))
+    binds.update(replica_binds)
+    app.config["READ_REPLICA_BINDS"] = list(replica_binds)
+    if binds:
+        app.config["SQLALCHEMY_BINDS"] = binds
 
     # Engine options must be a dict, never None
     app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", {})
 
+    # Catalog-derived caches are rebuilt when ImportMetadata.importedAt advances;
+    # this is how often (seconds) that timestamp is re-checked
+    app.config["CATALOG_VERSION_TTL"] = float(os.getenv("CATALOG_VERSION_TTL", "5"))
+    # /cards/filters snapshot: persist in the FacetSnapshot table / build at startup
+    app.config["FACETS_PERSIST"] = os.getenv("FACETS_PERSIST", "0") == "1"
+    app.config["FACETS_WARMUP"] = os.getenv("FACETS_WARMUP", "0") == "1"
+    # /cards/search: in-process index ("memory") or the database ("pg_trgm")
+    app.config["SEARCH_BACKEND"] = os.getenv("SEARCH_BACKEND", "memory")
+    app.config["SEARCH_WARMUP"] = os.getenv("SEARCH_WARMUP", "0") == "1"
+    # Serve latest prices from an in-process map refreshed every N seconds
+    app.config["PRICE_LATEST_CACHE"] = os.getenv("PRICE_LATEST_CACHE", "0") == "1"
+    app.config["PRICE_LATEST_REFRESH"] = float(os.getenv("PRICE_LATEST_REFRESH", "30"))
+    # Price history without limit= over more than N days reads the daily rollup (0 = always raw)
+    app.config["PRICE_HISTORY_RAW_DAYS"] = float(os.getenv("PRICE_HISTORY_RAW_DAYS", "365"))
+    # How often workers re-check for the timescaledb extension and the price rollups
+    app.config["TIMESCALE_CHECK_INTERVAL"] = float(os.getenv("TIMESCALE_CHECK_INTERVAL", "300"))
+    # Encoded full cards for /cards/<id> and /cards/bulk: memory budget and optional disk tier
+    app.config["CARD_BLOB_CACHE_BYTES"] = int(os.getenv("CARD_BLOB_CACHE_BYTES", str(64 * 1024 * 1024)))
+    app.config["CARD_BLOB_DIR"] = os.getenv("CARD_BLOB_DIR")
+    # /cards/bulk: most distinct IDs per request, and IDs per database round of lookups
+    app.config["BULK_MAX_IDS"] = int(os.getenv("BULK_MAX_IDS", "10000"))
+    app.config["BULK_CHUNK_SIZE"] = int(os.getenv("BULK_CHUNK_SIZE", "500"))
+    # Collection valuations: keep every priced card's daily closes for the last N days
+    # in memory (0 = read the points per request) and re-read today's every N seconds
+    app.config["VALUATION_CACHE_DAYS"] = int(os.getenv("VALUATION_CACHE_DAYS", "90"))
+    app.config["VALUATION_CACHE_REFRESH"] = float(os.getenv("VALUATION_CACHE_REFRESH", "300"))
+    # Most card/variant entries in one collection
+    app.config["COLLECTION_MAX_CARDS"] = int(os.getenv("COLLECTION_MAX_CARDS", "20000"))
+    # Whole-response cache for GET /cards (opt-in): "memory" (per process), "redis" (shared) or "none"
+    app.config["RESPONSE_CACHE_BACKEND"] = os.getenv("RESPONSE_CACHE_BACKEND", "none")
+    app.config["RESPONSE_CACHE_REDIS_URL"] = os.getenv("RESPONSE_CACHE_REDIS_URL")
+    app.config["RESPONSE_CACHE_SIZE"] = int(os.getenv("RESPONSE_CACHE_SIZE", "512"))
+    app.config["RESPONSE_CACHE_TTL"] = float(os.getenv("RESPONSE_CACHE_TTL", "300"))
+    # /cards/<id>/overview: threads for the timescale side, and how long to wait for it
+    app.config["OVERVIEW_WORKERS"] = int(os.getenv("OVERVIEW_WORKERS", "8"))
+    app.config["OVERVIEW_PRICE_TIMEOUT"] = float(os.getenv("OVERVIEW_PRICE_TIMEOUT", "5"))
+    # Per-request query/timing stats (Server-Timing header, /metrics) and slow-query log (0 = off)
+    app.config["METRICS_ENABLED"] = os.getenv("METRICS_ENABLED", "0") == "1"
+    app.config["SLOW_QUERY_MS"] = float(os.getenv("SLOW_QUERY_MS", "0"))
+    # Startup: warm imports/certs/in-memory indexes in create_app (at most this many
+    # seconds), and open this many pooled connections per bind (again after a fork)
+    app.config["STARTUP_WARMUP"] = os.getenv("STARTUP_WARMUP", "0") == "1"
+    app.config["STARTUP_WARMUP_BUDGET"] = float(os.getenv("STARTUP_WARMUP_BUDGET", "30"))
+    app.config["POOL_PREWARM"] = int(os.getenv("POOL_PREWARM", "0"))
+
+    # Read replicas: "round_robin" or "least_connections"; how often each one's health and
+    # catalog version are re-checked, and the most replay lag (seconds, 0 = any) it may have
+    app.config["REPLICA_BALANCE"] = os.getenv("REPLICA_BALANCE", "round_robin")
+    app.config["REPLICA_CHECK_INTERVAL"] = float(os.getenv("REPLICA_CHECK_INTERVAL", "5"))
+    app.config["REPLICA_MAX_LAG"] = float(os.getenv("REPLICA_MAX_LAG", "30"))
+
     db.init_app(app)
+    metrics.init_app(app)
     app.register_blueprint(routes_bp)
+    facets.init_app(app)
+    blobstore.init_app(app)
+    search.init_app(app)
+    responsecache.init_app(app)
+    migrations.init_app(app)
+    importer.init_app(app)
+    snapshots.init_app(app)
+    replicas.init_app(app)
+    metrics.registry.startup["create_app"] = time.perf_counter() - started
+    startup.init_app(app, _import_seconds)
 
     # Avoid create_all() unless you truly need it and ONLY when pointing at Postgres.
     # Your schema already exists, so skip it.
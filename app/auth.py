@@ -1,22 +1,160 @@
+import hashlib
+import json
 import os
+import re
+import threading
+import time
+from collections import OrderedDict
 from flask import request, jsonify, g
-from google.oauth2 import id_token
-from google.auth.transport import requests as grequests
-from dotenv import load_dotenv
-load_dotenv()
+from .metrics import timed
+
+# google-auth (and requests under it) is imported on first use, keeping it off
+# the import path of processes that never verify a token (CLI commands, tests)
 
 GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
+GOOGLE_CERTS_URL = os.getenv("GOOGLE_CERTS_URL", "https://www.googleapis.com/oauth2/v1/certs")
+# Local {kid: PEM certificate} file; when set, Google is never contacted (offline tests/benchmarks)
+GOOGLE_CERTS_FILE = os.getenv("GOOGLE_CERTS_FILE")
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+
+VALID_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+DEFAULT_CERTS_MAX_AGE = 300   # seconds, when the response has no usable Cache-Control
+MIN_CERTS_REFRESH = 60        # seconds between forced refreshes for unknown key ids
+
+
+def _max_age(headers) -> int:
+    match = re.search(r"max-age=(\d+)", headers.get("cache-control", "") or "")
+    return int(match.group(1)) if match else DEFAULT_CERTS_MAX_AGE
+
+
+class CertCache:
+    """Google's signing certificates, refetched only when their Cache-Control max-age runs out."""
+
+    def __init__(self, url=GOOGLE_CERTS_URL, path=GOOGLE_CERTS_FILE):
+        self.url = url
+        self.path = path
+        self._lock = threading.Lock()
+        self._transport = None
+        self._certs = None
+        self._pinned = False
+        self._expires_at = 0.0
+        self._fetched_at = 0.0
+
+    def set_local(self, certs: dict):
+        """Pin a local key set; nothing is fetched afterwards."""
+        with self._lock:
+            self._certs = dict(certs)
+            self._pinned = True
+
+    def _fresh(self, kid) -> bool:
+        if self._certs is None:
+            return False
+        if self._pinned:
+            return True
+        now = time.monotonic()
+        if now >= self._expires_at:
+            return False
+        # An unknown key id means Google rotated keys before our copy expired;
+        # refetch, but at most once a minute so bad tokens can't force fetches
+        return kid is None or kid in self._certs or now - self._fetched_at < MIN_CERTS_REFRESH
+
+    def get(self, kid: str | None = None) -> dict:
+        if self._fresh(kid):
+            return self._certs
+        from google.auth import exceptions as gexceptions
+        with self._lock:
+            if self._fresh(kid):
+                return self._certs
+            try:
+                self._certs, max_age = self._fetch()
+                self._expires_at = time.monotonic() + max_age
+            except gexceptions.TransportError as e:
+                if self._certs is None:
+                    raise
+                # Keep serving the last good key set rather than failing every request
+                print("❌ Certificate refresh failed, using cached keys:", e)
+                self._expires_at = time.monotonic() + MIN_CERTS_REFRESH
+            self._fetched_at = time.monotonic()
+            return self._certs
+
+    def reset_transport(self):
+        """Drop the HTTP session, e.g. in a forked child whose parent owns its sockets."""
+        self._transport = None
+
+    def _fetch(self):
+        if self.path:
+            with open(self.path) as f:
+                return json.load(f), float("inf")
+        from google.auth import exceptions as gexceptions
+        from google.auth.transport import requests as grequests
+        if self._transport is None:
+            # One transport, so the underlying requests.Session keeps its connection alive
+            self._transport = grequests.Request()
+        response = self._transport(self.url, method="GET")
+        if response.status != 200:
+            raise gexceptions.TransportError(f"Could not fetch certificates at {self.url}")
+        return json.loads(response.data.decode("utf-8")), _max_age(response.headers)
+
+
+class VerifiedTokenCache:
+    """Bounded LRU of verified ID tokens, keyed by token hash, each valid until its `exp`."""
+
+    def __init__(self, maxsize=AUTH_TOKEN_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    @staticmethod
+    def key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token: str):
+        key = self.key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, id_info = entry
+            if time.time() >= expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return id_info
+
+    def put(self, token: str, id_info: dict):
+        if self.maxsize <= 0 or "exp" not in id_info:
+            return
+        key = self.key(token)
+        with self._lock:
+            self._entries[key] = (float(id_info["exp"]), id_info)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+certs_cache = CertCache()
+token_cache = VerifiedTokenCache()
+
 
 def verify_google_token(token):
+    cached = token_cache.get(token)
+    if cached is not None:
+        return cached
+    from google.auth import exceptions as gexceptions
+    from google.auth import jwt
     try:
-        id_info = id_token.verify_oauth2_token(
-            token, grequests.Request(), GOOGLE_CLIENT_ID
-        )
-        if id_info['iss'] not in ['accounts.google.com', 'https://accounts.google.com']:
+        kid = jwt.decode_header(token).get("kid")
+        id_info = jwt.decode(token, certs=certs_cache.get(kid), audience=GOOGLE_CLIENT_ID)
+        if id_info['iss'] not in VALID_ISSUERS:
             print("❌ Invalid issuer:", id_info['iss'])
             return None
+        token_cache.put(token, id_info)
         return id_info
-    except ValueError as e:
+    except (ValueError, gexceptions.GoogleAuthError) as e:
         print("❌ Token verification error:", e)
         return None
 
@@ -25,9 +163,10 @@ def require_auth(func):
         auth_header = request.headers.get("Authorization")
         if not auth_header or not auth_header.startswith("Bearer "):
             return jsonify({"error": "Unauthorized"}), 401
-        
+
         token = auth_header.split(" ")[1]
-        user_info = verify_google_token(token)
+        with timed("auth"):
+            user_info = verify_google_token(token)
         if not user_info:
             return jsonify({"error": "Invalid token"}), 401
 
@@ -0,0 +1,215 @@
+# app/blobstore.py
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from datetime import datetime
+import click
+from flask import current_app
+from sqlalchemy import select
+from .catalog import catalog_version
+from .db import db
+from .loaders import card_id_any, card_loader_options, chunked
+from .metrics import timed
+from .models import Card, CardMarket, TcgPlayer
+
+
+def _stamp(updated_at, cardmarket_updated_at, tcgplayer_updated_at) -> str:
+    """Version of a card's full record: its own and its price blocks' updatedAt."""
+    return "|".join(t.isoformat() if t else "" for t in (updated_at, cardmarket_updated_at, tcgplayer_updated_at))
+
+
+def stamp_time(stamp: str):
+    """Newest of the timestamps in a stamp (None if all are empty)."""
+    times = [datetime.fromisoformat(t) for t in stamp.split("|") if t]
+    return max(times) if times else None
+
+
+def _stamp_query(card_ids):
+    return (select(Card.id, Card.updatedAt, CardMarket.updatedAt, TcgPlayer.updatedAt)
+            .select_from(Card)
+            .outerjoin(Card.cardmarket)
+            .outerjoin(Card.tcgplayer)
+            .where(card_id_any(card_ids)))
+
+
+class MemoryTier:
+    """LRU of encoded cards bounded by total bytes."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # card id -> (stamp, catalog version, bytes)
+
+    def get(self, card_id):
+        with self._lock:
+            entry = self._entries.get(card_id)
+            if entry is not None:
+                self._entries.move_to_end(card_id)
+            return entry
+
+    def put(self, card_id, stamp, version, blob: bytes):
+        if len(blob) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(card_id, None)
+            if old is not None:
+                self.size -= len(old[2])
+            self._entries[card_id] = (stamp, version, blob)
+            self.size += len(blob)
+            while self.size > self.max_bytes:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+class DiskTier:
+    """One file per card: the stamp on the first line, the encoded card after it."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, card_id):
+        digest = hashlib.sha1(card_id.encode("utf-8")).hexdigest()
+        return os.path.join(self.root, digest[:2], digest + ".json")
+
+    def get(self, card_id, stamp):
+        try:
+            with open(self._path(card_id), "rb") as f:
+                if f.readline().rstrip(b"\n").decode("utf-8") != stamp:
+                    return None
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, card_id, stamp, blob: bytes):
+        path = self._path(card_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write-then-rename so readers never see a partial file
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "wb") as f:
+            f.write(stamp.encode("utf-8") + b"\n" + blob)
+        os.replace(tmp, path)
+
+
+class CardBlobStore:
+    """Encoded serialize_card_full() output per card ID.
+
+    Entries are valid while the card's stamp (Card/CardMarket/TcgPlayer updatedAt)
+    is unchanged. An entry already confirmed for the current catalog version is
+    served without any query; otherwise one stamp query revalidates it.
+    """
+
+    def __init__(self):
+        self.memory = MemoryTier(0)
+        self.disk = None
+        self.chunk_size = 500
+
+    def configure(self, max_bytes: int, directory: str | None, chunk_size: int = 500):
+        self.memory = MemoryTier(max_bytes)
+        self.disk = DiskTier(directory) if directory else None
+        self.chunk_size = max(1, chunk_size)
+
+    def encode(self, card) -> bytes:
+        # Imported lazily: routes imports this module
+        from .routes import serialize_card_full
+        with timed("serialize"):
+            return current_app.json.dumps(serialize_card_full(card), separators=(",", ":")).encode("utf-8")
+
+    def get_many(self, card_ids) -> dict:
+        """card id -> encoded JSON bytes, for the IDs that exist.
+
+        IDs not already confirmed in memory are revalidated and loaded in chunks
+        of `chunk_size`, so statements and loaded ORM objects stay bounded."""
+        version = catalog_version()
+        found, unchecked = {}, []
+        for card_id in card_ids:
+            entry = self.memory.get(card_id)
+            if entry is not None and entry[1] == version:
+                found[card_id] = entry[2]
+            else:
+                unchecked.append(card_id)
+        for chunk in chunked(unchecked, self.chunk_size):
+            self._load_chunk(chunk, version, found)
+        return found
+
+    def _load_chunk(self, card_ids, version, found):
+        misses = {}
+        for card_id, *times in db.session.execute(_stamp_query(card_ids)):
+            stamp = _stamp(*times)
+            entry = self.memory.get(card_id)
+            blob = entry[2] if entry is not None and entry[0] == stamp else None
+            if blob is None and self.disk is not None:
+                blob = self.disk.get(card_id, stamp)
+            if blob is None:
+                misses[card_id] = stamp
+                continue
+            self.memory.put(card_id, stamp, version, blob)
+            found[card_id] = blob
+
+        if misses:
+            cards = (Card.query
+                     .options(*card_loader_options("full"))
+                     .filter(card_id_any(misses))
+                     .all())
+            for card in cards:
+                found[card.id] = self._store(card, misses[card.id], version)
+
+    def stamp(self, card_id):
+        """The card's current stamp, or None if it doesn't exist. Free for entries
+        already confirmed for this catalog version, one stamp query otherwise."""
+        entry = self.memory.get(card_id)
+        if entry is not None and entry[1] == catalog_version():
+            return entry[0]
+        row = db.session.execute(_stamp_query([card_id])).first()
+        return _stamp(*row[1:]) if row is not None else None
+
+    def _store(self, card, stamp, version) -> bytes:
+        blob = self.encode(card)
+        self.memory.put(card.id, stamp, version, blob)
+        if self.disk is not None:
+            self.disk.put(card.id, stamp, blob)
+        return blob
+
+    def prerender(self, chunk_size: int = 1000) -> int:
+        """Encode every card into the store; returns the number of cards written."""
+        version = catalog_version()
+        q = (select(Card)
+             .options(*card_loader_options("full"))
+             .order_by(Card.id)
+             .execution_options(yield_per=chunk_size))
+        count = 0
+        for chunk in db.session.execute(q).scalars().partitions():
+            for card in chunk:
+                stamp = _stamp(card.updatedAt,
+                               card.cardmarket.updatedAt if card.cardmarket else None,
+                               card.tcgplayer.updatedAt if card.tcgplayer else None)
+                self._store(card, stamp, version)
+                count += 1
+        return count
+
+    def clear(self):
+        self.memory.clear()
+
+
+card_blobs = CardBlobStore()
+
+
+def init_app(app):
+    card_blobs.configure(app.config.get("CARD_BLOB_CACHE_BYTES", 0), app.config.get("CARD_BLOB_DIR"),
+                         app.config.get("BULK_CHUNK_SIZE", 500))
+
+    @app.cli.command("prerender-cards")
+    @click.option("--chunk-size", default=1000, show_default=True, help="Cards per batch.")
+    def prerender_cards(chunk_size):
+        """Encode every card into the CARD_BLOB_DIR store."""
+        if card_blobs.disk is None:
+            raise click.ClickException("CARD_BLOB_DIR is not set; a prerender would only fill this process's memory")
+        count = card_blobs.prerender(chunk_size)
+        click.echo(f"Prerendered {count} cards into {app.config['CARD_BLOB_DIR']}")
@@ -0,0 +1,72 @@
+# app/catalog.py
+import threading
+import time
+from flask import current_app
+from sqlalchemy import func, select
+from .db import db
+from .models import ImportMetadata
+
+# Card content only changes when an import runs, so the newest
+# ImportMetadata.importedAt identifies the catalog version. It is re-read at most
+# every CATALOG_VERSION_TTL seconds so hot paths don't pay a query each time.
+_version_lock = threading.Lock()
+_version = {"value": None, "checked_at": None}
+
+
+def catalog_version():
+    """Newest ImportMetadata.importedAt (None if nothing has been imported)."""
+    ttl = current_app.config.get("CATALOG_VERSION_TTL", 5.0)
+    now = time.monotonic()
+    checked_at = _version["checked_at"]
+    if checked_at is not None and now - checked_at < ttl:
+        return _version["value"]
+
+    with _version_lock:
+        if _version["checked_at"] is not None and now - _version["checked_at"] < ttl:
+            return _version["value"]
+        # Always the primary's, even inside a view routed to a read replica (app/replicas.py)
+        value = db.session.execute(
+            select(func.max(ImportMetadata.importedAt)), bind_arguments={"bind": db.engine}
+        ).scalar()
+        _version["value"] = value
+        _version["checked_at"] = time.monotonic()
+        return value
+
+
+def invalidate_catalog_version():
+    """Force the next catalog_version() call to hit the database."""
+    with _version_lock:
+        _version["checked_at"] = None
+
+
+_UNBUILT = object()
+
+
+class CatalogSnapshot:
+    """A value derived from the catalog, rebuilt when the catalog version advances.
+
+    `build(previous)` receives the last built value (None the first time) so
+    builders can refresh incrementally instead of starting over.
+    """
+
+    def __init__(self, build):
+        self._build = build
+        self._lock = threading.Lock()
+        self.version = _UNBUILT
+        self.value = None
+
+    def get(self):
+        version = catalog_version()
+        if self.version is not _UNBUILT and self.version == version:
+            return self.value
+        with self._lock:
+            # Another thread may have rebuilt while we waited for the lock
+            if self.version is _UNBUILT or self.version != version:
+                self.value = self._build(self.value)
+                self.version = version
+            return self.value
+
+    def clear(self):
+        with self._lock:
+            self.version = _UNBUILT
+            self.value = None
@@ -0,0 +1,63 @@
+# app/conditional.py
+import hashlib
+from datetime import timezone
+from functools import wraps
+from flask import make_response, request
+
+
+def make_etag(*parts) -> str:
+    raw = "\x1f".join("" if p is None else str(p) for p in parts)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+def canonical_args() -> str:
+    """Query string with keys (and repeated values) sorted, so equivalent URLs match."""
+    return "&".join(f"{k}={v}" for k, v in sorted(request.args.items(multi=True)))
+
+
+def _utc(ts):
+    if ts is None:
+        return None
+    # Naive timestamps in the catalog are stored as UTC
+    return ts.replace(tzinfo=timezone.utc) if ts.tzinfo is None else ts
+
+
+def _not_modified(etag, last_modified) -> bool:
+    if request.if_none_match:
+        return etag in request.if_none_match
+    if request.if_modified_since and last_modified is not None:
+        return last_modified.replace(microsecond=0) <= request.if_modified_since
+    return False
+
+
+def _set_validators(response, etag, last_modified):
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    # Responses are per user (auth), and must be revalidated before reuse
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def conditional(validators):
+    """Decorator for GET views: `validators(*args, **kwargs)` returns (etag, last_modified)
+    or None, computed without loading the body. A matching If-None-Match (or, without
+    one, If-Modified-Since) returns 304 before the view runs."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            result = validators(*args, **kwargs)
+            if result is None:
+                return view(*args, **kwargs)
+            etag, last_modified = result
+            last_modified = _utc(last_modified)
+
+            if _not_modified(etag, last_modified):
+                return _set_validators(make_response("", 304), etag, last_modified)
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                _set_validators(response, etag, last_modified)
+            return response
+        return wrapper
+    return decorator
@@ -1,6 +1,24 @@
 # db.py
+from flask import g, has_app_context
 from flask_sqlalchemy import SQLAlchemy
-from dotenv import load_dotenv
-load_dotenv()
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql.dml import UpdateBase
 
-db = SQLAlchemy()
+
+class RoutingSession(Session):
+    """Sends reads meant for the primary to the read replica a view picked
+    (g.db_replica, set by replicas.read_replica). Writes, flushes and explicit
+    binds always go where Flask-SQLAlchemy would send them."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is not None or not has_app_context():
+            return engine
+        replica = g.get("db_replica")
+        if (replica is not None and engine is self._db.engines.get(None)
+                and not self._flushing and not isinstance(clause, UpdateBase)):
+            return replica
+        return engine
+
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
@@ -0,0 +1,37 @@
+# app/downsample.py
+
+
+def lttb(xs, ys, threshold: int) -> list[int]:
+    """Largest-Triangle-Three-Buckets: indices of `threshold` points that keep the
+    visual shape of the series. xs must be increasing; first and last points are kept."""
+    n = len(xs)
+    if threshold >= n:
+        return list(range(n))
+    if threshold < 3:
+        raise ValueError("LTTB needs at least 3 points")
+
+    selected = [0]
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        # Average of the next bucket is the third triangle vertex
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        span = next_end - next_start
+        avg_x = sum(xs[next_start:next_end]) / span
+        avg_y = sum(ys[next_start:next_end]) / span
+
+        # Point of the current bucket forming the largest triangle with a and the average
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        ax, ay = xs[a], ys[a]
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        selected.append(best)
+        a = best
+
+    selected.append(n - 1)
+    return selected
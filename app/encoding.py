@@ -0,0 +1,12 @@
+# app/encoding.py
+from flask import current_app
+
+
+def encode_json(obj) -> bytes:
+    """Encode exactly like jsonify() (sorted keys, compact outside debug, trailing newline)."""
+    return current_app.json.response(obj).get_data()
+
+
+def json_response(body: bytes, status: int = 200):
+    """Response for bytes produced by encode_json()."""
+    return current_app.response_class(body, status=status, mimetype=current_app.json.mimetype)
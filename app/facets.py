@@ -0,0 +1,157 @@
+# app/facets.py
+import time
+from datetime import datetime, timezone
+import click
+from flask import current_app
+from sqlalchemy import distinct, func, select, true
+from sqlalchemy.dialects.postgresql import aggregate_order_by, insert
+from .catalog import CatalogSnapshot, catalog_version
+from .db import db
+from .encoding import encode_json
+from .models import Card, CardMarket, TcgPlayerPrices, CardSet, FacetSnapshot
+
+
+def _min_max(column, name):
+    return func.min(column).label(f"{name}_min"), func.max(column).label(f"{name}_max")
+
+
+def _distinct_sorted(column, *where):
+    """array_agg(DISTINCT col ORDER BY col) as a scalar subquery."""
+    return select(func.array_agg(aggregate_order_by(distinct(column), column))).where(*where).scalar_subquery()
+
+
+def _facets_query():
+    """Every range and category in a single round trip."""
+    # Numeric shadow columns, so "90" < "340" and each min/max is an index probe
+    card = select(*_min_max(Card.hpNum, "hp"),
+                  *_min_max(Card.levelNum, "level"),
+                  *_min_max(Card.numberNum, "number")).subquery()
+    market = select(*_min_max(CardMarket.averageSellPrice, "averageSellPrice"),
+                    *_min_max(CardMarket.trendPrice, "trendPrice"),
+                    *_min_max(CardMarket.lowPrice, "lowPrice")).subquery()
+    tcg = select(*_min_max(TcgPlayerPrices.normalLow, "normalLow"),
+                 *_min_max(TcgPlayerPrices.holofoilLow, "holofoilLow"),
+                 *_min_max(TcgPlayerPrices.reverseHolofoilLow, "reverseHolofoilLow")).subquery()
+
+    # Types are sorted by code point (as Python's sorted() did), hence COLLATE "C"
+    unnested = select(func.unnest(Card.types).label("type")).subquery()
+    type_c = unnested.c.type.collate("C")
+
+    # Three single-row aggregates, joined side by side
+    return select(
+        card, market, tcg,
+        _distinct_sorted(Card.artist, Card.artist.isnot(None), Card.artist != "").label("artists"),
+        _distinct_sorted(Card.rarity, Card.rarity.isnot(None), Card.rarity != "").label("rarities"),
+        _distinct_sorted(Card.supertype, Card.supertype.isnot(None), Card.supertype != "").label("supertypes"),
+        _distinct_sorted(type_c, unnested.c.type.isnot(None)).label("types"),
+        select(func.json_agg(aggregate_order_by(
+            func.json_build_object("id", CardSet.id, "name", CardSet.name), CardSet.id
+        ))).scalar_subquery().label("sets"),
+    ).select_from(card.join(market, true()).join(tcg, true()))
+
+
+def build_facets_payload():
+    row = db.session.execute(_facets_query()).one()._mapping
+
+    def rng(name):
+        return {"min": row[f"{name}_min"], "max": row[f"{name}_max"]}
+
+    return {
+        "ranges": {
+            "hp": rng("hp"),
+            "level": rng("level"),
+            "number": rng("number"),
+            "averageSellPrice": rng("averageSellPrice"),
+            "trendPrice": rng("trendPrice"),
+            "lowPrice": rng("lowPrice"),
+            "tcgplayer": {
+                "normalLow": rng("normalLow"),
+                "holofoilLow": rng("holofoilLow"),
+                "reverseHolofoilLow": rng("reverseHolofoilLow"),
+            }
+        },
+        "categories": {
+            "artists": row["artists"] or [],
+            "rarities": row["rarities"] or [],
+            "supertypes": row["supertypes"] or [],
+            "types": list(row["types"] or []),
+            "sets": row["sets"] or []
+        }
+    }
+
+
+# Part of the FacetSnapshot key; bump when the payload shape changes so
+# snapshots persisted in the old shape are rebuilt
+PAYLOAD_FORMAT = 2
+
+
+def _version_key(version):
+    return f"{version.isoformat() if version else 'none'}/v{PAYLOAD_FORMAT}"
+
+
+def persist_facets() -> str:
+    """Build the payload for the current catalog on the primary and store it in
+    FacetSnapshot (replacing an existing one). Returns its key."""
+    key = _version_key(catalog_version())
+    payload = build_facets_payload()
+    stmt = insert(FacetSnapshot).values(id=key, payload=payload, builtAt=datetime.now(timezone.utc))
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[FacetSnapshot.id],
+        set_={"payload": stmt.excluded.payload, "builtAt": stmt.excluded.builtAt},
+    ))
+    db.session.commit()
+    return key
+
+
+def _entry(payload, recheck_at=None):
+    return {"payload": payload, "body": encode_json(payload), "recheck_at": recheck_at}
+
+
+def _load_or_build(previous):
+    if not current_app.config.get("FACETS_PERSIST"):
+        return _entry(build_facets_payload())
+    # Read only: snapshots are written by the importer and `flask build-facets`
+    key = _version_key(catalog_version())
+    stored = db.session.get(FacetSnapshot, key)
+    if stored is not None:
+        return _entry(stored.payload)
+    # None stored for this version yet (storing it failed, say). Serve the newest
+    # stored one rather than have every worker build the payload, and look for
+    # the current one again after CATALOG_VERSION_TTL seconds.
+    newest = db.session.execute(
+        select(FacetSnapshot.payload)
+        .where(FacetSnapshot.id.endswith(f"/v{PAYLOAD_FORMAT}"))
+        .order_by(FacetSnapshot.builtAt.desc())
+        .limit(1)
+    ).scalar()
+    if newest is None:
+        return _entry(build_facets_payload())
+    current_app.logger.warning("No facet snapshot stored for %s; serving the newest stored one", key)
+    return _entry(newest, time.monotonic() + current_app.config.get("CATALOG_VERSION_TTL", 5.0))
+
+
+# Rebuilt whenever ImportMetadata.importedAt advances
+snapshot = CatalogSnapshot(_load_or_build)
+
+
+def get_facets():
+    """{"payload": dict, "body": pre-encoded JSON bytes} for the current catalog."""
+    facets = snapshot.get()
+    if facets["recheck_at"] is not None and time.monotonic() >= facets["recheck_at"]:
+        snapshot.clear()
+        facets = snapshot.get()
+    return facets
+
+
+def init_app(app):
+    @app.cli.command("build-facets")
+    def build_facets():
+        """Store the /cards/filters snapshot for the current catalog (FACETS_PERSIST)."""
+        click.echo(f"Stored facet snapshot {persist_facets()}")
+
+    if app.config.get("FACETS_WARMUP"):
+        with app.app_context():
+            try:
+                get_facets()
+            except Exception as e:
+                app.logger.warning("Facet warm-up failed: %s", e)
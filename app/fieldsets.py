@@ -0,0 +1,133 @@
+# app/fieldsets.py
+from .loaders import FULL_RELATION_LOADERS
+from .models import (
+    Ability, Attack, CardImages, CardLegalities, CardMarket, CardSet, Resistance,
+    SetLegalities, TcgPlayer, TcgPlayerPrices, Weakness,
+)
+from .projections import BASIC_PROJECTION, FULL_FIELDS
+
+# Top-level keys of the full view (serialize_card_full)
+FULL_KEYS = tuple(key for key, _, _ in FULL_FIELDS) + tuple(FULL_RELATION_LOADERS)
+
+
+def _members(model, *skip, **nested):
+    """Shape of a block serialized from `model`'s columns (minus `skip`), plus nested blocks."""
+    return {**{c.key: True for c in model.__table__.c if c.key not in skip}, **nested}
+
+
+# Shapes of the views: key -> True for a value without selectable parts (scalars,
+# arrays of scalars), or the shape of its nested block (list items for arrays of blocks)
+FULL_SHAPE = {
+    **{key: True for key, _, _ in FULL_FIELDS},
+    "set": _members(CardSet, legalities=_members(SetLegalities, "id", "setId")),
+    "abilities": _members(Ability, "cardId"),
+    "attacks": _members(Attack, "cardId"),
+    "weaknesses": _members(Weakness, "cardId"),
+    "resistances": _members(Resistance, "cardId"),
+    "legalities": _members(CardLegalities, "id", "cardId"),
+    "images": _members(CardImages, "id", "cardId"),
+    "cardmarket": _members(CardMarket, "id", "cardId"),
+    "tcgplayer": _members(TcgPlayer, "id", "cardId", "pricesId", prices=_members(TcgPlayerPrices, "id")),
+}
+_basic_fields, _basic_groups = BASIC_PROJECTION.spec
+BASIC_SHAPE = {
+    **{key: True for key, _, _ in _basic_fields},
+    **{key: {k: True for k, _ in members} for key, _, members in _basic_groups},
+}
+# GET /cards: the basic view plus the full-view keys it lacks
+LIST_SHAPE = {**{k: v for k, v in FULL_SHAPE.items() if k not in BASIC_SHAPE}, **BASIC_SHAPE}
+
+
+def _unknown_paths(tree, shape, prefix=""):
+    unknown = []
+    for key, sub in tree.items():
+        allowed = shape.get(key)
+        if allowed is None:
+            unknown.append(prefix + key)
+        elif sub is not True:
+            if allowed is True:
+                # A path into a value that has no parts, e.g. name.first
+                unknown.extend(f"{prefix}{key}.{k}" for k in sub)
+            else:
+                unknown.extend(_unknown_paths(sub, allowed, f"{prefix}{key}."))
+    return unknown
+
+
+def parse_fieldset(value, shape=None):
+    """`fields=id,name,images.small` -> {"id": True, "name": True, "images": {"small": True}}.
+    None when the parameter is absent. With `shape` (FULL_SHAPE, LIST_SHAPE), every
+    path must exist in it: ValueError for unknown keys and for subpaths of scalars."""
+    if value is None:
+        return None
+    tree = {}
+    for path in value.split(","):
+        parts = [p for p in path.strip().split(".") if p]
+        if not parts:
+            continue
+        node = tree
+        for part in parts[:-1]:
+            if node.get(part) is True:
+                break  # the whole block is already selected
+            node = node.setdefault(part, {})
+        else:
+            node[parts[-1]] = True
+    if not tree:
+        raise ValueError("fields must name at least one field")
+    if shape is not None:
+        unknown = _unknown_paths(tree, shape)
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return tree
+
+
+def parse_include(value, allowed):
+    """`include=attacks,abilities` -> ["attacks", "abilities"] (top-level keys only)."""
+    keys = [k.strip() for k in (value or "").split(",") if k.strip()]
+    unknown = sorted(set(keys) - set(allowed))
+    if unknown:
+        raise ValueError(f"Cannot include: {', '.join(unknown)} (available: {', '.join(allowed)})")
+    return keys
+
+
+def prune(value, tree):
+    """Keep only the parts of a serialized value named by a fieldset tree."""
+    if tree is True or value is None:
+        return value
+    if isinstance(value, list):
+        return [prune(v, tree) for v in value]
+    return {k: prune(value[k], sub) for k, sub in tree.items() if k in value}
+
+
+def list_fieldset(fields, include):
+    """For GET /cards: (row projection, extra full-view keys, fieldset tree).
+
+    Keys of the basic view come from the row projection; `include` and any
+    `fields` outside the basic view (attacks, cardmarket, ...) are loaded per
+    key with sparse_loader_options. The tree is None when the whole of each
+    selected key is wanted."""
+    basic_keys = BASIC_PROJECTION.keys()
+    extra_allowed = [k for k in FULL_KEYS if k not in basic_keys]
+    include = parse_include(include, extra_allowed)
+    tree = parse_fieldset(fields, LIST_SHAPE)
+
+    if tree is None:
+        projection = BASIC_PROJECTION
+        tree = {k: True for k in basic_keys}
+    else:
+        projection = BASIC_PROJECTION.subset({k: v for k, v in tree.items() if k in basic_keys})
+    for key in include:
+        tree[key] = True
+    extra = [k for k in extra_allowed if k in tree]
+    return projection, extra, tree
+
+
+def full_fieldset(fields, include):
+    """For the full view (/cards/<id>, /cards/bulk): (top-level keys, tree), or
+    (None, None) when neither parameter is given."""
+    tree = parse_fieldset(fields, FULL_SHAPE)
+    include = parse_include(include, FULL_KEYS)
+    if tree is None:
+        return None, None
+    for key in include:
+        tree[key] = True
+    return [k for k in FULL_KEYS if k in tree], tree
@@ -0,0 +1,506 @@
+# app/importer.py
+"""Catalog import from pokemontcg.io-style JSON dumps.
+
+`flask import-cards PATH... [--sets sets/en.json] [--full]` streams card records
+from the given files (or directories of them), COPYs each batch into temporary
+staging tables and merges it into the catalog with INSERT ... ON CONFLICT. A
+delta import (the default) skips cards whose source record hashes the same as
+last time (Card.contentHash); --full rewrites every card. Either way a new
+ImportMetadata row is written, which retires the catalog-version caches.
+"""
+import hashlib
+import io
+import json
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+import click
+from flask import current_app
+from .catalog import invalidate_catalog_version
+from .db import db
+from .facets import persist_facets
+from .models import (Ability, Attack, Card, CardImages, CardLegalities, CardMarket, CardSet,
+                     SetLegalities, TcgPlayer, TcgPlayerPrices, Resistance, Weakness)
+from .responsecache import response_cache
+
+DUMP_SUFFIXES = (".json", ".jsonl", ".ndjson")
+TCGPLAYER_VARIANTS = ("normal", "holofoil", "reverseHolofoil")
+TCGPLAYER_KINDS = {"low": "Low", "mid": "Mid", "high": "High", "market": "Market", "directLow": "DirectLow"}
+
+
+def _columns(model, *extra):
+    """Columns the importer writes: everything but generated / trigger-maintained ones."""
+    return [c.name for c in model.__table__.columns
+            if c.computed is None and c.server_default is None] + list(extra)
+
+
+# Staging table -> columns, in merge order
+STAGED = {
+    "CardSet": _columns(CardSet),
+    "SetLegalities": _columns(SetLegalities),
+    "Card": _columns(Card),
+    "Ability": _columns(Ability),
+    "Attack": _columns(Attack),
+    "Weakness": _columns(Weakness),
+    "Resistance": _columns(Resistance),
+    "CardLegalities": _columns(CardLegalities),
+    "CardImages": _columns(CardImages),
+    "CardMarket": _columns(CardMarket),
+    # Prices are matched to an existing TcgPlayer row through the card
+    "TcgPlayerPrices": _columns(TcgPlayerPrices, "cardId"),
+    "TcgPlayer": _columns(TcgPlayer),
+}
+CARD_COLLECTIONS = ("Ability", "Attack", "Weakness", "Resistance")
+CARD_ONE_TO_ONE = ("CardLegalities", "CardImages", "CardMarket")
+
+
+# --- Reading dumps ---
+
+def _iter_array(f, chunk_size=1 << 16):
+    """Elements of a top-level JSON array, decoded one at a time."""
+    decoder = json.JSONDecoder()
+    buf, pos = f.read(chunk_size), 0
+    started = False
+    while True:
+        while True:
+            while pos < len(buf) and (buf[pos].isspace() or (started and buf[pos] == ",")):
+                pos += 1
+            if pos < len(buf):
+                break
+            more = f.read(chunk_size)
+            if not more:
+                raise ValueError("Unexpected end of JSON array")
+            buf, pos = more, 0
+        if not started:
+            if buf[pos] != "[":
+                raise ValueError("Expected a JSON array")
+            started = True
+            pos += 1
+            continue
+        if buf[pos] == "]":
+            return
+        try:
+            value, pos = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            # The element continues past the buffer
+            more = f.read(chunk_size)
+            if not more:
+                raise
+            buf, pos = buf[pos:] + more, 0
+            continue
+        yield value
+
+
+def read_records(path):
+    """Records in one dump file: JSON lines (.jsonl/.ndjson), a JSON array
+    (streamed), or an API response page ({"data": [...]})."""
+    with open(path, encoding="utf-8") as f:
+        if path.endswith((".jsonl", ".ndjson")):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+            return
+        head = f.read(1)
+        while head and head.isspace():
+            head = f.read(1)
+        f.seek(0)
+        if head == "[":
+            yield from _iter_array(f)
+            return
+        document = json.load(f)
+        yield from document["data"] if isinstance(document.get("data"), list) else [document]
+
+
+def dump_files(paths):
+    """Files named by `paths`, expanding directories (sorted, recursively)."""
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.endswith(DUMP_SUFFIXES):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+
+# --- Mapping records onto rows ---
+
+def parse_date(value):
+    """pokemontcg dates ("1999/01/09", "2022/10/10 15:12:00") or ISO 8601, as naive UTC."""
+    if not value:
+        return None
+    for fmt in ("%Y/%m/%d %H:%M:%S", "%Y/%m/%d"):
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            pass
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return parsed.astimezone(timezone.utc).replace(tzinfo=None) if parsed.tzinfo else parsed
+
+
+def content_hash(card: dict) -> str:
+    """Hash of a card record; its set is imported (and compared) separately, see _set_merge."""
+    record = {k: v for k, v in card.items() if k != "set"}
+    return hashlib.sha256(json.dumps(record, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+def set_rows(record: dict) -> dict:
+    legalities = record.get("legalities") or {}
+    images = record.get("images") or {}
+    return {
+        "CardSet": [{
+            "id": record["id"], "name": record.get("name"), "series": record.get("series"),
+            "printedTotal": record.get("printedTotal"), "total": record.get("total"),
+            "ptcgoCode": record.get("ptcgoCode"), "releaseDate": parse_date(record.get("releaseDate")),
+            "updatedAt": parse_date(record.get("updatedAt")),
+            "symbol": images.get("symbol"), "logo": images.get("logo"),
+        }],
+        "SetLegalities": [{
+            "id": f"{record['id']}-legal", "setId": record["id"], "unlimited": legalities.get("unlimited"),
+            "standard": legalities.get("standard"), "expanded": legalities.get("expanded"),
+        }],
+    }
+
+
+def card_rows(record: dict, set_id: str, digest: str, now: datetime) -> dict:
+    """Rows per staged table for one card record."""
+    card_id = record["id"]
+    rows = {table: [] for table in STAGED}
+    rows["Card"].append({
+        "id": card_id, "name": record.get("name"), "supertype": record.get("supertype"),
+        "subtypes": record.get("subtypes"), "level": record.get("level"), "hp": record.get("hp"),
+        "types": record.get("types"), "evolvesFrom": record.get("evolvesFrom"),
+        "evolvesTo": record.get("evolvesTo"), "rules": record.get("rules"),
+        "flavorText": record.get("flavorText"), "artist": record.get("artist"),
+        "rarity": record.get("rarity"), "number": record.get("number"),
+        "nationalPokedexNumbers": record.get("nationalPokedexNumbers"), "setId": set_id,
+        "retreatCost": record.get("retreatCost"), "convertedRetreatCost": record.get("convertedRetreatCost"),
+        "createdAt": now, "updatedAt": now, "contentHash": digest,
+    })
+    for i, ability in enumerate(record.get("abilities") or []):
+        rows["Ability"].append({"id": f"{card_id}-ab{i}", "cardId": card_id, "name": ability.get("name"),
+                                "text": ability.get("text"), "type": ability.get("type")})
+    for i, attack in enumerate(record.get("attacks") or []):
+        rows["Attack"].append({"id": f"{card_id}-at{i}", "cardId": card_id, "name": attack.get("name"),
+                               "cost": attack.get("cost"), "convertedEnergyCost": attack.get("convertedEnergyCost"),
+                               "damage": attack.get("damage"), "text": attack.get("text")})
+    for table, key, prefix in (("Weakness", "weaknesses", "wk"), ("Resistance", "resistances", "rs")):
+        for i, entry in enumerate(record.get(key) or []):
+            rows[table].append({"id": f"{card_id}-{prefix}{i}", "cardId": card_id,
+                                "type": entry.get("type"), "value": entry.get("value")})
+
+    legalities = record.get("legalities")
+    if legalities:
+        rows["CardLegalities"].append({"id": f"{card_id}-legal", "cardId": card_id,
+                                       "unlimited": legalities.get("unlimited"),
+                                       "standard": legalities.get("standard"),
+                                       "expanded": legalities.get("expanded")})
+    images = record.get("images")
+    if images:
+        rows["CardImages"].append({"id": f"{card_id}-img", "cardId": card_id,
+                                   "small": images.get("small"), "large": images.get("large")})
+
+    cardmarket = record.get("cardmarket")
+    if cardmarket:
+        prices = cardmarket.get("prices") or {}
+        row = {"id": f"{card_id}-cm", "cardId": card_id, "url": cardmarket.get("url"),
+               "updatedAt": parse_date(cardmarket.get("updatedAt"))}
+        row.update({c: prices.get(c) for c in STAGED["CardMarket"] if c not in row})
+        rows["CardMarket"].append(row)
+
+    tcgplayer = record.get("tcgplayer")
+    if tcgplayer:
+        prices = tcgplayer.get("prices") or {}
+        prices_id = None
+        if any(variant in prices for variant in TCGPLAYER_VARIANTS):
+            prices_id = f"{card_id}-tp-prices"
+            row = {"id": prices_id, "cardId": card_id}
+            for variant in TCGPLAYER_VARIANTS:
+                for kind, suffix in TCGPLAYER_KINDS.items():
+                    row[variant + suffix] = (prices.get(variant) or {}).get(kind)
+            rows["TcgPlayerPrices"].append(row)
+        rows["TcgPlayer"].append({"id": f"{card_id}-tp", "cardId": card_id, "url": tcgplayer.get("url"),
+                                  "updatedAt": parse_date(tcgplayer.get("updatedAt")), "pricesId": prices_id})
+    return rows
+
+
+# --- Writing ---
+
+def pg_array(values):
+    """Postgres array literal for COPY (None -> NULL, for the array or an element)."""
+    if values is None:
+        return None
+    quoted = ("NULL" if v is None else '"' + str(v).replace("\\", "\\\\").replace('"', '\\"') + '"'
+              for v in values)
+    return "{" + ",".join(quoted) + "}"
+
+
+def _csv_value(value):
+    """One COPY CSV field. Values are always quoted, so a literal \\N in the data
+    can't be read as the (unquoted) NULL marker."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, list):
+        value = pg_array(value)
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+def copy_rows(cursor, table, columns, rows):
+    """COPY `rows` (dicts) into `table`; missing keys are NULL."""
+    buf = io.StringIO()
+    for row in rows:
+        buf.write(",".join(_csv_value(row.get(c)) for c in columns) + "\n")
+    buf.seek(0)
+    cursor.copy_expert(f'COPY "{table}" ({_quoted(columns)}) FROM STDIN WITH (FORMAT csv, NULL \'\\N\')', buf)
+
+
+def _quoted(columns, prefix=""):
+    return ", ".join(f'{prefix}"{c}"' for c in columns)
+
+
+def _upsert(table, conflict, keep=(), compare_skip=()):
+    """Merge a staging table into `table`. Rows identical apart from
+    `compare_skip` are left untouched (no new row version, no triggers)."""
+    columns = STAGED[table]
+    updated = [c for c in columns if c not in ("id", conflict, *keep)]
+    compared = [c for c in updated if c not in compare_skip]
+    target = f'"{table}".'
+    return (
+        f'INSERT INTO "{table}" ({_quoted(columns)}) SELECT {_quoted(columns)} FROM "stage_{table}" '
+        f'ON CONFLICT ("{conflict}") DO UPDATE SET '
+        + ", ".join(f'"{c}" = EXCLUDED."{c}"' for c in updated)
+        + f" WHERE ({_quoted(compared, target)})"
+        + f' IS DISTINCT FROM ({_quoted(compared, "EXCLUDED.")})'
+    )
+
+
+def _set_merge():
+    """Merge the staged sets. Cards of a set whose row or legalities changed get
+    updatedAt = %(now)s: set fields are part of every card's record (blob stamps,
+    ETags, exports since), but not of its contentHash."""
+    return (
+        f'WITH sets AS ({_upsert("CardSet", "id")} RETURNING id), '
+        f'legalities AS ({_upsert("SetLegalities", "setId")} RETURNING "setId") '
+        f'UPDATE "Card" SET "updatedAt" = %(now)s '
+        f'WHERE "setId" IN (SELECT id FROM sets UNION SELECT "setId" FROM legalities)'
+    )
+
+
+def _merge_statements():
+    """SQL run per batch, in order, after the staging tables are filled and the
+    sets merged (_set_merge)."""
+    changed = 'SELECT id FROM "stage_Card"'
+    statements = [
+        # createdAt is kept from the first import; updatedAt only moves when something else changed
+        _upsert("Card", "id", keep=("createdAt",), compare_skip=("updatedAt",)),
+    ]
+    # Collections have no natural key: replace them for every changed card
+    for table in CARD_COLLECTIONS:
+        statements += [
+            f'DELETE FROM "{table}" WHERE "cardId" IN ({changed})',
+            f'INSERT INTO "{table}" ({_quoted(STAGED[table])}) SELECT {_quoted(STAGED[table])} '
+            f'FROM "stage_{table}" ON CONFLICT (id) DO NOTHING',
+        ]
+    # One row per card, matched on cardId so rows written by earlier loaders keep their ids
+    for table in CARD_ONE_TO_ONE:
+        statements.append(
+            f'DELETE FROM "{table}" t WHERE t."cardId" IN ({changed}) '
+            f'AND NOT EXISTS (SELECT 1 FROM "stage_{table}" s WHERE s."cardId" = t."cardId")'
+        )
+    statements += [_upsert(table, "cardId") for table in CARD_ONE_TO_ONE]
+
+    prices = [c for c in STAGED["TcgPlayerPrices"] if c != "cardId"]
+    price_values = [c for c in prices if c != "id"]
+    statements += [
+        # A TcgPlayer block (or just its prices) gone from the record takes its price row along
+        f'WITH gone AS (DELETE FROM "TcgPlayer" t WHERE t."cardId" IN ({changed}) '
+        f'AND NOT EXISTS (SELECT 1 FROM "stage_TcgPlayer" s WHERE s."cardId" = t."cardId") RETURNING t."pricesId") '
+        f'DELETE FROM "TcgPlayerPrices" WHERE id IN (SELECT "pricesId" FROM gone)',
+        f'WITH dropped AS (UPDATE "TcgPlayer" t SET "pricesId" = NULL FROM "TcgPlayer" old, "stage_TcgPlayer" s '
+        f'WHERE old.id = t.id AND s."cardId" = t."cardId" AND s."pricesId" IS NULL AND t."pricesId" IS NOT NULL '
+        f'RETURNING old."pricesId") '
+        f'DELETE FROM "TcgPlayerPrices" WHERE id IN (SELECT "pricesId" FROM dropped)',
+        # Reuse the price row an existing TcgPlayer already points at
+        f'INSERT INTO "TcgPlayerPrices" ({_quoted(prices)}) '
+        f'SELECT COALESCE(t."pricesId", s.id), {_quoted(price_values, "s.")} '
+        f'FROM "stage_TcgPlayerPrices" s LEFT JOIN "TcgPlayer" t ON t."cardId" = s."cardId" '
+        f'ON CONFLICT (id) DO UPDATE SET ' + ", ".join(f'"{c}" = EXCLUDED."{c}"' for c in price_values),
+        f'INSERT INTO "TcgPlayer" ({_quoted(STAGED["TcgPlayer"])}) '
+        f'SELECT {_quoted(STAGED["TcgPlayer"])} FROM "stage_TcgPlayer" '
+        f'ON CONFLICT ("cardId") DO UPDATE SET url = EXCLUDED.url, "updatedAt" = EXCLUDED."updatedAt", '
+        f'"pricesId" = COALESCE("TcgPlayer"."pricesId", EXCLUDED."pricesId")',
+    ]
+    return statements
+
+
+class CatalogImporter:
+    """Buffers mapped rows and merges them in batches through one connection."""
+
+    def __init__(self, connection, full: bool = False, batch_size: int = 2000):
+        self.conn = connection      # raw DBAPI (psycopg2) connection
+        self.full = full
+        self.batch_size = batch_size
+        self.now = datetime.now(timezone.utc).replace(tzinfo=None)
+        self.sets = {}              # set id -> rows, merged with the next batch
+        self.added_sets = set()     # set ids seen in this import
+        self.known_sets = set()     # ... plus ones found in the database
+        self.cards = []             # (record, set id)
+        self.stats = {"read": 0, "written": 0, "unchanged": 0, "sets": 0}
+        self.committed = 0          # batches merged and committed so far
+        self._set_merge = _set_merge()
+        self._merge = _merge_statements()
+        with self.conn.cursor() as cursor:
+            # Same column types as the real tables (varchar[] or text[], ...)
+            for table, columns in STAGED.items():
+                select = ", ".join('NULL::text AS "cardId"' if (table, c) == ("TcgPlayerPrices", "cardId")
+                                   else f'"{c}"' for c in columns)
+                cursor.execute(f'CREATE TEMP TABLE IF NOT EXISTS "stage_{table}" AS '
+                               f'SELECT {select} FROM "{table}" WITH NO DATA')
+
+    def add_set(self, record: dict):
+        """Buffer a set record; only its first occurrence in an import is used."""
+        if record["id"] in self.added_sets:
+            return
+        self.sets[record["id"]] = set_rows(record)
+        self.added_sets.add(record["id"])
+        self.known_sets.add(record["id"])
+
+    def add_card(self, record: dict, set_id: str):
+        self.stats["read"] += 1
+        self.cards.append((record, set_id))
+        if len(self.cards) >= self.batch_size:
+            self.flush()
+
+    def _unchanged(self, cursor, hashes) -> set:
+        if self.full:
+            return set()
+        cursor.execute('SELECT id, "contentHash" FROM "Card" WHERE id = ANY(%s)', (list(hashes),))
+        return {card_id for card_id, digest in cursor.fetchall() if hashes.get(card_id) == digest}
+
+    def _missing_sets(self, cursor, set_ids) -> list:
+        unknown = sorted(set(set_ids) - self.known_sets)
+        if unknown:
+            cursor.execute('SELECT id FROM "CardSet" WHERE id = ANY(%s)', (unknown,))
+            self.known_sets.update(row[0] for row in cursor.fetchall())
+        return sorted(set(unknown) - self.known_sets)
+
+    def flush(self):
+        """Merge the buffered sets and cards in one transaction."""
+        if not self.cards and not self.sets:
+            return
+        with self.conn.cursor() as cursor:
+            # Later records for the same id win, as they would row by row
+            batch = {record["id"]: (record, set_id) for record, set_id in self.cards}
+            hashes = {card_id: content_hash(record) for card_id, (record, _) in batch.items()}
+            unchanged = self._unchanged(cursor, hashes)
+            missing = self._missing_sets(cursor, {set_id for _, set_id in batch.values()})
+            if missing:
+                raise click.ClickException(f"Cards refer to sets that are neither in the dump nor the database: "
+                                           f"{', '.join(missing)} (pass the sets file with --sets)")
+
+            rows = {table: [] for table in STAGED}
+            for set_rows_ in self.sets.values():
+                for table, table_rows in set_rows_.items():
+                    rows[table].extend(table_rows)
+            for card_id, (record, set_id) in batch.items():
+                if card_id in unchanged:
+                    continue
+                for table, table_rows in card_rows(record, set_id, hashes[card_id], self.now).items():
+                    rows[table].extend(table_rows)
+
+            cursor.execute("TRUNCATE " + ", ".join(f'"stage_{table}"' for table in STAGED))
+            for table, table_rows in rows.items():
+                if table_rows:
+                    copy_rows(cursor, f"stage_{table}", STAGED[table], table_rows)
+            cursor.execute(self._set_merge, {"now": self.now})
+            for statement in self._merge:
+                cursor.execute(statement)
+        self.conn.commit()
+        self.committed += 1
+
+        self.stats["written"] += len(batch) - len(unchanged)
+        self.stats["unchanged"] += len(unchanged)
+        self.stats["sets"] = len(self.added_sets)
+        self.sets, self.cards = {}, []
+
+    def finish(self):
+        """Flush the last batch and record the import in ImportMetadata."""
+        self.flush()
+        return self.record()
+
+    def record(self):
+        """Write the ImportMetadata row for what has been merged so far."""
+        with self.conn.cursor() as cursor:
+            cursor.execute('SELECT count(*) FROM "Card"')
+            total = cursor.fetchone()[0]
+            cursor.execute(
+                'INSERT INTO "ImportMetadata" (id, "totalCount", "importedAt", "isFullImport") VALUES (%s, %s, %s, %s)',
+                (str(uuid.uuid4()), total, datetime.now(timezone.utc).replace(tzinfo=None), 1 if self.full else 0),
+            )
+        self.conn.commit()
+        self.stats["total"] = total
+        return self.stats
+
+
+def import_paths(paths, sets_path=None, full=False, batch_size=2000):
+    """Import every card record under `paths`; returns counters.
+
+    Each batch commits on its own. If the import fails after some did, those
+    stay merged, so they are still recorded and the caches below retired."""
+    connection = db.engine.raw_connection()
+    importer = None
+    try:
+        importer = CatalogImporter(connection, full=full, batch_size=batch_size)
+        if sets_path:
+            for record in read_records(sets_path):
+                importer.add_set(record)
+        for path in dump_files(paths):
+            default_set = os.path.splitext(os.path.basename(path))[0]
+            for record in read_records(path):
+                embedded = record.get("set")
+                if embedded and "name" in embedded:
+                    importer.add_set(embedded)
+                importer.add_card(record, (embedded or {}).get("id") or default_set)
+        stats = importer.finish()
+    except Exception:
+        connection.rollback()
+        if importer is None or not importer.committed:
+            raise
+        try:
+            importer.record()
+        except Exception as e:
+            current_app.logger.warning("Could not record the partial import: %s", e)
+        catalog_changed()
+        raise
+    finally:
+        connection.close()
+
+    catalog_changed()
+    return stats
+
+
+def catalog_changed():
+    """Retire everything keyed on the catalog version after an import."""
+    # This process sees the new catalog version at once; other workers within CATALOG_VERSION_TTL
+    invalidate_catalog_version()
+    response_cache.clear()
+    if current_app.config.get("FACETS_PERSIST"):
+        persist_facets()
+
+
+def init_app(app):
+    @app.cli.command("import-cards")
+    @click.argument("paths", nargs=-1, required=True, type=click.Path(exists=True))
+    @click.option("--sets", "sets_path", type=click.Path(exists=True, dir_okay=False),
+                  help="Set records (e.g. sets/en.json) for card files that don't embed their set.")
+    @click.option("--full", is_flag=True, help="Rewrite every card instead of skipping unchanged ones.")
+    @click.option("--batch-size", default=2000, show_default=True, help="Cards per COPY/merge transaction.")
+    def import_cards(paths, sets_path, full, batch_size):
+        """Import pokemontcg-style card dumps (.json arrays, API pages or .jsonl)."""
+        started = time.perf_counter()
+        stats = import_paths(paths, sets_path=sets_path, full=full, batch_size=max(1, batch_size))
+        elapsed = time.perf_counter() - started
+        click.echo(f"Read {stats['read']} cards in {elapsed:.1f}s: {stats['written']} written, "
+                   f"{stats['unchanged']} unchanged, {stats['sets']} sets; catalog now has {stats['total']} cards")
@@ -0,0 +1,57 @@
+# app/loaders.py
+from sqlalchemy import any_, literal
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import joinedload, load_only, selectinload
+from .models import Card, CardSet, TcgPlayer
+
+# Loader options per relationship-backed key of serialize_card_full
+FULL_RELATION_LOADERS = {
+    "set": (joinedload(Card.set).joinedload(CardSet.legalities),),
+    "legalities": (joinedload(Card.legalities),),
+    "images": (joinedload(Card.images),),
+    "cardmarket": (joinedload(Card.cardmarket),),
+    "tcgplayer": (joinedload(Card.tcgplayer).joinedload(TcgPlayer.prices),),
+    "abilities": (selectinload(Card.abilities),),
+    "attacks": (selectinload(Card.attacks),),
+    "weaknesses": (selectinload(Card.weaknesses),),
+    "resistances": (selectinload(Card.resistances),),
+}
+
+# Relationship loading for each serializer. One-to-one / many-to-one relations are
+# joined into the card SELECT; collections are fetched with one batched IN query
+# each, so the number of round trips does not grow with the page size. (The list
+# view has no profile: it is read as rows through projections.BASIC_PROJECTION.)
+LOADER_PROFILES = {
+    # Everything serialize_card_full touches
+    "full": tuple(option for options in FULL_RELATION_LOADERS.values() for option in options),
+}
+
+
+def card_loader_options(profile: str):
+    """Loader options for a named profile ("full")."""
+    try:
+        return LOADER_PROFILES[profile]
+    except KeyError:
+        raise ValueError(f"Unknown loader profile: {profile}") from None
+
+
+def sparse_loader_options(keys):
+    """Options for serialize_card_full(card, keys): only the Card columns among
+    `keys` (other columns are deferred) and only the relationships they name."""
+    columns = [Card.id] + [getattr(Card, k) for k in keys if k != "id" and k in Card.__table__.c]
+    options = [load_only(*columns)]
+    for key in keys:
+        options.extend(FULL_RELATION_LOADERS.get(key, ()))
+    return options
+
+
+def card_id_any(card_ids):
+    """`Card.id = ANY(:ids)`: one array parameter, so the statement text is the
+    same however many IDs are looked up."""
+    return Card.id == any_(literal(list(card_ids), ARRAY(Card.id.type)))
+
+
+def chunked(items, size: int):
+    """Consecutive slices of `items` with at most `size` elements each."""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
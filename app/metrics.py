@@ -0,0 +1,241 @@
+# app/metrics.py
+import logging
+import re
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from flask import Response, g, has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+from .db import db
+
+log = logging.getLogger("app.metrics")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_WS_RE = re.compile(r"\s+")
+_NUMBER_RE = re.compile(r"\b\d+(\.\d+)?\b")
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+# Expanded IN lists render one placeholder per value: %(id_1_1)s, %(id_1_2)s, ...
+_PARAM_LIST_RE = re.compile(r"%\(\w+\)s(?:\s*,\s*%\(\w+\)s)+")
+
+
+def normalize_sql(statement: str) -> str:
+    """One line, literals replaced, expanded IN lists collapsed, so equal shapes group together."""
+    sql = _STRING_RE.sub("?", statement)
+    sql = _PARAM_LIST_RE.sub("?, ...", sql)
+    sql = _NUMBER_RE.sub("?", sql)
+    return _WS_RE.sub(" ", sql).strip()
+
+
+class RequestStats:
+    """What one request spent, collected from engine events and timed() blocks."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.rows = 0
+        self.db_time = 0.0
+        self.binds = {}                     # bind -> [queries, seconds]
+        self.timings = defaultdict(float)   # "serialize", "auth" -> seconds
+        self.active = set()
+
+    def server_timing(self) -> str:
+        total = time.perf_counter() - self.started
+        parts = [f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries, {self.rows} rows"']
+        parts += [f"{name};dur={secs * 1000:.1f}" for name, secs in sorted(self.timings.items())]
+        parts.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(parts)
+
+
+def _stats():
+    return g.get("request_stats") if has_request_context() else None
+
+
+@contextmanager
+def timed(name: str):
+    """Add the block's duration to the current request's `name` timing.
+    Nested blocks with the same name are only counted once."""
+    stats = _stats()
+    if stats is None or name in stats.active:
+        yield
+        return
+    stats.active.add(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.timings[name] += time.perf_counter() - start
+        stats.active.discard(name)
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Same output as the default provider; encoding time counts as "serialize"."""
+
+    def dumps(self, obj, **kwargs):
+        with timed("serialize"):
+            return super().dumps(obj, **kwargs)
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += 1
+        self.sum += value
+
+
+class Registry:
+    """Process-wide aggregates behind /metrics."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latency = defaultdict(Histogram)   # endpoint -> seconds
+        self.requests = defaultdict(int)        # (endpoint, status) -> count
+        self.queries = defaultdict(int)         # (endpoint, bind) -> count
+        self.db_seconds = defaultdict(float)    # (endpoint, bind) -> seconds
+        self.slow_queries = 0
+        self.startup = {}                       # phase -> seconds (app/startup.py)
+
+    def record_request(self, endpoint, status, seconds, bind_stats):
+        with self.lock:
+            self.latency[endpoint].observe(seconds)
+            self.requests[(endpoint, status)] += 1
+            for bind, (count, secs) in bind_stats.items():
+                self.queries[(endpoint, bind)] += count
+                self.db_seconds[(endpoint, bind)] += secs
+
+    def render(self, engines) -> str:
+        lines = []
+
+        def metric(name, kind, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self.lock:
+            metric("http_request_duration_seconds", "histogram", "Request latency by endpoint, including streamed bodies.")
+            for endpoint, h in sorted(self.latency.items()):
+                for bound, count in zip(h.buckets, h.counts):
+                    lines.append(f'http_request_duration_seconds_bucket{{endpoint="{endpoint}",le="{bound}"}} {count}')
+                lines.append(f'http_request_duration_seconds_bucket{{endpoint="{endpoint}",le="+Inf"}} {h.total}')
+                lines.append(f'http_request_duration_seconds_sum{{endpoint="{endpoint}"}} {h.sum:.6f}')
+                lines.append(f'http_request_duration_seconds_count{{endpoint="{endpoint}"}} {h.total}')
+
+            metric("http_requests_total", "counter", "Requests by endpoint and status.")
+            for (endpoint, status), count in sorted(self.requests.items()):
+                lines.append(f'http_requests_total{{endpoint="{endpoint}",status="{status}"}} {count}')
+
+            metric("db_queries_total", "counter", "SQL statements by endpoint and bind.")
+            for (endpoint, bind), count in sorted(self.queries.items()):
+                lines.append(f'db_queries_total{{endpoint="{endpoint}",bind="{bind}"}} {count}')
+
+            metric("db_query_seconds_total", "counter", "Time spent executing SQL by endpoint and bind.")
+            for (endpoint, bind), secs in sorted(self.db_seconds.items()):
+                lines.append(f'db_query_seconds_total{{endpoint="{endpoint}",bind="{bind}"}} {secs:.6f}')
+
+            metric("db_slow_queries_total", "counter", "Statements slower than SLOW_QUERY_MS.")
+            lines.append(f"db_slow_queries_total {self.slow_queries}")
+
+            metric("app_startup_seconds", "gauge", "Time spent in each startup phase of this process.")
+            for phase, secs in self.startup.items():
+                lines.append(f'app_startup_seconds{{phase="{phase}"}} {secs:.6f}')
+
+        gauges = {
+            "db_pool_size": ("size", "Configured pool size."),
+            "db_pool_checked_out": ("checkedout", "Connections currently in use."),
+            "db_pool_checked_in": ("checkedin", "Idle connections in the pool."),
+            "db_pool_overflow": ("overflow", "Connections beyond the pool size."),
+        }
+        for name, (attr, help_text) in gauges.items():
+            metric(name, "gauge", help_text)
+            for bind, engine in sorted(engines.items(), key=lambda kv: kv[0] or ""):
+                probe = getattr(engine.pool, attr, None)
+                if probe is not None:
+                    lines.append(f'{name}{{bind="{bind or "default"}"}} {probe()}')
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+def _install_engine_events(app, bind, engine):
+    slow_seconds = app.config.get("SLOW_QUERY_MS", 0) / 1000.0
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "handle_error")
+    def failed(context):
+        # after_cursor_execute doesn't run for a failed statement: drop its start time
+        execution = context.execution_context
+        started = context.connection.info.get("metrics_started") if context.connection is not None else None
+        if started and execution is not None and getattr(execution, "cursor", None) is not None:
+            started.pop()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["metrics_started"].pop()
+        stats = _stats()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_time += elapsed
+            stats.rows += max(cursor.rowcount, 0)
+            per_bind = stats.binds.setdefault(bind, [0, 0.0])
+            per_bind[0] += 1
+            per_bind[1] += elapsed
+        if slow_seconds and elapsed >= slow_seconds:
+            with registry.lock:
+                registry.slow_queries += 1
+            log.warning("Slow query (%.1f ms, bind=%s, endpoint=%s): %s",
+                        elapsed * 1000, bind, request.endpoint if has_request_context() else None,
+                        normalize_sql(statement))
+
+
+def init_app(app):
+    enabled = app.config.get("METRICS_ENABLED")
+    if not (enabled or app.config.get("SLOW_QUERY_MS")):
+        return
+
+    with app.app_context():
+        for bind, engine in db.engines.items():
+            _install_engine_events(app, bind or "default", engine)
+    if not enabled:
+        return
+
+    app.json = TimedJSONProvider(app)
+
+    @app.before_request
+    def start_request_stats():
+        g.request_stats = RequestStats()
+
+    @app.after_request
+    def add_server_timing(response):
+        stats = _stats()
+        if stats is None or request.endpoint == "metrics":
+            return response
+        # Streamed bodies (/cards/export) run after this point, so the header
+        # covers what happened before the first byte
+        response.headers["Server-Timing"] = stats.server_timing()
+        endpoint, status = request.endpoint or "unmatched", response.status_code
+
+        # Closing the response comes after the last chunk, streamed or not
+        def record():
+            registry.record_request(endpoint, status, time.perf_counter() - stats.started,
+                                    {bind: tuple(v) for bind, v in stats.binds.items()})
+        response.call_on_close(record)
+        return response
+
+    def metrics():
+        """Prometheus text exposition. Unauthenticated: restrict it at the network level."""
+        return Response(registry.render(db.engines), mimetype="text/plain; version=0.0.4")
+
+    app.add_url_rule("/metrics", "metrics", metrics)
@@ -0,0 +1,84 @@
+# app/migrations.py
+"""Plain-SQL schema migrations: migrations/<bind>/NNNN_name.sql, applied in order
+once per database and recorded in "SchemaMigration". "default" is the main
+DATABASE_URL; other directories are named after SQLALCHEMY_BINDS keys."""
+import os
+from datetime import datetime, timezone
+import click
+from .db import db
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations")
+
+_TRACKING_TABLE = (
+    'CREATE TABLE IF NOT EXISTS "SchemaMigration" '
+    '(name text PRIMARY KEY, "appliedAt" timestamptz NOT NULL)'
+)
+
+
+def _engine(bind: str):
+    return db.engines.get(None if bind == "default" else bind)
+
+
+def migration_files(bind: str):
+    """(name, path) for a bind's .sql files, in filename order."""
+    directory = os.path.join(MIGRATIONS_DIR, bind)
+    if not os.path.isdir(directory):
+        return []
+    return [(name, os.path.join(directory, name))
+            for name in sorted(os.listdir(directory)) if name.endswith(".sql")]
+
+
+def pending_migrations(bind: str):
+    engine = _engine(bind)
+    if engine is None:
+        return []
+    with engine.begin() as conn:
+        conn.exec_driver_sql(_TRACKING_TABLE)
+        applied = {row[0] for row in conn.exec_driver_sql('SELECT name FROM "SchemaMigration"')}
+    return [(name, path) for name, path in migration_files(bind) if name not in applied]
+
+
+def apply_migrations(bind: str = "default", dry_run: bool = False):
+    """Apply a bind's pending migrations, each in its own transaction. Returns their names."""
+    pending = pending_migrations(bind)
+    if dry_run:
+        return [name for name, _ in pending]
+    engine = _engine(bind)
+    for name, path in pending:
+        with open(path, encoding="utf-8") as f:
+            sql = f.read()
+        with engine.begin() as conn:
+            # Straight to the DBAPI cursor: no bind-parameter parsing of the file's text
+            cursor = conn.connection.cursor()
+            try:
+                cursor.execute(sql)
+            finally:
+                cursor.close()
+            conn.exec_driver_sql(
+                'INSERT INTO "SchemaMigration" (name, "appliedAt") VALUES (%(name)s, %(at)s)',
+                {"name": name, "at": datetime.now(timezone.utc)},
+            )
+    return [name for name, _ in pending]
+
+
+def migration_binds(app):
+    """Binds that get migrations: all but the read replicas, which follow their primary."""
+    replicas = set(app.config.get("READ_REPLICA_BINDS", ()))
+    return ["default", *(bind for bind in app.config.get("SQLALCHEMY_BINDS", {}) if bind not in replicas)]
+
+
+def init_app(app):
+    @app.cli.command("apply-migrations")
+    @click.option("--bind", "binds", multiple=True,
+                  help="Only this bind (default, timescale, ...); repeatable. Defaults to every configured bind but the read replicas.")
+    @click.option("--dry-run", is_flag=True, help="List pending migrations without applying them.")
+    def apply_migrations_command(binds, dry_run):
+        """Apply pending SQL files from migrations/<bind>/."""
+        for bind in binds or migration_binds(app):
+            if _engine(bind) is None:
+                raise click.ClickException(f"No database configured for bind {bind!r}")
+            names = apply_migrations(bind, dry_run=dry_run)
+            if not names:
+                click.echo(f"{bind}: up to date")
+            else:
+                click.echo(f"{bind}: {'pending' if dry_run else 'applied'} {', '.join(names)}")
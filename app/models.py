@@ -1,8 +1,9 @@
 # app/models.py
 from .db import db
-from sqlalchemy.dialects.postgresql import ARRAY
-from dotenv import load_dotenv
-load_dotenv()
+from sqlalchemy import FetchedValue
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
+from sqlalchemy.orm import deferred
+
 
 class Card(db.Model):
     __tablename__ = "Card"
@@ -27,6 +28,16 @@ class Card(db.Model):
     createdAt = db.Column(db.DateTime)
     updatedAt = db.Column(db.DateTime)
 
+    # Sort/range-filter columns maintained by the database
+    # (migrations/default/0001_card_sort_columns.sql); deferred so ordinary loads skip them
+    hpNum = deferred(db.Column(db.Integer, db.Computed("(substring(hp from '[0-9]{1,9}'))::integer", persisted=True)))
+    levelNum = deferred(db.Column(db.Integer, db.Computed("(substring(level from '[0-9]{1,9}'))::integer", persisted=True)))
+    numberNum = deferred(db.Column(db.Integer, db.Computed("(substring(number from '[0-9]{1,9}'))::integer", persisted=True)))
+    setReleaseDate = deferred(db.Column(db.DateTime, server_default=FetchedValue(), server_onupdate=FetchedValue()))
+    marketPrice = deferred(db.Column(db.Float, server_default=FetchedValue(), server_onupdate=FetchedValue()))
+    # Hash of the source record, so delta imports can skip unchanged cards (app/importer.py)
+    contentHash = deferred(db.Column(db.String))
+
     abilities = db.relationship("Ability", back_populates="card")
     attacks = db.relationship("Attack", back_populates="card")
     weaknesses = db.relationship("Weakness", back_populates="card")
@@ -197,6 +208,36 @@ class ImportMetadata(db.Model):
     importedAt = db.Column(db.DateTime)
     isFullImport = db.Column(db.Integer)  # Boolean stored as integer or use Boolean type if supported
 
+
+class FacetSnapshot(db.Model):
+    __tablename__ = "FacetSnapshot"
+    id = db.Column(db.String, primary_key=True)  # catalog version (ImportMetadata.importedAt)
+    payload = db.Column(JSONB, nullable=False)
+    builtAt = db.Column(db.DateTime)
+
+
+class Collection(db.Model):
+    __tablename__ = "Collection"
+    id = db.Column(db.String, primary_key=True)
+    ownerId = db.Column(db.String, nullable=False, index=True)  # Google `sub`
+    name = db.Column(db.String, nullable=False)
+    createdAt = db.Column(db.DateTime)
+    updatedAt = db.Column(db.DateTime)
+
+    cards = db.relationship("CollectionCard", back_populates="collection",
+                            cascade="all, delete-orphan", passive_deletes=True)
+
+
+class CollectionCard(db.Model):
+    __tablename__ = "CollectionCard"
+    collectionId = db.Column(db.String, db.ForeignKey("Collection.id", ondelete="CASCADE"), primary_key=True)
+    cardId = db.Column(db.String, db.ForeignKey("Card.id"), primary_key=True)
+    variant = db.Column(db.String, primary_key=True, default="normal")
+    quantity = db.Column(db.Integer, nullable=False)
+    addedAt = db.Column(db.DateTime)
+
+    collection = db.relationship("Collection", back_populates="cards")
+
 # app/models.py
 class PriceHistory(db.Model):
     __bind_key__ = "timescale"
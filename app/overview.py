@@ -0,0 +1,64 @@
+# app/overview.py
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from flask import current_app
+from .db import db
+from .prices import latest_prices, lttb_history
+
+_executor = {"pool": None}
+_executor_lock = threading.Lock()
+
+
+def executor() -> ThreadPoolExecutor:
+    # Created on first use, so worker threads are never inherited across a fork
+    if _executor["pool"] is None:
+        with _executor_lock:
+            if _executor["pool"] is None:
+                _executor["pool"] = ThreadPoolExecutor(
+                    max_workers=current_app.config.get("OVERVIEW_WORKERS", 8),
+                    thread_name_prefix="overview",
+                )
+    return _executor["pool"]
+
+
+def submit_in_app_context(fn, *args):
+    """Run fn in the pool under its own app context, so it gets its own scoped
+    session and its own pooled connection for whichever bind it queries."""
+    app = current_app._get_current_object()
+
+    def call():
+        with app.app_context():
+            return fn(*args)
+    return executor().submit(call)
+
+
+def _price_block(card_id, days, points):
+    since = datetime.now(timezone.utc) - timedelta(days=days)
+    return {
+        "latest": latest_prices([card_id]).get(card_id),
+        "history": {
+            "from": since.isoformat(),
+            "days": days,
+            "points": lttb_history(card_id, since, None, points),
+        },
+    }
+
+
+def submit_price_block(card_id, days: int, points: int):
+    """Latest price and recent history from the timescale bind, running in the
+    background; None when no timescale bind is configured."""
+    if "timescale" not in db.engines:
+        return None
+    return submit_in_app_context(_price_block, card_id, days, points)
+
+
+def collect_price_block(future):
+    """The submitted price block, or nulls if the timescale side failed."""
+    if future is None:
+        return {"latest": None, "history": None}
+    try:
+        return future.result(timeout=current_app.config.get("OVERVIEW_PRICE_TIMEOUT", 5.0))
+    except Exception as e:
+        current_app.logger.warning("Overview price lookup failed: %s", e)
+        return {"latest": None, "history": None}
@@ -0,0 +1,94 @@
+# app/pagination.py
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import DateTime, and_, or_
+from .db import db
+from .models import Card
+
+# Allowed sort keys for /cards. Card.id is always appended as the tie-breaker, so
+# every ordering is total and can be resumed from a cursor. All of them are Card
+# columns with (col, id) indexes in both directions, so a page is an index range
+# scan rather than a sort of the whole (joined) catalog: price and releaseDate are
+# copies of CardMarket.averageSellPrice / CardSet.releaseDate kept by triggers.
+SORT_KEYS = {
+    "id": Card.id,
+    "hp": Card.hpNum,
+    "number": Card.numberNum,
+    "price": Card.marketPrice,
+    "releaseDate": Card.setReleaseDate,
+}
+
+COUNT_MODES = ("exact", "estimate", "none")
+
+
+def parse_sort(value: str | None):
+    """Turn `sort=price` / `sort=-price` into (key, column, descending)."""
+    value = (value or "id").strip()
+    descending = value.startswith("-")
+    key = value.lstrip("-")
+    if key not in SORT_KEYS:
+        raise ValueError(f"Invalid sort key: {key}")
+    return key, SORT_KEYS[key], descending
+
+
+def order_clauses(column, descending: bool):
+    """ORDER BY for a sort key: NULLs last in both directions, id as tie-breaker."""
+    if column is Card.id:
+        return [Card.id.desc() if descending else Card.id.asc()]
+    if descending:
+        return [column.desc().nulls_last(), Card.id.desc()]
+    return [column.asc().nulls_last(), Card.id.asc()]
+
+
+def encode_cursor(sort: str, value, card_id: str) -> str:
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([sort, value, card_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str):
+    """Return (value, card_id) from an opaque cursor, or None for the first page."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, value, card_id = json.loads(raw)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor") from None
+    if cursor_sort != sort or not isinstance(card_id, str):
+        raise ValueError("Cursor does not match the requested sort")
+    column = SORT_KEYS[sort]
+    if value is not None and column is not Card.id:
+        try:
+            if isinstance(column.type, DateTime):
+                value = datetime.fromisoformat(value)
+            elif isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError
+        except (TypeError, ValueError):
+            raise ValueError("Invalid cursor") from None
+    return value, card_id
+
+
+def keyset_predicate(column, descending: bool, value, card_id: str):
+    """Rows strictly after (value, card_id) in the order given by order_clauses()."""
+    if column is Card.id:
+        return Card.id < card_id if descending else Card.id > card_id
+    after_id = Card.id < card_id if descending else Card.id > card_id
+    if value is None:
+        # Already inside the trailing NULL block
+        return and_(column.is_(None), after_id)
+    after_value = column < value if descending else column > value
+    return or_(after_value, and_(column == value, after_id), column.is_(None))
+
+
+def estimate_count(statement) -> int:
+    """Planner row estimate for a SELECT, without executing it."""
+    compiled = statement.compile(dialect=db.session.get_bind().dialect)
+    plan = (db.session.connection()
+            .exec_driver_sql("EXPLAIN (FORMAT JSON) " + str(compiled), compiled.params)
+            .scalar())
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
@@ -0,0 +1,374 @@
+# app/prices.py
+import math
+import re
+import threading
+import time as _time
+from datetime import datetime, timedelta, timezone
+from flask import current_app
+from sqlalchemy import Float, String, bindparam, column, func, literal, select, table, text, true, type_coerce
+from sqlalchemy.dialects.postgresql import ARRAY, aggregate_order_by, distinct_on
+from .db import db
+from .downsample import lttb
+from .models import PriceHistory
+
+MAX_POINTS = 10000
+MIN_BUCKET_SECONDS = 60
+
+_UNITS = {"m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+_RESOLUTION_RE = re.compile(r"^(\d+)([mhdw])$")
+
+# Continuous aggregates made by `flask install-price-rollups`, coarsest first
+ROLLUPS = (("PriceHistoryWeekly", 7 * 86400), ("PriceHistoryDaily", 86400))
+# time_bucket's default origin for day/week widths (a Monday)
+BUCKET_ORIGIN = datetime(2000, 1, 3, tzinfo=timezone.utc)
+
+_timescale = {}   # name -> (checked at, value)
+
+
+def _cached_check(name: str, check):
+    """check()'s result, re-run at most every TIMESCALE_CHECK_INTERVAL seconds so
+    every worker notices `flask install-price-rollups` (or a new extension)."""
+    entry = _timescale.get(name)
+    now = _time.monotonic()
+    if entry is None or now - entry[0] >= current_app.config.get("TIMESCALE_CHECK_INTERVAL", 300.0):
+        with db.engines["timescale"].connect() as conn:
+            entry = _timescale[name] = (now, check(conn))
+    return entry[1]
+
+
+def timescale_available() -> bool:
+    """Whether the timescale bind has the timescaledb extension."""
+    return _cached_check("installed", lambda conn: conn.execute(
+        text("SELECT 1 FROM pg_extension WHERE extname = 'timescaledb'")
+    ).first() is not None)
+
+
+def rollups_available() -> set:
+    """Names of the ROLLUPS that exist on the timescale bind."""
+    return _cached_check("rollups", lambda conn: {
+        name for name, _ in ROLLUPS
+        if conn.execute(text("SELECT to_regclass(:name)"), {"name": f'"{name}"'}).scalar()
+    })
+
+
+def daily_rollup():
+    """Name of the daily continuous aggregate when it is installed, else None."""
+    if timescale_available() and "PriceHistoryDaily" in rollups_available():
+        return "PriceHistoryDaily"
+    return None
+
+
+def reset_rollups():
+    """Re-check the rollups on next use (this process; others within TIMESCALE_CHECK_INTERVAL)."""
+    _timescale.pop("rollups", None)
+
+
+def parse_resolution(value: str) -> int:
+    """'15m', '6h', '1d', '1w' -> bucket width in seconds."""
+    match = _RESOLUTION_RE.match(value.strip().lower())
+    if not match or int(match.group(1)) == 0:
+        raise ValueError(f"Invalid resolution: {value}")
+    return int(match.group(1)) * _UNITS[match.group(2)]
+
+
+def _window(card_id, from_ts, to_ts):
+    q = PriceHistory.query.filter(PriceHistory.cardId == card_id)
+    if from_ts:
+        q = q.filter(PriceHistory.time >= from_ts)
+    if to_ts:
+        q = q.filter(PriceHistory.time < to_ts)
+    return q
+
+
+def history_span(card_id, from_ts, to_ts):
+    """(from, to) of the window, open ends filled in with the card's first/last point."""
+    if not (from_ts and to_ts):
+        first, last = (_window(card_id, from_ts, to_ts)
+                       .with_entities(func.min(PriceHistory.time), func.max(PriceHistory.time))
+                       .one())
+        from_ts, to_ts = from_ts or first, to_ts or last
+    return from_ts, to_ts
+
+
+def long_range(card_id, from_ts, to_ts, days: float) -> bool:
+    """Whether the window spans more than `days` days and the daily rollup can serve it."""
+    if days <= 0 or daily_rollup() is None:
+        return False
+    from_ts, to_ts = history_span(card_id, from_ts, to_ts)
+    return bool(from_ts and to_ts) and (to_ts - from_ts).total_seconds() > days * 86400
+
+
+def bucket_width_for(card_id, from_ts, to_ts, points: int):
+    """(width in seconds, origin) giving at most `points` buckets over the window."""
+    from_ts, to_ts = history_span(card_id, from_ts, to_ts)
+    if not (from_ts and to_ts):
+        return MIN_BUCKET_SECONDS, None
+    span = (to_ts - from_ts).total_seconds()
+    # Buckets start at the window start; +1 keeps the newest point inside the last bucket
+    return max(MIN_BUCKET_SECONDS, math.floor(span / points) + 1), from_ts
+
+
+def _aligned(ts, size: int) -> bool:
+    return ts.tzinfo is not None and (ts - BUCKET_ORIGIN).total_seconds() % size == 0
+
+
+def rollup_for(width: int, origin=None, from_ts=None, to_ts=None):
+    """(name, bucket seconds) of a continuous aggregate whose buckets nest exactly
+    in `width`-second buckets over the window, or None."""
+    if not timescale_available():
+        return None
+    available = rollups_available()
+    for name, size in ROLLUPS:
+        if (name in available and width % size == 0
+                and all(_aligned(ts, size) for ts in (origin, from_ts, to_ts) if ts is not None)):
+            return name, size
+    return None
+
+
+def _bucket_rows(result):
+    return [
+        {
+            "time": r.bucket.isoformat(),
+            "open": r.open,
+            "high": r.high,
+            "low": r.low,
+            "close": r.close,
+            "avg": float(r.avg) if r.avg is not None else None,
+            "count": int(r.count),
+        }
+        for r in result
+    ]
+
+
+def _execute_on_timescale(q):
+    """Run a query on the rollup views; they have no model to pick the bind."""
+    return db.session.execute(q, bind_arguments={"bind": db.engines["timescale"]})
+
+
+def _rollup_history(name, card_id, from_ts, to_ts, width, origin, descending, limit):
+    """bucketed_history from a daily/weekly aggregate: its rows are merged into
+    `width`-second buckets instead of scanning every raw point."""
+    rollup = table(name, *(column(c) for c in ("cardId", "bucket", "open", "high", "low", "close", "total", "count")))
+    day = rollup.c.bucket
+    if origin is not None:
+        bucket = func.time_bucket(timedelta(seconds=width), day, origin)
+    else:
+        bucket = func.time_bucket(timedelta(seconds=width), day)
+    bucket = bucket.label("bucket")
+    q = (select(bucket,
+                func.first(rollup.c.open, day).label("open"),
+                func.max(rollup.c.high).label("high"),
+                func.min(rollup.c.low).label("low"),
+                func.last(rollup.c.close, day).label("close"),
+                (func.sum(rollup.c.total) / func.sum(rollup.c.count)).label("avg"),
+                func.sum(rollup.c.count).label("count"))
+         .where(rollup.c.cardId == card_id)
+         .group_by(bucket)
+         .order_by(bucket.desc() if descending else bucket.asc()))
+    if from_ts:
+        q = q.where(day >= from_ts)
+    if to_ts:
+        q = q.where(day < to_ts)
+    if limit:
+        q = q.limit(limit)
+    return _bucket_rows(_execute_on_timescale(q))
+
+
+def bucketed_history(card_id, from_ts, to_ts, width: int, origin=None, descending=False, limit=None):
+    """Open/high/low/close/avg per time bucket, aggregated in the database.
+    Buckets are aligned to `origin` when given, otherwise to the Unix epoch
+    (Timescale: 2000-01-03). Day-or-longer buckets over a day-aligned window are
+    read from the continuous aggregates when they are installed."""
+    rollup = rollup_for(width, origin, from_ts, to_ts)
+    if rollup is not None:
+        return _rollup_history(rollup[0], card_id, from_ts, to_ts, width, origin, descending, limit)
+
+    price, time = PriceHistory.averageSellPrice, PriceHistory.time
+    if timescale_available():
+        if origin is not None:
+            bucket = func.time_bucket(timedelta(seconds=width), time, origin)
+        else:
+            bucket = func.time_bucket(timedelta(seconds=width), time)
+        open_, close = func.first(price, time), func.last(price, time)
+    else:
+        shift = origin.timestamp() if origin is not None else 0
+        epoch = func.extract("epoch", time) - shift
+        bucket = func.to_timestamp(func.floor(epoch / width) * width + shift)
+        open_ = type_coerce(func.array_agg(aggregate_order_by(price, time.asc())), ARRAY(Float))[1]
+        close = type_coerce(func.array_agg(aggregate_order_by(price, time.desc())), ARRAY(Float))[1]
+
+    bucket = bucket.label("bucket")
+    q = (select(bucket,
+                open_.label("open"),
+                func.max(price).label("high"),
+                func.min(price).label("low"),
+                close.label("close"),
+                func.avg(price).label("avg"),
+                func.count().label("count"))
+         .where(PriceHistory.cardId == card_id, price.isnot(None))
+         .group_by(bucket)
+         .order_by(bucket.desc() if descending else bucket.asc()))
+    if from_ts:
+        q = q.where(time >= from_ts)
+    if to_ts:
+        q = q.where(time < to_ts)
+    if limit:
+        q = q.limit(limit)
+
+    return _bucket_rows(db.session.execute(q))
+
+
+def _raw_points(card_id, from_ts, to_ts, descending=False):
+    q = (select(PriceHistory.time, PriceHistory.averageSellPrice, PriceHistory.source)
+         .where(PriceHistory.cardId == card_id, PriceHistory.averageSellPrice.isnot(None))
+         .order_by(PriceHistory.time.desc() if descending else PriceHistory.time.asc()))
+    if from_ts:
+        q = q.where(PriceHistory.time >= from_ts)
+    if to_ts:
+        q = q.where(PriceHistory.time < to_ts)
+    return q
+
+
+def _daily_points(card_id, from_ts, to_ts, descending=False):
+    """Each day's close from the daily rollup, shaped like _raw_points (source "daily").
+    Days are included when they start inside the window."""
+    rollup = table("PriceHistoryDaily", column("cardId"), column("bucket"), column("close"))
+    q = (select(rollup.c.bucket.label("time"), rollup.c.close.label("averageSellPrice"),
+                literal("daily").label("source"))
+         .where(rollup.c.cardId == card_id)
+         .order_by(rollup.c.bucket.desc() if descending else rollup.c.bucket.asc()))
+    if from_ts:
+        q = q.where(rollup.c.bucket >= from_ts)
+    if to_ts:
+        q = q.where(rollup.c.bucket < to_ts)
+    return q
+
+
+def _entries(rows):
+    return [
+        {
+            "time": r.time.isoformat(),
+            "averageSellPrice": r.averageSellPrice,
+            "source": r.source or "unknown",
+        }
+        for r in rows
+    ]
+
+
+def daily_history(card_id, from_ts, to_ts, descending=False, limit=None):
+    """One entry per day (its close) from the daily rollup, in the raw entry shape."""
+    q = _daily_points(card_id, from_ts, to_ts, descending)
+    if limit:
+        q = q.limit(limit)
+    return _entries(_execute_on_timescale(q))
+
+
+def lttb_history(card_id, from_ts, to_ts, points: int, descending=False, limit=None):
+    """Raw points thinned to `points` with LTTB, so peaks and dips survive. When the
+    window spans more days than `points` and the daily rollup is installed, the
+    daily closes are thinned instead of every raw point."""
+    if long_range(card_id, from_ts, to_ts, points):
+        q = _daily_points(card_id, from_ts, to_ts)
+    else:
+        q = _raw_points(card_id, from_ts, to_ts)
+    rows = _execute_on_timescale(q).all()
+
+    keep = lttb([r.time.timestamp() for r in rows], [r.averageSellPrice for r in rows], points)
+    history = _entries(rows[i] for i in keep)
+    if descending:
+        history.reverse()
+    return history[:limit] if limit else history
+
+
+# --- Latest prices ---
+
+def _latest_entry(time, price, source):
+    return {"time": time.isoformat(), "averageSellPrice": price, "source": source or "unknown"}
+
+
+def query_latest_prices(card_ids) -> dict:
+    """cardId -> newest PriceHistory entry, one LATERAL index probe per ID in a single query."""
+    ids = (func.unnest(bindparam("ids", list(card_ids), type_=ARRAY(String)))
+           .table_valued("id")
+           .render_derived(name="ids"))
+    latest = (select(PriceHistory.time, PriceHistory.averageSellPrice, PriceHistory.source)
+              .where(PriceHistory.cardId == ids.c.id)
+              .order_by(PriceHistory.time.desc())
+              .limit(1)
+              .lateral("latest"))
+    rows = db.session.execute(
+        select(ids.c.id, latest.c.time, latest.c.averageSellPrice, latest.c.source)
+        .select_from(ids)
+        .join(latest, true())
+    )
+    return {r.id: _latest_entry(r.time, r.averageSellPrice, r.source) for r in rows}
+
+
+class LatestPriceMap:
+    """Process-wide cardId -> latest price, refreshed incrementally from the newest
+    PriceHistory.time so lookups between refreshes never touch the database.
+
+    Each refresh re-reads the rows at the newest time seen, since more of them
+    can commit later (another snapshot batch or source with the same time);
+    reading a card's entry again just replaces it with the same value. Rows
+    written with an older time are only picked up by a full reload (clear())."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.prices = {}
+        self.watermark = None
+        self.refreshed_at = None
+
+    def _newer_rows(self):
+        q = (select(PriceHistory.cardId, PriceHistory.time, PriceHistory.averageSellPrice, PriceHistory.source)
+             .ext(distinct_on(PriceHistory.cardId))
+             .order_by(PriceHistory.cardId, PriceHistory.time.desc()))
+        if self.watermark is not None:
+            q = q.where(PriceHistory.time >= self.watermark)
+        return db.session.execute(q)
+
+    def refresh(self, max_age: float = 0.0):
+        now = _time.monotonic()
+        if self.refreshed_at is not None and now - self.refreshed_at < max_age:
+            return
+        with self._lock:
+            if self.refreshed_at is not None and _time.monotonic() - self.refreshed_at < max_age:
+                return
+            watermark = self.watermark
+            for r in self._newer_rows():
+                self.prices[r.cardId] = _latest_entry(r.time, r.averageSellPrice, r.source)
+                if watermark is None or r.time > watermark:
+                    watermark = r.time
+            self.watermark = watermark
+            self.refreshed_at = _time.monotonic()
+
+    def get_many(self, card_ids) -> dict:
+        self.refresh(current_app.config.get("PRICE_LATEST_REFRESH", 30.0))
+        prices = self.prices
+        return {card_id: prices[card_id] for card_id in card_ids if card_id in prices}
+
+    def clear(self):
+        with self._lock:
+            self.prices = {}
+            self.watermark = None
+            self.refreshed_at = None
+
+
+latest_price_map = LatestPriceMap()
+
+
+def latest_prices(card_ids) -> dict:
+    """cardId -> latest entry, from the in-memory map when PRICE_LATEST_CACHE is on."""
+    if current_app.config.get("PRICE_LATEST_CACHE"):
+        return latest_price_map.get_many(card_ids)
+    return query_latest_prices(card_ids)
+
+
+def newest_price_time(card_id):
+    """Time of the card's newest PriceHistory row (None without history)."""
+    if current_app.config.get("PRICE_LATEST_CACHE"):
+        entry = latest_price_map.get_many([card_id]).get(card_id)
+        return datetime.fromisoformat(entry["time"]) if entry else None
+    return db.session.execute(
+        select(func.max(PriceHistory.time)).where(PriceHistory.cardId == card_id)
+    ).scalar()
@@ -0,0 +1,159 @@
+# app/projections.py
+from sqlalchemy import select
+from sqlalchemy.sql.util import find_tables
+from .models import Card, CardSet, CardMarket, TcgPlayer, TcgPlayerPrices, CardImages
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+def _list(value):
+    return value or []
+
+
+# Top-level fields of the basic view: (response key, column, transform)
+BASIC_FIELDS = (
+    ("id", Card.id, None),
+    ("name", Card.name, None),
+    ("supertype", Card.supertype, None),
+    ("subtypes", Card.subtypes, _list),
+    ("level", Card.level, None),
+    ("hp", Card.hp, None),
+    ("types", Card.types, _list),
+    ("rarity", Card.rarity, None),
+    ("artist", Card.artist, None),
+    ("number", Card.number, None),
+    ("nationalPokedexNumbers", Card.nationalPokedexNumbers, _list),
+    ("retreatCost", Card.retreatCost, _list),
+    ("createdAt", Card.createdAt, _iso),
+)
+
+# Scalar fields of the full view (serialize_card_full); its relationship blocks
+# are loaded per key through loaders.FULL_RELATION_LOADERS
+FULL_FIELDS = (
+    ("id", Card.id, None),
+    ("name", Card.name, None),
+    ("supertype", Card.supertype, None),
+    ("subtypes", Card.subtypes, _list),
+    ("level", Card.level, None),
+    ("hp", Card.hp, None),
+    ("types", Card.types, _list),
+    ("evolvesFrom", Card.evolvesFrom, None),
+    ("evolvesTo", Card.evolvesTo, _list),
+    ("rules", Card.rules, _list),
+    ("flavorText", Card.flavorText, None),
+    ("artist", Card.artist, None),
+    ("rarity", Card.rarity, None),
+    ("number", Card.number, None),
+    ("nationalPokedexNumbers", Card.nationalPokedexNumbers, _list),
+    ("retreatCost", Card.retreatCost, _list),
+    ("convertedRetreatCost", Card.convertedRetreatCost, None),
+    ("createdAt", Card.createdAt, _iso),
+    ("updatedAt", Card.updatedAt, _iso),
+)
+
+# Nested blocks of the basic view: (response key, presence column, ((key, column), ...)).
+# A block is None when its presence column is NULL, i.e. the outer join found no row.
+BASIC_GROUPS = (
+    ("set", CardSet.id, (
+        ("id", CardSet.id),
+        ("name", CardSet.name),
+        ("series", CardSet.series),
+    )),
+    ("market", CardMarket.id, (
+        ("averageSellPrice", CardMarket.averageSellPrice),
+        ("trendPrice", CardMarket.trendPrice),
+        ("lowPrice", CardMarket.lowPrice),
+    )),
+    ("tcgplayerPrices", TcgPlayerPrices.id, (
+        ("normalMarket", TcgPlayerPrices.normalMarket),
+        ("holofoilMarket", TcgPlayerPrices.holofoilMarket),
+        ("reverseHolofoilMarket", TcgPlayerPrices.reverseHolofoilMarket),
+    )),
+    ("images", CardImages.id, (
+        ("small", CardImages.small),
+        ("large", CardImages.large),
+    )),
+)
+
+
+# Outer joins the projection may need, in join order: (table, relationship)
+_JOINS = (
+    ("CardSet", Card.set),
+    ("CardMarket", Card.cardmarket),
+    ("TcgPlayer", Card.tcgplayer),
+    ("TcgPlayerPrices", TcgPlayer.prices),
+    ("CardImages", Card.images),
+)
+
+
+class RowProjection:
+    """A flat SELECT over Card and its one-to-one tables, assembled straight into
+    response dicts without building ORM instances."""
+
+    def __init__(self, fields, groups):
+        self.spec = (tuple(fields), tuple(groups))
+        columns = []
+        positions = {}
+
+        def position(column):
+            if column not in positions:
+                positions[column] = len(columns)
+                columns.append(column)
+            return positions[column]
+
+        self.fields = [(key, position(col), fn) for key, col, fn in fields]
+        self.groups = [
+            (key, position(present), [(k, position(col)) for k, col in members])
+            for key, present, members in groups
+        ]
+        self.columns = columns
+
+    def select(self, *also):
+        """SELECT of the projected columns, outer-joining only the tables they,
+        and any `also` expressions (filters, sort keys), refer to."""
+        tables = {t.name for expr in (*self.columns, *also) for t in find_tables(expr.expression, check_columns=True)}
+        if "TcgPlayerPrices" in tables:
+            tables.add("TcgPlayer")
+        q = select(*self.columns).select_from(Card)
+        for table, relationship in _JOINS:
+            if table in tables:
+                q = q.outerjoin(relationship)
+        return q
+
+    def subset(self, tree):
+        """Projection of the keys in a parsed fieldset (see fieldsets.parse_fieldset);
+        nested blocks can be narrowed to some of their members."""
+        fields, groups = self.spec
+        known = {key for key, _, _ in fields} | {key for key, _, _ in groups}
+        unknown = sorted(set(tree) - known)
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        narrowed = []
+        for key, present, members in groups:
+            if key not in tree:
+                continue
+            wanted = tree[key]
+            if wanted is not True:
+                names = {k for k, _ in members}
+                bad = [f"{key}.{k}" for k, sub in wanted.items() if k not in names or sub is not True]
+                if bad:
+                    raise ValueError(f"Unknown fields: {', '.join(sorted(bad))}")
+                members = tuple((k, col) for k, col in members if k in wanted)
+            narrowed.append((key, present, members))
+        return RowProjection([f for f in fields if f[0] in tree], narrowed)
+
+    def keys(self):
+        fields, groups = self.spec
+        return [key for key, _, _ in fields] + [key for key, _, _ in groups]
+
+    def assemble(self, row):
+        out = {key: (fn(row[i]) if fn else row[i]) for key, i, fn in self.fields}
+        for key, present, members in self.groups:
+            out[key] = {k: row[i] for k, i in members} if row[present] is not None else None
+        return out
+
+
+# The GET /cards list view (benchmarks/cards_page.py checks it against the old ORM serializer)
+BASIC_PROJECTION = RowProjection(BASIC_FIELDS, BASIC_GROUPS)
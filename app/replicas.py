@@ -0,0 +1,166 @@
+# app/replicas.py
+"""Read-replica routing for read-only catalog views.
+
+READ_REPLICA_URLS adds one bind per replica ("replica1", "replica2", ...). A
+view decorated with @read_replica runs its default-bind reads on a replica
+chosen round-robin or by fewest checked-out connections. Only replicas that
+pass the last health check qualify:
+
+- reachable;
+- newest ImportMetadata.importedAt equal to the primary's catalog_version(), so
+  a replica that hasn't replayed the latest import never serves (or fills the
+  version-keyed caches with) the previous catalog;
+- replay lag at most REPLICA_MAX_LAG seconds (0 when it has replayed all the
+  WAL it received, so an idle primary doesn't make replicas look stale).
+
+Each replica is re-checked at most every REPLICA_CHECK_INTERVAL seconds, by the
+request that finds its result expired. With no qualifying replica the view
+reads from the primary.
+"""
+import itertools
+import logging
+import threading
+import time
+from functools import wraps
+import click
+from flask import current_app, g
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError
+from .catalog import catalog_version
+from .db import db
+
+log = logging.getLogger("app.replicas")
+
+BALANCE_POLICIES = ("round_robin", "least_connections")
+
+_CHECK = """
+SELECT
+    CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+         ELSE coalesce(extract(epoch FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END::float8,
+    (SELECT max("importedAt") FROM "ImportMetadata")
+"""
+
+
+def replica_binds(urls, connect_timeout: int = 2) -> dict:
+    """SQLALCHEMY_BINDS entries for a list of replica URLs. A short connect
+    timeout keeps a dead replica from stalling the request that checks it."""
+    return {
+        f"replica{i}": {"url": url, "connect_args": {"connect_timeout": connect_timeout}}
+        for i, url in enumerate(urls, 1)
+    }
+
+
+class Replica:
+    def __init__(self, bind: str):
+        self.bind = bind
+        self.up = False
+        self.lag = None          # seconds behind the primary's WAL
+        self.version = None      # newest ImportMetadata.importedAt on the replica
+        self.error = None
+        self.checked_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def engine(self):
+        return db.engines[self.bind]
+
+    def check(self):
+        try:
+            with self.engine.connect() as conn:
+                self.lag, self.version = conn.exec_driver_sql(_CHECK).one()
+            if not self.up:
+                log.info("Read replica %s is up (lag %.1f s)", self.bind, self.lag)
+            self.up, self.error = True, None
+        except DBAPIError as e:
+            if self.up or self.checked_at is None:
+                log.warning("Read replica %s is down: %s", self.bind, e.orig)
+            self.up, self.error = False, str(e.orig).strip()
+        self.checked_at = time.monotonic()
+
+    def refresh(self, interval: float):
+        if self.checked_at is not None and time.monotonic() - self.checked_at < interval:
+            return
+        # One request re-checks; the others use the previous result meanwhile
+        if self._lock.acquire(blocking=False):
+            try:
+                self.check()
+            finally:
+                self._lock.release()
+
+    def mark_down(self, error):
+        """A replica connection broke mid-request: stop routing to it until the next check."""
+        if self.up:
+            log.warning("Read replica %s went down: %s", self.bind, error)
+        self.up, self.error = False, str(error).strip()
+        self.checked_at = time.monotonic()
+
+    def usable(self, version, max_lag: float) -> bool:
+        return self.up and self.version == version and (not max_lag or self.lag <= max_lag)
+
+
+class ReplicaRouter:
+    """Process-wide replica state and balancing."""
+
+    def __init__(self):
+        self.replicas = []
+        self._turn = itertools.count()
+
+    def configure(self, binds):
+        self.replicas = [Replica(bind) for bind in binds]
+
+    def choose(self):
+        """Engine of the replica to read from, or None for the primary."""
+        if not self.replicas:
+            return None
+        config = current_app.config
+        for replica in self.replicas:
+            replica.refresh(config.get("REPLICA_CHECK_INTERVAL", 5.0))
+        version = catalog_version()
+        candidates = [r for r in self.replicas if r.usable(version, config.get("REPLICA_MAX_LAG", 30.0))]
+        if not candidates:
+            return None
+        if config.get("REPLICA_BALANCE") == "least_connections":
+            return min(candidates, key=lambda r: r.engine.pool.checkedout()).engine
+        return candidates[next(self._turn) % len(candidates)].engine
+
+
+router = ReplicaRouter()
+
+
+def read_replica(view):
+    """Decorator for read-only views: their default-bind reads (validators
+    included, if applied above @conditional) go to a healthy replica."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.db_replica = router.choose()
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def init_app(app):
+    if app.config.get("REPLICA_BALANCE", "round_robin") not in BALANCE_POLICIES:
+        raise RuntimeError(f"Unknown REPLICA_BALANCE: {app.config['REPLICA_BALANCE']}")
+    with app.app_context():
+        router.configure(app.config.get("READ_REPLICA_BINDS", ()))
+        for replica in router.replicas:
+            def on_error(context, replica=replica):
+                if context.is_disconnect:
+                    replica.mark_down(context.original_exception)
+            event.listen(replica.engine, "handle_error", on_error)
+
+    @app.cli.command("replica-status")
+    def replica_status():
+        """Check every read replica against the primary's catalog version."""
+        if not router.replicas:
+            raise click.ClickException("READ_REPLICA_URLS is not set")
+        version = catalog_version()
+        max_lag = app.config.get("REPLICA_MAX_LAG", 30.0)
+        click.echo(f"{'primary':10} catalog {version}")
+        for replica in router.replicas:
+            replica.check()
+            if not replica.up:
+                click.echo(f"{replica.bind:10} down: {replica.error}")
+                continue
+            state = "in use" if replica.usable(version, max_lag) else "stale"
+            click.echo(f"{replica.bind:10} catalog {replica.version}, lag {replica.lag:.1f} s: {state}")
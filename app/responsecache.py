@@ -0,0 +1,227 @@
+# app/responsecache.py
+"""Whole-response cache for catalog listings such as GET /cards.
+
+Bodies are keyed by the endpoint, the catalog version and a canonical form of the
+query string, so an import (a newer ImportMetadata.importedAt) retires every
+entry at once. Concurrent misses for the same key in one process run the view
+once; the other requests wait for its body.
+"""
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, make_response, request
+from .catalog import catalog_version
+from .encoding import json_response
+
+NUMERIC_SUFFIXES = ("_gte", "_lte", "_gt", "_lt")
+INTEGER_KEYS = ("page", "page_size")
+
+
+def _normalize(key: str, value: str) -> str:
+    """Spellings of the same number share a key: `5`, `5.0` and `05` -> `5.0`."""
+    try:
+        if key in INTEGER_KEYS:
+            return str(int(value))
+        if key.endswith(NUMERIC_SUFFIXES):
+            number = float(value)
+            return repr(number) if math.isfinite(number) else value
+    except ValueError:
+        pass
+    return value
+
+
+def canonical_query(args) -> str:
+    """Keys sorted, numeric values normalized. Repeated values keep their order,
+    since views read the first one."""
+    return "&".join(
+        f"{key}={_normalize(key, value)}"
+        for key, values in sorted(args.lists())
+        for value in values
+    )
+
+
+class MemoryBackend:
+    """LRU of response bodies, each expiring `ttl` seconds after it was stored."""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> (expires at, body)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, body: bytes):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisBackend:
+    """Bodies in Redis, shared by every worker; Redis expires them after `ttl` seconds.
+    Errors talking to Redis are logged and treated as misses."""
+
+    def __init__(self, client, ttl: float, prefix: str = "cards-cache:", errors=(ConnectionError, TimeoutError)):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self._errors = errors
+
+    @classmethod
+    def from_url(cls, url: str, ttl: float):
+        # Optional dependency, only imported when RESPONSE_CACHE_BACKEND=redis
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("RESPONSE_CACHE_BACKEND=redis needs the redis package (pip install redis)") from None
+        return cls(redis.Redis.from_url(url), ttl, errors=redis.RedisError)
+
+    def get(self, key):
+        try:
+            return self.client.get(self.prefix + key)
+        except self._errors as e:
+            current_app.logger.warning("Response cache read failed: %s", e)
+            return None
+
+    def set(self, key, body: bytes):
+        try:
+            self.client.set(self.prefix + key, body, px=max(1, int(self.ttl * 1000)))
+        except self._errors as e:
+            current_app.logger.warning("Response cache write failed: %s", e)
+
+    def clear(self):
+        for key in self.client.scan_iter(match=self.prefix + "*"):
+            self.client.delete(key)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
+
+class SingleFlight:
+    """Runs fn() once per key at a time; callers arriving while it runs wait for
+    its result instead of running it again."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn, timeout: float):
+        """(result, leader). Waiters get None if the leader failed or timed out."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            call.done.wait(timeout)
+            return call.result, False
+        try:
+            call.result = fn()
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, True
+
+
+class ResponseCache:
+    def __init__(self):
+        self.backend = None
+        self.flight = SingleFlight()
+        self.wait_timeout = 30.0
+
+    def configure(self, backend, wait_timeout: float = 30.0):
+        self.backend = backend
+        self.wait_timeout = wait_timeout
+
+    def key(self, name: str) -> str:
+        version = catalog_version()
+        digest = hashlib.sha256(canonical_query(request.args).encode("utf-8")).hexdigest()
+        return f"{name}:{version.isoformat() if version else 'none'}:{digest}"
+
+    def clear(self):
+        if self.backend is not None:
+            self.backend.clear()
+
+
+response_cache = ResponseCache()
+
+
+def _hit(body: bytes):
+    response = json_response(body)
+    response.headers["X-Cache"] = "HIT"
+    return response
+
+
+def cached_response(name: str):
+    """Decorator for JSON GET views whose output depends only on the query string
+    and the catalog version. Only 200 responses are stored."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            cache = response_cache
+            if cache.backend is None:
+                return view(*args, **kwargs)
+            key = cache.key(name)
+            body = cache.backend.get(key)
+            if body is not None:
+                return _hit(body)
+
+            rendered = {}
+
+            def render():
+                response = rendered["response"] = make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.is_streamed or not response.is_json:
+                    return None
+                data = response.get_data()
+                cache.backend.set(key, data)
+                return data
+
+            body, leader = cache.flight.do(key, render, cache.wait_timeout)
+            if leader:
+                rendered["response"].headers["X-Cache"] = "MISS"
+                return rendered["response"]
+            if body is not None:
+                return _hit(body)
+            # The request we waited on produced nothing cacheable; run our own
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def init_app(app):
+    backend_name = app.config.get("RESPONSE_CACHE_BACKEND", "none")
+    ttl = app.config.get("RESPONSE_CACHE_TTL", 300.0)
+    if backend_name == "memory":
+        backend = MemoryBackend(app.config.get("RESPONSE_CACHE_SIZE", 512), ttl)
+    elif backend_name == "redis":
+        url = app.config.get("RESPONSE_CACHE_REDIS_URL")
+        if not url:
+            raise RuntimeError("RESPONSE_CACHE_BACKEND=redis requires RESPONSE_CACHE_REDIS_URL")
+        backend = RedisBackend.from_url(url, ttl)
+    elif backend_name in ("", "none"):
+        backend = None
+    else:
+        raise RuntimeError(f"Unknown RESPONSE_CACHE_BACKEND: {backend_name}")
+    response_cache.configure(backend, app.config.get("RESPONSE_CACHE_WAIT", 30.0))
@@ -1,21 +1,64 @@
-from flask import Blueprint, jsonify, request
-from sqlalchemy import and_
+import re
+import uuid
+from flask import Blueprint, Response, current_app, g, jsonify, request, stream_with_context
+from sqlalchemy import and_, delete, func, literal, or_, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
 from .models import (
     Card, Ability, Attack, Weakness, Resistance,
     CardLegalities, CardImages, CardMarket,
-    TcgPlayer, TcgPlayerPrices, CardSet, SetLegalities
+    TcgPlayer, TcgPlayerPrices, CardSet, SetLegalities,
+    Collection, CollectionCard
 )
 from .db import db
 from .auth import require_auth
-from sqlalchemy import and_, text
-from dotenv import load_dotenv
-load_dotenv()
+from .loaders import card_id_any, card_loader_options, chunked, sparse_loader_options
+from .fieldsets import list_fieldset, full_fieldset, prune
+from .projections import FULL_FIELDS
+from .facets import get_facets
+from .search import FIELDS as SEARCH_FIELDS, search_cards
+from .prices import (
+    MAX_POINTS, parse_resolution, bucket_width_for, bucketed_history, lttb_history,
+    daily_history, long_range, latest_prices, newest_price_time
+)
+from .encoding import json_response, encode_json
+from .overview import submit_price_block, collect_price_block
+from .blobstore import card_blobs, stamp_time
+from .catalog import catalog_version
+from .conditional import conditional, make_etag, canonical_args
+from .replicas import read_replica
+from .responsecache import cached_response
+from .pagination import (
+    COUNT_MODES, parse_sort, order_clauses, encode_cursor, decode_cursor,
+    keyset_predicate, estimate_count
+)
 
 from datetime import datetime, timezone
 from .models import PriceHistory
 
 bp = Blueprint("routes", __name__)
 
+MAX_LATEST_IDS = 1000
+
+
+# --- Conditional GET validators: cheap enough to run before any rows are loaded ---
+
+def _catalog_validators(*_, **__):
+    # Card list and facets only change with an import
+    version = catalog_version()
+    return make_etag(request.path, canonical_args(), version), version
+
+
+def _card_validators(card_id):
+    stamp = card_blobs.stamp(card_id)
+    if stamp is None:
+        return None
+    return make_etag(card_id, stamp, canonical_args()), stamp_time(stamp)
+
+
+def _price_validators(card_id):
+    newest = newest_price_time(card_id)
+    return make_etag(request.path, canonical_args(), newest), newest
+
 
 def _parse_iso(ts: str | None):
     if not ts: return None
@@ -25,214 +68,241 @@ def _parse_iso(ts: str | None):
     return datetime.fromisoformat(ts)
 
 
-def serialize_card_full(card: Card):
-    """Serialize a card with all related data (matching model.py exactly)."""
-    return {
-        "id": card.id,
-        "name": card.name,
-        "supertype": card.supertype,
-        "subtypes": card.subtypes or [],
-        "level": card.level,
-        "hp": card.hp,
-        "types": card.types or [],
-        "evolvesFrom": card.evolvesFrom,
-        "evolvesTo": card.evolvesTo or [],
-        "rules": card.rules or [],
-        "flavorText": card.flavorText,
-        "artist": card.artist,
-        "rarity": card.rarity,
-        "number": card.number,
-        "nationalPokedexNumbers": card.nationalPokedexNumbers or [],
-        "retreatCost": card.retreatCost or [],
-        "convertedRetreatCost": card.convertedRetreatCost,
-        "createdAt": card.createdAt.isoformat() if card.createdAt else None,
-        "updatedAt": card.updatedAt.isoformat() if card.updatedAt else None,
-
-        # --- Set ---
-        "set": {
-            "id": card.set.id,
-            "name": card.set.name,
-            "series": card.set.series,
-            "printedTotal": card.set.printedTotal,
-            "total": card.set.total,
-            "ptcgoCode": card.set.ptcgoCode,
-            "releaseDate": card.set.releaseDate.isoformat() if card.set.releaseDate else None,
-            "updatedAt": card.set.updatedAt.isoformat() if card.set.updatedAt else None,
-            "symbol": card.set.symbol,
-            "logo": card.set.logo,
-            "legalities": {
-                "unlimited": card.set.legalities.unlimited if card.set.legalities else None,
-                "standard": card.set.legalities.standard if card.set.legalities else None,
-                "expanded": card.set.legalities.expanded if card.set.legalities else None
-            } if card.set.legalities else None
-        } if card.set else None,
-
-        # --- Abilities ---
-        "abilities": [
-            {"id": a.id, "name": a.name, "text": a.text, "type": a.type}
-            for a in card.abilities
-        ],
-
-        # --- Attacks ---
-        "attacks": [
-            {
-                "id": atk.id,
-                "name": atk.name,
-                "cost": atk.cost or [],
-                "convertedEnergyCost": atk.convertedEnergyCost,
-                "damage": atk.damage,
-                "text": atk.text
-            }
-            for atk in card.attacks
-        ],
-
-        # --- Weaknesses ---
-        "weaknesses": [
-            {"id": w.id, "type": w.type, "value": w.value}
-            for w in card.weaknesses
-        ],
+def _parse_utc(ts: str | None):
+    """_parse_iso as an aware UTC datetime; values without an offset are taken as UTC."""
+    parsed = _parse_iso(ts)
+    if parsed is None:
+        return None
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
 
-        # --- Resistances ---
-        "resistances": [
-            {"id": r.id, "type": r.type, "value": r.value}
-            for r in card.resistances
-        ],
 
-        # --- Legalities ---
+def _full_set(card):
+    return {
+        "id": card.set.id,
+        "name": card.set.name,
+        "series": card.set.series,
+        "printedTotal": card.set.printedTotal,
+        "total": card.set.total,
+        "ptcgoCode": card.set.ptcgoCode,
+        "releaseDate": card.set.releaseDate.isoformat() if card.set.releaseDate else None,
+        "updatedAt": card.set.updatedAt.isoformat() if card.set.updatedAt else None,
+        "symbol": card.set.symbol,
+        "logo": card.set.logo,
         "legalities": {
-            "unlimited": card.legalities.unlimited if card.legalities else None,
-            "standard": card.legalities.standard if card.legalities else None,
-            "expanded": card.legalities.expanded if card.legalities else None
-        } if card.legalities else None,
-
-        # --- Images ---
-        "images": {
-            "small": card.images.small if card.images else None,
-            "large": card.images.large if card.images else None
-        } if card.images else None,
-
-        # --- CardMarket (full) ---
-        "cardmarket": {
-            "url": card.cardmarket.url if card.cardmarket else None,
-            "updatedAt": card.cardmarket.updatedAt.isoformat() if card.cardmarket and card.cardmarket.updatedAt else None,
-            "averageSellPrice": card.cardmarket.averageSellPrice if card.cardmarket else None,
-            "lowPrice": card.cardmarket.lowPrice if card.cardmarket else None,
-            "trendPrice": card.cardmarket.trendPrice if card.cardmarket else None,
-            "germanProLow": card.cardmarket.germanProLow if card.cardmarket else None,
-            "suggestedPrice": card.cardmarket.suggestedPrice if card.cardmarket else None,
-            "reverseHoloSell": card.cardmarket.reverseHoloSell if card.cardmarket else None,
-            "reverseHoloLow": card.cardmarket.reverseHoloLow if card.cardmarket else None,
-            "reverseHoloTrend": card.cardmarket.reverseHoloTrend if card.cardmarket else None,
-            "lowPriceExPlus": card.cardmarket.lowPriceExPlus if card.cardmarket else None,
-            "avg1": card.cardmarket.avg1 if card.cardmarket else None,
-            "avg7": card.cardmarket.avg7 if card.cardmarket else None,
-            "avg30": card.cardmarket.avg30 if card.cardmarket else None,
-            "reverseHoloAvg1": card.cardmarket.reverseHoloAvg1 if card.cardmarket else None,
-            "reverseHoloAvg7": card.cardmarket.reverseHoloAvg7 if card.cardmarket else None,
-            "reverseHoloAvg30": card.cardmarket.reverseHoloAvg30 if card.cardmarket else None,
-        } if card.cardmarket else None,
-
-        # --- TCGPlayer (full with exact model.py fields) ---
-        "tcgplayer": {
-            "url": card.tcgplayer.url if card.tcgplayer else None,
-            "updatedAt": card.tcgplayer.updatedAt.isoformat() if card.tcgplayer and card.tcgplayer.updatedAt else None,
-            "prices": {
-                "normalLow": card.tcgplayer.prices.normalLow if card.tcgplayer and card.tcgplayer.prices else None,
-                "normalMid": card.tcgplayer.prices.normalMid if card.tcgplayer and card.tcgplayer.prices else None,
-                "normalHigh": card.tcgplayer.prices.normalHigh if card.tcgplayer and card.tcgplayer.prices else None,
-                "normalMarket": card.tcgplayer.prices.normalMarket if card.tcgplayer and card.tcgplayer.prices else None,
-                "normalDirectLow": card.tcgplayer.prices.normalDirectLow if card.tcgplayer and card.tcgplayer.prices else None,
-                "holofoilLow": card.tcgplayer.prices.holofoilLow if card.tcgplayer and card.tcgplayer.prices else None,
-                "holofoilMid": card.tcgplayer.prices.holofoilMid if card.tcgplayer and card.tcgplayer.prices else None,
-                "holofoilHigh": card.tcgplayer.prices.holofoilHigh if card.tcgplayer and card.tcgplayer.prices else None,
-                "holofoilMarket": card.tcgplayer.prices.holofoilMarket if card.tcgplayer and card.tcgplayer.prices else None,
-                "holofoilDirectLow": card.tcgplayer.prices.holofoilDirectLow if card.tcgplayer and card.tcgplayer.prices else None,
-                "reverseHolofoilLow": card.tcgplayer.prices.reverseHolofoilLow if card.tcgplayer and card.tcgplayer.prices else None,
-                "reverseHolofoilMid": card.tcgplayer.prices.reverseHolofoilMid if card.tcgplayer and card.tcgplayer.prices else None,
-                "reverseHolofoilHigh": card.tcgplayer.prices.reverseHolofoilHigh if card.tcgplayer and card.tcgplayer.prices else None,
-                "reverseHolofoilMarket": card.tcgplayer.prices.reverseHolofoilMarket if card.tcgplayer and card.tcgplayer.prices else None,
-                "reverseHolofoilDirectLow": card.tcgplayer.prices.reverseHolofoilDirectLow if card.tcgplayer and card.tcgplayer.prices else None
-            } if card.tcgplayer and card.tcgplayer.prices else None
-        } if card.tcgplayer else None
-    }
+            "unlimited": card.set.legalities.unlimited if card.set.legalities else None,
+            "standard": card.set.legalities.standard if card.set.legalities else None,
+            "expanded": card.set.legalities.expanded if card.set.legalities else None
+        } if card.set.legalities else None
+    } if card.set else None
 
 
-def serialize_card_basic(card: Card):
-    """Smaller version for list views with extra filterable/searchable fields and images."""
+def _full_cardmarket(card):
+    return {
+        "url": card.cardmarket.url if card.cardmarket else None,
+        "updatedAt": card.cardmarket.updatedAt.isoformat() if card.cardmarket and card.cardmarket.updatedAt else None,
+        "averageSellPrice": card.cardmarket.averageSellPrice if card.cardmarket else None,
+        "lowPrice": card.cardmarket.lowPrice if card.cardmarket else None,
+        "trendPrice": card.cardmarket.trendPrice if card.cardmarket else None,
+        "germanProLow": card.cardmarket.germanProLow if card.cardmarket else None,
+        "suggestedPrice": card.cardmarket.suggestedPrice if card.cardmarket else None,
+        "reverseHoloSell": card.cardmarket.reverseHoloSell if card.cardmarket else None,
+        "reverseHoloLow": card.cardmarket.reverseHoloLow if card.cardmarket else None,
+        "reverseHoloTrend": card.cardmarket.reverseHoloTrend if card.cardmarket else None,
+        "lowPriceExPlus": card.cardmarket.lowPriceExPlus if card.cardmarket else None,
+        "avg1": card.cardmarket.avg1 if card.cardmarket else None,
+        "avg7": card.cardmarket.avg7 if card.cardmarket else None,
+        "avg30": card.cardmarket.avg30 if card.cardmarket else None,
+        "reverseHoloAvg1": card.cardmarket.reverseHoloAvg1 if card.cardmarket else None,
+        "reverseHoloAvg7": card.cardmarket.reverseHoloAvg7 if card.cardmarket else None,
+        "reverseHoloAvg30": card.cardmarket.reverseHoloAvg30 if card.cardmarket else None,
+    } if card.cardmarket else None
+
+
+def _full_tcgplayer(card):
     return {
-        "id": card.id,
-        "name": card.name,
-        "supertype": card.supertype,
-        "subtypes": card.subtypes or [],
-        "level": card.level,
-        "hp": card.hp,
-        "types": card.types or [],
-        "rarity": card.rarity,
-        "artist": card.artist,
-        "number": card.number,
-        "nationalPokedexNumbers": card.nationalPokedexNumbers or [],
-        "retreatCost": card.retreatCost or [],
-        "createdAt": card.createdAt.isoformat() if card.createdAt else None,
-
-        # Set info (minimal)
-        "set": {
-            "id": card.set.id if card.set else None,
-            "name": card.set.name if card.set else None,
-            "series": card.set.series if card.set else None
-        } if card.set else None,
-
-        # Market snapshot
-        "market": {
-            "averageSellPrice": card.cardmarket.averageSellPrice if card.cardmarket else None,
-            "trendPrice": card.cardmarket.trendPrice if card.cardmarket else None,
-            "lowPrice": card.cardmarket.lowPrice if card.cardmarket else None
-        } if card.cardmarket else None,
-
-        # TCGPlayer quick prices
-        "tcgplayerPrices": {
+        "url": card.tcgplayer.url if card.tcgplayer else None,
+        "updatedAt": card.tcgplayer.updatedAt.isoformat() if card.tcgplayer and card.tcgplayer.updatedAt else None,
+        "prices": {
+            "normalLow": card.tcgplayer.prices.normalLow if card.tcgplayer and card.tcgplayer.prices else None,
+            "normalMid": card.tcgplayer.prices.normalMid if card.tcgplayer and card.tcgplayer.prices else None,
+            "normalHigh": card.tcgplayer.prices.normalHigh if card.tcgplayer and card.tcgplayer.prices else None,
             "normalMarket": card.tcgplayer.prices.normalMarket if card.tcgplayer and card.tcgplayer.prices else None,
+            "normalDirectLow": card.tcgplayer.prices.normalDirectLow if card.tcgplayer and card.tcgplayer.prices else None,
+            "holofoilLow": card.tcgplayer.prices.holofoilLow if card.tcgplayer and card.tcgplayer.prices else None,
+            "holofoilMid": card.tcgplayer.prices.holofoilMid if card.tcgplayer and card.tcgplayer.prices else None,
+            "holofoilHigh": card.tcgplayer.prices.holofoilHigh if card.tcgplayer and card.tcgplayer.prices else None,
             "holofoilMarket": card.tcgplayer.prices.holofoilMarket if card.tcgplayer and card.tcgplayer.prices else None,
-            "reverseHolofoilMarket": card.tcgplayer.prices.reverseHolofoilMarket if card.tcgplayer and card.tcgplayer.prices else None
-        } if card.tcgplayer and card.tcgplayer.prices else None,
-
-        # Images
-        "images": {
-            "small": card.images.small if card.images else None,
-            "large": card.images.large if card.images else None
-        } if card.images else None
+            "holofoilDirectLow": card.tcgplayer.prices.holofoilDirectLow if card.tcgplayer and card.tcgplayer.prices else None,
+            "reverseHolofoilLow": card.tcgplayer.prices.reverseHolofoilLow if card.tcgplayer and card.tcgplayer.prices else None,
+            "reverseHolofoilMid": card.tcgplayer.prices.reverseHolofoilMid if card.tcgplayer and card.tcgplayer.prices else None,
+            "reverseHolofoilHigh": card.tcgplayer.prices.reverseHolofoilHigh if card.tcgplayer and card.tcgplayer.prices else None,
+            "reverseHolofoilMarket": card.tcgplayer.prices.reverseHolofoilMarket if card.tcgplayer and card.tcgplayer.prices else None,
+            "reverseHolofoilDirectLow": card.tcgplayer.prices.reverseHolofoilDirectLow if card.tcgplayer and card.tcgplayer.prices else None
+        } if card.tcgplayer and card.tcgplayer.prices else None
+    } if card.tcgplayer else None
+
+
+# Relationship-backed blocks of the full view (scalar keys are FULL_FIELDS)
+FULL_BLOCKS = {
+    "set": _full_set,
+    "abilities": lambda card: [
+        {"id": a.id, "name": a.name, "text": a.text, "type": a.type}
+        for a in card.abilities
+    ],
+    "attacks": lambda card: [
+        {
+            "id": atk.id,
+            "name": atk.name,
+            "cost": atk.cost or [],
+            "convertedEnergyCost": atk.convertedEnergyCost,
+            "damage": atk.damage,
+            "text": atk.text
+        }
+        for atk in card.attacks
+    ],
+    "weaknesses": lambda card: [
+        {"id": w.id, "type": w.type, "value": w.value}
+        for w in card.weaknesses
+    ],
+    "resistances": lambda card: [
+        {"id": r.id, "type": r.type, "value": r.value}
+        for r in card.resistances
+    ],
+    "legalities": lambda card: {
+        "unlimited": card.legalities.unlimited if card.legalities else None,
+        "standard": card.legalities.standard if card.legalities else None,
+        "expanded": card.legalities.expanded if card.legalities else None
+    } if card.legalities else None,
+    "images": lambda card: {
+        "small": card.images.small if card.images else None,
+        "large": card.images.large if card.images else None
+    } if card.images else None,
+    "cardmarket": _full_cardmarket,
+    "tcgplayer": _full_tcgplayer,
+}
+
+
+def serialize_card_full(card: Card, keys=None):
+    """Serialize a card with all related data (matching model.py exactly).
+
+    With `keys`, only those top-level keys are built and relationships outside
+    them are never touched, so they need not be loaded (see sparse_loader_options).
+    """
+    out = {
+        key: fn(getattr(card, column.key)) if fn else getattr(card, column.key)
+        for key, column, fn in FULL_FIELDS
+        if keys is None or key in keys
     }
+    for key, build in FULL_BLOCKS.items():
+        if keys is None or key in keys:
+            out[key] = build(card)
+    return out
+
+
+def _sparse_full_cards(card_ids, keys, tree) -> dict:
+    """card id -> full view narrowed to a fieldset, loading only what it needs."""
+    cards = (Card.query
+             .options(*sparse_loader_options(keys))
+             .filter(card_id_any(card_ids))
+             .all())
+    return {card.id: prune(serialize_card_full(card, keys), tree) for card in cards}
+
+
+def _array_literal(values) -> str:
+    """'{"Fire","Water"}': an untyped array literal, which Postgres reads as the
+    column's own array type (varchar[] or text[]), so the GIN index applies."""
+    quoted = (str(v).replace("\\", "\\\\").replace('"', '\\"') for v in values)
+    return "{" + ",".join(f'"{v}"' for v in quoted) + "}"
+
+
+def _array_condition(column, values, match_any=False):
+    """column @> values (all of them), or && (any of them) with match_any."""
+    return column.op("&&" if match_any else "@>", is_comparison=True)(literal(_array_literal(values)))
+
+
+def _list_cards(projection, rows, extra, tree):
+    """Assemble /cards rows; keys outside the basic view come from one sparse ORM query."""
+    cards = [projection.assemble(row) for row in rows]
+    if extra:
+        ids = [row._card_id for row in rows]
+        blocks = _sparse_full_cards(ids, extra, {k: tree[k] for k in extra})
+        for card, card_id in zip(cards, ids):
+            card.update(blocks.get(card_id, {}))
+    return cards
+
 
 @bp.route("/cards/bulk", methods=["POST"])
 @require_auth
+@read_replica
 def get_cards_bulk():
-    """Fetch multiple cards by IDs and return full details."""
+    """Fetch multiple cards by IDs and return full details.
+
+    Repeated IDs are served once; cards come back in the order their IDs were
+    first given, and IDs with no card are listed under `missing`."""
     data = request.get_json()
 
     if not data or "ids" not in data or not isinstance(data["ids"], list):
         return jsonify({"error": "Request must include 'ids' as a list"}), 400
 
-    ids = [str(i) for i in data["ids"] if isinstance(i, str) and i.strip()]
+    ids = list(dict.fromkeys(str(i) for i in data["ids"] if isinstance(i, str) and i.strip()))
     if not ids:
         return jsonify({"error": "No valid IDs provided"}), 400
+    max_ids = current_app.config.get("BULK_MAX_IDS", 10000)
+    if len(ids) > max_ids:
+        return jsonify({"error": f"Too many IDs: {len(ids)} (at most {max_ids} per request)"}), 400
 
-    cards = Card.query.filter(Card.id.in_(ids)).all()
-
-    return jsonify({
-        "count": len(cards),
-        "cards": [serialize_card_full(card) for card in cards]
-    })
+    try:
+        keys, tree = full_fieldset(request.args.get("fields"), request.args.get("include"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if keys is not None:
+        found = {}
+        for chunk in chunked(ids, max(1, current_app.config.get("BULK_CHUNK_SIZE", 500))):
+            found.update(_sparse_full_cards(chunk, keys, tree))
+        cards = [found[card_id] for card_id in ids if card_id in found]
+        missing = [card_id for card_id in ids if card_id not in found]
+        return jsonify({"cards": cards, "count": len(cards), "missing": missing})
+
+    # Pre-encoded cards are spliced into the body as-is (keys in jsonify's sorted order)
+    blobs = card_blobs.get_many(ids)
+    cards = [blobs[card_id] for card_id in ids if card_id in blobs]
+    missing = [card_id for card_id in ids if card_id not in blobs]
+    return json_response(
+        b'{"cards":[' + b",".join(cards) + b'],"count":' + str(len(cards)).encode()
+        + b',"missing":' + current_app.json.dumps(missing, separators=(",", ":")).encode("utf-8") + b"}\n"
+    )
 
 
 # --- Routes ---
 @bp.route("/cards", methods=["GET"])
 @require_auth
+@read_replica
+@conditional(_catalog_validators)
+@cached_response("cards")
 def get_cards():
     # Pagination params
     try:
         page = int(request.args.get("page", 1))
-        page_size = min(int(request.args.get("page_size", 15)), 100)
+        page_size = int(request.args.get("page_size", 15))
     except ValueError:
         return jsonify({"error": "Invalid pagination parameters"}), 400
+    if page_size < 1:
+        return jsonify({"error": "page_size must be a positive integer"}), 400
+    per_page = min(page_size, 100)
+
+    # Keyset mode is opt-in: any `cursor` param (empty for the first page)
+    cursor_mode = "cursor" in request.args
+    count_mode = request.args.get("count", "none" if cursor_mode else "exact")
+    if count_mode not in COUNT_MODES:
+        return jsonify({"error": f"Invalid count mode: {count_mode}"}), 400
+    try:
+        sort_key, sort_column, descending = parse_sort(request.args.get("sort"))
+        after = decode_cursor(request.args.get("cursor", ""), sort_key) if cursor_mode else None
+        projection, extra, tree = list_fieldset(request.args.get("fields"), request.args.get("include"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
     # Allowed direct equality filters
     allowed_filters = {
@@ -245,11 +315,24 @@ def get_cards():
         "number": Card.number,
         "setId": Card.setId,
         "artist": Card.artist,
+        "evolvesFrom": Card.evolvesFrom,
     }
 
-    # Allowed numeric comparison filters (suffix _gte/_lte/_gt/_lt)
+    # Allowed array containment filters: `types=Fire,Water` matches cards with
+    # every listed value (@>), `types_any=Fire,Water` with at least one (&&)
+    allowed_array_filters = {
+        "types": (Card.types, str),
+        "subtypes": (Card.subtypes, str),
+        "evolvesTo": (Card.evolvesTo, str),
+        "pokedex": (Card.nationalPokedexNumbers, int),
+    }
+
+    # Allowed numeric comparison filters (suffix _gte/_lte/_gt/_lt); hp/level/number
+    # compare the indexed numeric shadow columns, not the raw strings
     allowed_numeric_filters = {
-        "hp": Card.hp,
+        "hp": Card.hpNum,
+        "level": Card.levelNum,
+        "number": Card.numberNum,
         "averageSellPrice": CardMarket.averageSellPrice,
         "trendPrice": CardMarket.trendPrice,
         "lowPrice": CardMarket.lowPrice,
@@ -261,7 +344,7 @@ def get_cards():
     filters = []
 
     for key, value in request.args.items():
-        if key in ("page", "page_size"):
+        if key in ("page", "page_size", "cursor", "sort", "count", "fields", "include"):
             continue
 
         # Direct match filters
@@ -269,6 +352,19 @@ def get_cards():
             filters.append(allowed_filters[key] == value)
             continue
 
+        # Array containment filters
+        array_key = key[:-len("_any")] if key.endswith("_any") else key
+        if array_key in allowed_array_filters:
+            column, convert = allowed_array_filters[array_key]
+            try:
+                values = [convert(v.strip()) for v in value.split(",") if v.strip()]
+            except ValueError:
+                return jsonify({"error": f"Invalid value for {key}"}), 400
+            if not values:
+                return jsonify({"error": f"{key} must list at least one value"}), 400
+            filters.append(_array_condition(column, values, match_any=key != array_key))
+            continue
+
         # Numeric comparison filters
         for suffix, op in [("_gte", ">="), ("_lte", "<="), ("_gt", ">"), ("_lt", "<")]:
             if key.endswith(suffix):
@@ -290,107 +386,260 @@ def get_cards():
                 break
 
     # Apply filters
-    query = Card.query
+    # Only the tables the selected fields, filters and sort refer to are joined
+    rows_query = projection.select(*filters, sort_column)
+    if extra:
+        rows_query = rows_query.add_columns(Card.id.label("_card_id"))
+    count_query = select(func.count()).select_from(Card)
     if filters:
-        query = query.join(CardMarket, isouter=True).join(TcgPlayer, isouter=True).join(TcgPlayerPrices, isouter=True)
-        query = query.filter(and_(*filters))
-
-    # Pagination
-    pagination = query.paginate(page=page, per_page=page_size, error_out=False)
-
-    total_pages = (pagination.total + page_size - 1) // page_size
-
-    return jsonify({
-        "page": pagination.page,
-        "page_size": pagination.per_page,
-        "total": pagination.total,
-        "total_pages": total_pages,
-        "cards": [serialize_card_basic(card) for card in pagination.items]
-    })
+        rows_query = rows_query.where(and_(*filters))
+        count_query = (count_query
+                       .outerjoin(Card.cardmarket)
+                       .outerjoin(Card.tcgplayer)
+                       .outerjoin(TcgPlayer.prices)
+                       .where(and_(*filters)))
+
+    rows_query = rows_query.order_by(*order_clauses(sort_column, descending))
+
+    # Total is optional: exact COUNT(*), planner estimate, or skipped
+    total = None
+    if count_mode == "exact":
+        total = db.session.execute(count_query).scalar()
+    elif count_mode == "estimate":
+        total = estimate_count(rows_query)
+
+    if cursor_mode:
+        if after is not None:
+            rows_query = rows_query.where(keyset_predicate(sort_column, descending, *after))
+        # One extra row tells us whether there is a next page
+        rows = db.session.execute(
+            rows_query
+            .add_columns(sort_column.label("_sort_value"), Card.id.label("_sort_id"))
+            .limit(per_page + 1)
+        ).all()
+        next_cursor = None
+        if len(rows) > per_page:
+            rows = rows[:per_page]
+            last = rows[-1]
+            next_cursor = encode_cursor(sort_key, last._sort_value, last._sort_id)
+        return jsonify({
+            "page_size": per_page,
+            "total": total,
+            "total_estimated": count_mode == "estimate",
+            "next_cursor": next_cursor,
+            "cards": _list_cards(projection, rows, extra, tree)
+        })
+
+    # Pagination (same clamping as paginate(error_out=False))
+    current_page = max(page, 1)
+    rows = db.session.execute(
+        rows_query.limit(per_page).offset((current_page - 1) * per_page)
+    ).all()
+    cards = _list_cards(projection, rows, extra, tree)
+
+    response = {
+        "page": current_page,
+        "page_size": per_page,
+        "total": total,
+        "total_pages": (total + per_page - 1) // per_page if total is not None else None,
+        "cards": cards
+    }
+    if count_mode == "estimate":
+        response["total_estimated"] = True
+    return jsonify(response)
 
 
 @bp.route("/cards/filters", methods=["GET"])
 @require_auth
+@read_replica
+@conditional(_catalog_validators)
 def get_card_filters():
-    # Aggregates for numeric ranges
-    from sqlalchemy import func
-
-    # Numeric ranges from Card table
-    hp_min, hp_max = db.session.query(func.min(Card.hp), func.max(Card.hp)).first()
-    level_min, level_max = db.session.query(func.min(Card.level), func.max(Card.level)).first()
-    number_min, number_max = db.session.query(func.min(Card.number), func.max(Card.number)).first()
-
-    # Numeric ranges from CardMarket
-    avg_sell_min, avg_sell_max = db.session.query(
-        func.min(CardMarket.averageSellPrice), func.max(CardMarket.averageSellPrice)
-    ).first()
-    trend_min, trend_max = db.session.query(
-        func.min(CardMarket.trendPrice), func.max(CardMarket.trendPrice)
-    ).first()
-    low_min, low_max = db.session.query(
-        func.min(CardMarket.lowPrice), func.max(CardMarket.lowPrice)
-    ).first()
-
-    # Numeric ranges from TcgPlayerPrices
-    tcg_normal_low_min, tcg_normal_low_max = db.session.query(
-        func.min(TcgPlayerPrices.normalLow), func.max(TcgPlayerPrices.normalLow)
-    ).first()
-    tcg_holofoil_low_min, tcg_holofoil_low_max = db.session.query(
-        func.min(TcgPlayerPrices.holofoilLow), func.max(TcgPlayerPrices.holofoilLow)
-    ).first()
-    tcg_reverse_holofoil_low_min, tcg_reverse_holofoil_low_max = db.session.query(
-        func.min(TcgPlayerPrices.reverseHolofoilLow), func.max(TcgPlayerPrices.reverseHolofoilLow)
-    ).first()
-
-    # Distinct categorical values
-    artists = [a[0] for a in db.session.query(Card.artist).distinct().order_by(Card.artist) if a[0]]
-    rarities = [r[0] for r in db.session.query(Card.rarity).distinct().order_by(Card.rarity) if r[0]]
-    supertypes = [s[0] for s in db.session.query(Card.supertype).distinct().order_by(Card.supertype) if s[0]]
-    types = sorted({t for sublist in db.session.query(Card.types).distinct() for t in (sublist[0] or [])})
-    sets = [ {"id": s.id, "name": s.name} for s in db.session.query(CardSet.id, CardSet.name).distinct() ]
+    # Precomputed per catalog version (see app/facets.py)
+    return json_response(get_facets()["body"])
 
-    return jsonify({
-        "ranges": {
-            "hp": {"min": hp_min, "max": hp_max},
-            "level": {"min": level_min, "max": level_max},
-            "number": {"min": number_min, "max": number_max},
-            "averageSellPrice": {"min": avg_sell_min, "max": avg_sell_max},
-            "trendPrice": {"min": trend_min, "max": trend_max},
-            "lowPrice": {"min": low_min, "max": low_max},
-            "tcgplayer": {
-                "normalLow": {"min": tcg_normal_low_min, "max": tcg_normal_low_max},
-                "holofoilLow": {"min": tcg_holofoil_low_min, "max": tcg_holofoil_low_max},
-                "reverseHolofoilLow": {"min": tcg_reverse_holofoil_low_min, "max": tcg_reverse_holofoil_low_max},
-            }
-        },
-        "categories": {
-            "artists": artists,
-            "rarities": rarities,
-            "supertypes": supertypes,
-            "types": types,
-            "sets": sets
-        }
-    })
 
+@bp.route("/cards/export", methods=["GET"])
+@require_auth
+def export_cards():
+    """Stream every card (full shape) as NDJSON through a server-side cursor."""
+    try:
+        since = _parse_iso(request.args.get("since"))
+        chunk_size = min(int(request.args.get("chunk_size", 1000)), 5000)
+    except ValueError:
+        return jsonify({"error": "Invalid since or chunk_size"}), 400
+    if chunk_size < 1:
+        return jsonify({"error": "Invalid since or chunk_size"}), 400
+
+    # Clients pass this back as `since` on their next delta sync
+    started_at = datetime.now(timezone.utc)
+
+    q = (select(Card)
+         .options(*card_loader_options("full"))
+         .order_by(Card.id)
+         .execution_options(yield_per=chunk_size))
+    if since:
+        # Price blocks are part of the record, so their updates count as changes too
+        q = q.where(or_(
+            Card.updatedAt > since,
+            Card.cardmarket.has(CardMarket.updatedAt > since),
+            Card.tcgplayer.has(TcgPlayer.updatedAt > since),
+        ))
+
+    def generate():
+        dumps = current_app.json.dumps
+        # One chunk = one batch of rows plus one IN query per collection. The
+        # identity map only holds weak references, so finished chunks are freed.
+        for chunk in db.session.execute(q).scalars().partitions():
+            yield "".join(dumps(serialize_card_full(card), separators=(",", ":")) + "\n" for card in chunk)
+
+    response = Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+    response.headers["X-Export-Started-At"] = started_at.isoformat()
+    return response
+
+
+@bp.route("/cards/search", methods=["GET"])
+@require_auth
+def search_cards_route():
+    query = request.args.get("q", "").strip()
+    if not query:
+        return jsonify({"error": "Query parameter 'q' is required"}), 400
+    try:
+        limit = min(int(request.args.get("limit", 20)), 100)
+    except ValueError:
+        return jsonify({"error": "Invalid limit"}), 400
+    fields = [f for f in request.args.get("fields", "name").split(",") if f]
+    if not fields or any(f not in SEARCH_FIELDS for f in fields):
+        return jsonify({"error": f"fields must be a subset of {', '.join(SEARCH_FIELDS)}"}), 400
+
+    results = search_cards(query, max(limit, 1), fields)
+    return jsonify({"query": query, "count": len(results), "results": results})
 
 
 @bp.route("/cards/<string:card_id>", methods=["GET"])
 @require_auth
+@read_replica
+@conditional(_card_validators)
 def get_card(card_id):
-    card = Card.query.get(card_id)
-    if not card:
+    try:
+        keys, tree = full_fieldset(request.args.get("fields"), request.args.get("include"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if keys is not None:
+        card = _sparse_full_cards([card_id], keys, tree).get(card_id)
+        if card is None:
+            return jsonify({"error": "Card not found"}), 404
+        return jsonify(card)
+
+    blob = card_blobs.get_many([card_id]).get(card_id)
+    if blob is None:
+        return jsonify({"error": "Card not found"}), 404
+    return json_response(blob + b"\n")
+
+
+@bp.route("/cards/<string:card_id>/similar", methods=["GET"])
+@require_auth
+@read_replica
+@conditional(_catalog_validators)
+def get_similar_cards(card_id):
+    # NumPy is imported with the first lookup (or by STARTUP_WARMUP), not at startup
+    from .similar import parse_blocks, similar_cards
+
+    try:
+        limit = min(int(request.args.get("limit", 10)), 100)
+    except ValueError:
+        return jsonify({"error": "Invalid limit"}), 400
+    try:
+        blocks = parse_blocks(request.args.get("by"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    reprints = request.args.get("includeReprints", "false").lower() == "true"
+
+    results = similar_cards(card_id, max(limit, 1), blocks, reprints)
+    if results is None:
         return jsonify({"error": "Card not found"}), 404
-    return jsonify(serialize_card_full(card))
+    return jsonify({"id": card_id, "by": list(blocks), "count": len(results), "results": results})
+
+
+@bp.route("/cards/<string:card_id>/overview", methods=["GET"])
+@require_auth
+def get_card_overview(card_id):
+    """Full card, latest price and recent history in one call. The timescale
+    queries run in a worker thread while the card is read from the main DB."""
+    days = request.args.get("days", 90, type=int)
+    points = request.args.get("points", 200, type=int)
+    if not 1 <= days <= 3650 or not 3 <= points <= MAX_POINTS:
+        return jsonify({"error": f"days must be 1-3650 and points 3-{MAX_POINTS}"}), 400
+
+    prices = submit_price_block(card_id, days, points)
+    blob = card_blobs.get_many([card_id]).get(card_id)
+    if blob is None:
+        if prices is not None:
+            prices.cancel()
+        return jsonify({"error": "Card not found"}), 404
+    price_block = collect_price_block(prices)
+
+    # Splice the pre-encoded card; keys stay in jsonify's sorted order
+    history = encode_json(price_block["history"]).rstrip(b"\n")
+    latest = encode_json(price_block["latest"]).rstrip(b"\n")
+    return json_response(
+        b'{"card":' + blob + b',"history":' + history + b',"latest":' + latest + b"}\n"
+    )
 
 
 @bp.route("/cards/<string:card_id>/price/history", methods=["GET"])
 @require_auth
+@conditional(_price_validators)
 def get_card_price_history(card_id):
     order = request.args.get("order", "asc").lower()
-    from_ts = _parse_iso(request.args.get("from"))
-    to_ts   = _parse_iso(request.args.get("to"))
+    try:
+        # PriceHistory.time is timestamptz: compare and bucket in UTC
+        from_ts = _parse_utc(request.args.get("from"))
+        to_ts   = _parse_utc(request.args.get("to"))
+    except ValueError:
+        return jsonify({"error": "from and to must be ISO 8601 timestamps"}), 400
     limit   = request.args.get("limit", type=int)
 
+    # Downsampling: fixed buckets (resolution=1d) or at most N points (points=600)
+    resolution = request.args.get("resolution")
+    points = request.args.get("points", type=int)
+    if resolution or points:
+        mode = request.args.get("mode", "bucket" if resolution else "lttb")
+        try:
+            if resolution and points:
+                raise ValueError("Use either resolution or points, not both")
+            if points is not None and not 3 <= points <= MAX_POINTS:
+                raise ValueError(f"points must be between 3 and {MAX_POINTS}")
+            if mode == "bucket":
+                if resolution:
+                    width, origin = parse_resolution(resolution), None
+                else:
+                    width, origin = bucket_width_for(card_id, from_ts, to_ts, points)
+                history = bucketed_history(card_id, from_ts, to_ts, width, origin, order == "desc", limit)
+            elif mode == "lttb" and points:
+                width = None
+                history = lttb_history(card_id, from_ts, to_ts, points, order == "desc", limit)
+            else:
+                raise ValueError("mode must be 'bucket', or 'lttb' together with points")
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        return jsonify({
+            "cardId": card_id,
+            "mode": mode,
+            "resolutionSeconds": width,
+            "count": len(history),
+            "history": history,
+        })
+
+    # Unlimited reads over long windows get one close per day from the daily rollup
+    if not limit and long_range(card_id, from_ts, to_ts, current_app.config["PRICE_HISTORY_RAW_DAYS"]):
+        history = daily_history(card_id, from_ts, to_ts, order == "desc")
+        return jsonify({
+            "cardId": card_id,
+            "resolutionSeconds": 86400,
+            "count": len(history),
+            "history": history,
+        })
+
     q = PriceHistory.query.filter(PriceHistory.cardId == card_id)
     if from_ts:
         q = q.filter(PriceHistory.time >= from_ts)
@@ -416,16 +665,276 @@ def get_card_price_history(card_id):
 
 @bp.route("/cards/<string:card_id>/price/latest", methods=["GET"])
 @require_auth
+@conditional(_price_validators)
 def get_card_price_latest(card_id):
-    row = (PriceHistory.query
-           .filter(PriceHistory.cardId == card_id)
-           .order_by(PriceHistory.time.desc())
-           .first())
-    if not row:
+    entry = latest_prices([card_id]).get(card_id)
+    if not entry:
         return jsonify({"cardId": card_id, "latest": None})
+    return jsonify({"cardId": card_id, **entry})
+
+
+@bp.route("/cards/price/latest", methods=["POST"])
+@require_auth
+def get_cards_price_latest():
+    """Latest price for many cards in one query (or none, with PRICE_LATEST_CACHE)."""
+    data = request.get_json(silent=True)
+
+    if not data or "ids" not in data or not isinstance(data["ids"], list):
+        return jsonify({"error": "Request must include 'ids' as a list"}), 400
+
+    ids = list(dict.fromkeys(str(i) for i in data["ids"] if isinstance(i, str) and i.strip()))
+    if not ids:
+        return jsonify({"error": "No valid IDs provided"}), 400
+    if len(ids) > MAX_LATEST_IDS:
+        return jsonify({"error": f"At most {MAX_LATEST_IDS} IDs per request"}), 400
+
+    found = latest_prices(ids)
+    return jsonify({
+        "count": len(found),
+        "prices": [
+            {"cardId": card_id, **found[card_id]} if card_id in found
+            else {"cardId": card_id, "latest": None}
+            for card_id in ids
+        ]
+    })
+
+
+# --- Collections ---
+
+MAX_COLLECTION_NAME = 200
+_VARIANT_RE = re.compile(r"^[A-Za-z0-9]{1,32}$")
+
+
+def _owned_collection(collection_id):
+    """The caller's collection, or None (other users' collections look missing)."""
+    collection = db.session.get(Collection, collection_id)
+    if collection is None or collection.ownerId != g.user["sub"]:
+        return None
+    return collection
+
+
+def _collection_name(data):
+    name = data.get("name")
+    if not isinstance(name, str) or not name.strip() or len(name) > MAX_COLLECTION_NAME:
+        raise ValueError(f"'name' must be a non-empty string of at most {MAX_COLLECTION_NAME} characters")
+    return name.strip()
+
+
+def _parse_holdings(items):
+    """[{"cardId", "quantity", "variant"}] -> {(cardId, variant): quantity}; later entries win."""
+    if not isinstance(items, list):
+        raise ValueError("'cards' must be a list")
+    limit = current_app.config.get("COLLECTION_MAX_CARDS", 20000)
+    if len(items) > limit:
+        raise ValueError(f"At most {limit} cards per request")
+    holdings = {}
+    for item in items:
+        card_id = item.get("cardId") if isinstance(item, dict) else None
+        if not isinstance(card_id, str) or not card_id.strip():
+            raise ValueError("Each card needs a 'cardId' string")
+        quantity = item.get("quantity", 1)
+        if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity < 0:
+            raise ValueError(f"Invalid quantity for {card_id}")
+        variant = item.get("variant", "normal")
+        if not isinstance(variant, str) or not _VARIANT_RE.match(variant):
+            raise ValueError(f"Invalid variant for {card_id}")
+        holdings[(card_id.strip(), variant)] = quantity
+    return holdings
+
+
+def _save_holdings(collection, holdings, now):
+    """Set quantities (0 removes the entry). Raises ValueError for unknown cards
+    or a collection over COLLECTION_MAX_CARDS entries."""
+    card_ids = list({card_id for card_id, _ in holdings})
+    found = set()
+    for chunk in chunked(card_ids, current_app.config.get("BULK_CHUNK_SIZE", 500)):
+        found.update(db.session.execute(select(Card.id).where(card_id_any(chunk))).scalars())
+    unknown = [card_id for card_id in card_ids if card_id not in found]
+    if unknown:
+        raise ValueError(f"Unknown card IDs: {', '.join(unknown[:20])}" + (" ..." if len(unknown) > 20 else ""))
+
+    rows = [{"collectionId": collection.id, "cardId": card_id, "variant": variant,
+             "quantity": quantity, "addedAt": now}
+            for (card_id, variant), quantity in holdings.items() if quantity > 0]
+    for chunk in chunked(rows, 1000):
+        stmt = insert(CollectionCard).values(chunk)
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=["collectionId", "cardId", "variant"],
+            set_={"quantity": stmt.excluded.quantity},
+        ))
+    removed = [key for key, quantity in holdings.items() if quantity == 0]
+    for chunk in chunked(removed, 1000):
+        db.session.execute(delete(CollectionCard).where(
+            CollectionCard.collectionId == collection.id,
+            tuple_(CollectionCard.cardId, CollectionCard.variant).in_(chunk),
+        ))
+
+    limit = current_app.config.get("COLLECTION_MAX_CARDS", 20000)
+    total = db.session.execute(
+        select(func.count()).where(CollectionCard.collectionId == collection.id)
+    ).scalar()
+    if total > limit:
+        raise ValueError(f"A collection holds at most {limit} entries")
+    collection.updatedAt = now
+
+
+def _collection_summary(collection, entries=None, quantity=None):
+    if entries is None:
+        entries, quantity = db.session.execute(
+            select(func.count(), func.coalesce(func.sum(CollectionCard.quantity), 0))
+            .where(CollectionCard.collectionId == collection.id)
+        ).one()
+    return {
+        "id": collection.id,
+        "name": collection.name,
+        "entries": entries,
+        "quantity": int(quantity or 0),
+        "createdAt": collection.createdAt.isoformat() if collection.createdAt else None,
+        "updatedAt": collection.updatedAt.isoformat() if collection.updatedAt else None,
+    }
+
+
+@bp.route("/collections", methods=["GET"])
+@require_auth
+def list_collections():
+    rows = db.session.execute(
+        select(Collection, func.count(CollectionCard.cardId), func.sum(CollectionCard.quantity))
+        .outerjoin(CollectionCard, CollectionCard.collectionId == Collection.id)
+        .where(Collection.ownerId == g.user["sub"])
+        .group_by(Collection.id)
+        .order_by(Collection.createdAt, Collection.id)
+    ).all()
     return jsonify({
-        "cardId": row.cardId,
-        "time": row.time.isoformat(),
-        "averageSellPrice": row.averageSellPrice,
-        "source": row.source or "unknown",
-    })
\ No newline at end of file
+        "count": len(rows),
+        "collections": [_collection_summary(c, entries, quantity) for c, entries, quantity in rows],
+    })
+
+
+@bp.route("/collections", methods=["POST"])
+@require_auth
+def create_collection():
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "Request body must be a JSON object"}), 400
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    try:
+        collection = Collection(id=str(uuid.uuid4()), ownerId=g.user["sub"], name=_collection_name(data),
+                                createdAt=now, updatedAt=now)
+        db.session.add(collection)
+        db.session.flush()
+        _save_holdings(collection, _parse_holdings(data.get("cards", [])), now)
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 400
+    db.session.commit()
+    return jsonify(_collection_summary(collection)), 201
+
+
+@bp.route("/collections/<string:collection_id>", methods=["GET"])
+@require_auth
+def get_collection(collection_id):
+    collection = _owned_collection(collection_id)
+    if collection is None:
+        return jsonify({"error": "Collection not found"}), 404
+    rows = db.session.execute(
+        select(CollectionCard.cardId, CollectionCard.variant, CollectionCard.quantity, CollectionCard.addedAt)
+        .where(CollectionCard.collectionId == collection.id)
+        .order_by(CollectionCard.cardId, CollectionCard.variant)
+    ).all()
+    return jsonify({
+        **_collection_summary(collection, len(rows), sum(r.quantity for r in rows)),
+        "cards": [
+            {"cardId": r.cardId, "variant": r.variant, "quantity": r.quantity,
+             "addedAt": r.addedAt.isoformat() if r.addedAt else None}
+            for r in rows
+        ],
+    })
+
+
+@bp.route("/collections/<string:collection_id>", methods=["PATCH"])
+@require_auth
+def rename_collection(collection_id):
+    collection = _owned_collection(collection_id)
+    if collection is None:
+        return jsonify({"error": "Collection not found"}), 404
+    try:
+        collection.name = _collection_name(request.get_json(silent=True) or {})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    collection.updatedAt = datetime.now(timezone.utc).replace(tzinfo=None)
+    db.session.commit()
+    return jsonify(_collection_summary(collection))
+
+
+@bp.route("/collections/<string:collection_id>", methods=["DELETE"])
+@require_auth
+def delete_collection(collection_id):
+    collection = _owned_collection(collection_id)
+    if collection is None:
+        return jsonify({"error": "Collection not found"}), 404
+    db.session.delete(collection)
+    db.session.commit()
+    return "", 204
+
+
+@bp.route("/collections/<string:collection_id>/cards", methods=["PUT"])
+@require_auth
+def update_collection_cards(collection_id):
+    """Set the quantity of each listed card/variant; quantity 0 removes it."""
+    collection = _owned_collection(collection_id)
+    if collection is None:
+        return jsonify({"error": "Collection not found"}), 404
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or "cards" not in data:
+        return jsonify({"error": "Request must include 'cards' as a list"}), 400
+    try:
+        _save_holdings(collection, _parse_holdings(data["cards"]), datetime.now(timezone.utc).replace(tzinfo=None))
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 400
+    db.session.commit()
+    return jsonify(_collection_summary(collection))
+
+
+@bp.route("/collections/<string:collection_id>/cards/<string:card_id>", methods=["DELETE"])
+@require_auth
+def remove_collection_card(collection_id, card_id):
+    """Remove a card (one variant with ?variant=, otherwise all of them)."""
+    collection = _owned_collection(collection_id)
+    if collection is None:
+        return jsonify({"error": "Collection not found"}), 404
+    q = delete(CollectionCard).where(CollectionCard.collectionId == collection.id, CollectionCard.cardId == card_id)
+    if request.args.get("variant"):
+        q = q.where(CollectionCard.variant == request.args["variant"])
+    if db.session.execute(q).rowcount == 0:
+        db.session.rollback()
+        return jsonify({"error": "Card not in collection"}), 404
+    collection.updatedAt = datetime.now(timezone.utc).replace(tzinfo=None)
+    db.session.commit()
+    return "", 204
+
+
+@bp.route("/collections/<string:collection_id>/value", methods=["GET"])
+@require_auth
+def get_collection_value(collection_id):
+    """Daily value of the collection, from one price-history query for all its cards."""
+    collection = _owned_collection(collection_id)
+    if collection is None:
+        return jsonify({"error": "Collection not found"}), 404
+    if "timescale" not in db.engines:
+        return jsonify({"error": "Price history is not configured (TIMESCALE_URL)"}), 503
+    days = request.args.get("days", 90, type=int)
+    movers = request.args.get("movers", 5, type=int)
+    if not 1 <= days <= 3650 or not 0 <= movers <= 50:
+        return jsonify({"error": "days must be 1-3650 and movers 0-50"}), 400
+
+    # NumPy is imported with the first valuation (or by STARTUP_WARMUP), not at startup
+    from .valuation import collection_value, daily_closes
+
+    # Price history is per card, so variants of one card are valued together
+    holdings = dict(db.session.execute(
+        select(CollectionCard.cardId, func.sum(CollectionCard.quantity))
+        .where(CollectionCard.collectionId == collection.id)
+        .group_by(CollectionCard.cardId)
+    ).all())
+    return jsonify({"collectionId": collection.id, **collection_value(holdings, days, movers, closes=daily_closes)})
@@ -0,0 +1,243 @@
+# app/search.py
+import heapq
+import re
+import threading
+import unicodedata
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from flask import current_app
+from sqlalchemy import func, or_, select
+from .catalog import CatalogSnapshot
+from .db import db
+from .models import Card, CardSet
+
+FIELDS = ("name", "artist", "set")
+FIELD_WEIGHTS = {"name": 1.0, "set": 0.5, "artist": 0.4}
+
+# Match quality per query token
+EXACT, PREFIX, FUZZY = 1.0, 0.7, 0.5
+MAX_PREFIX_TERMS = 200     # expansions for very short prefixes
+MAX_FUZZY_TERMS = 10
+MIN_SIMILARITY = 0.3       # same default threshold as pg_trgm
+
+_TOKEN_RE = re.compile(r"[^\W_]+")
+
+
+def normalize(text: str) -> str:
+    """Case- and accent-folded text ("Pokémon" -> "pokemon")."""
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in text if not unicodedata.combining(c)).casefold()
+
+
+def tokenize(text: str | None) -> list[str]:
+    return _TOKEN_RE.findall(normalize(text or ""))
+
+
+def trigrams(term: str) -> set[str]:
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    """Token postings per field, a sorted term list for prefix lookups and trigram
+    postings over terms for typo-tolerant matching."""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.ids = []          # doc -> card id
+        self.names = []        # doc -> card name
+        self.name_keys = []    # doc -> normalized name, for whole-name bonuses
+        self.doc_terms = []    # doc -> {field: tokens}, to undo postings on update
+        self.doc_of = {}       # card id -> doc
+        self.postings = {f: defaultdict(set) for f in FIELDS}
+        self.term_grams = {f: defaultdict(set) for f in FIELDS}
+        self.terms = {f: [] for f in FIELDS}
+        self.watermark = None  # newest Card.updatedAt indexed
+
+    def __len__(self):
+        return len(self.doc_of)
+
+    # --- Building ---
+
+    def add(self, card_id, name, artist, set_name):
+        doc = self.doc_of.get(card_id)
+        if doc is None:
+            doc = len(self.ids)
+            self.doc_of[card_id] = doc
+            self.ids.append(card_id)
+            self.names.append(None)
+            self.name_keys.append(None)
+            self.doc_terms.append({})
+        else:
+            self._remove_postings(doc)
+
+        terms = {"name": tokenize(name), "artist": tokenize(artist), "set": tokenize(set_name)}
+        self.names[doc] = name
+        self.name_keys[doc] = " ".join(terms["name"])
+        self.doc_terms[doc] = terms
+        for field, tokens in terms.items():
+            for token in tokens:
+                docs = self.postings[field][token]
+                if not docs:
+                    for gram in trigrams(token):
+                        self.term_grams[field][gram].add(token)
+                docs.add(doc)
+
+    def _remove_postings(self, doc):
+        for field, tokens in self.doc_terms[doc].items():
+            for token in tokens:
+                docs = self.postings[field].get(token)
+                if docs is None:
+                    continue
+                docs.discard(doc)
+                if not docs:
+                    del self.postings[field][token]
+                    for gram in trigrams(token):
+                        self.term_grams[field][gram].discard(token)
+
+    def finish(self):
+        for field in FIELDS:
+            self.terms[field] = sorted(self.postings[field])
+
+    # --- Querying ---
+
+    def _prefixed(self, field, token):
+        terms = self.terms[field]
+        i = bisect_left(terms, token)
+        end = min(len(terms), i + MAX_PREFIX_TERMS)
+        while i < end and terms[i].startswith(token):
+            yield terms[i]
+            i += 1
+
+    def _similar(self, field, token):
+        grams = trigrams(token)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self.term_grams[field].get(gram, ()))
+        scored = []
+        for term, common in shared.items():
+            similarity = common / (len(grams) + len(trigrams(term)) - common)
+            if similarity >= MIN_SIMILARITY:
+                scored.append((similarity, term))
+        return heapq.nlargest(MAX_FUZZY_TERMS, scored)
+
+    def _match(self, token, fields):
+        """doc -> best score for one query token across the requested fields."""
+        matched = {}
+
+        def hit(docs, score):
+            for doc in docs:
+                if matched.get(doc, 0.0) < score:
+                    matched[doc] = score
+
+        for field in fields:
+            weight = FIELD_WEIGHTS[field]
+            for term in self._prefixed(field, token):
+                hit(self.postings[field][term], weight * (EXACT if term == token else PREFIX))
+        if not matched:
+            for field in fields:
+                weight = FIELD_WEIGHTS[field]
+                for similarity, term in self._similar(field, token):
+                    hit(self.postings[field][term], weight * FUZZY * similarity)
+        return matched
+
+    def search(self, query: str, limit: int = 20, fields=("name",)):
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        with self.lock:
+            scores = None
+            for token in tokens:
+                matched = self._match(token, fields)
+                # Every query token has to match something (AND semantics)
+                scores = matched if scores is None else {
+                    doc: score + matched[doc] for doc, score in scores.items() if doc in matched
+                }
+                if not scores:
+                    return []
+
+            phrase = " ".join(tokens)
+
+            def rank(doc):
+                score = scores[doc]
+                if self.name_keys[doc] == phrase:
+                    score += 2.0
+                elif self.name_keys[doc].startswith(phrase):
+                    score += 1.0
+                return score, -len(self.names[doc] or "")
+
+            top = heapq.nlargest(limit, scores, key=rank)
+            return [
+                {"id": self.ids[doc], "name": self.names[doc], "score": round(rank(doc)[0], 4)}
+                for doc in top
+            ]
+
+
+def _catalog_rows(since=None):
+    q = (select(Card.id, Card.name, Card.artist, CardSet.name, Card.updatedAt)
+         .select_from(Card)
+         .outerjoin(Card.set))
+    if since is not None:
+        q = q.where(Card.updatedAt >= since)
+    return db.session.execute(q)
+
+
+def _index_rows(index, rows):
+    for card_id, name, artist, set_name, updated_at in rows:
+        index.add(card_id, name, artist, set_name)
+        if updated_at is not None and (index.watermark is None or updated_at > index.watermark):
+            index.watermark = updated_at
+    index.finish()
+
+
+def _build(previous):
+    # Incremental: re-index only cards updated since the last build. If the
+    # catalog's IDs then differ from the indexed ones (cards deleted, or added
+    # with an older updatedAt), rebuild from scratch.
+    if previous is not None and previous.watermark is not None:
+        with previous.lock:
+            _index_rows(previous, _catalog_rows(since=previous.watermark))
+        ids = set(db.session.execute(select(Card.id)).scalars())
+        if ids == previous.doc_of.keys():
+            return previous
+
+    index = SearchIndex()
+    _index_rows(index, _catalog_rows())
+    return index
+
+
+index_snapshot = CatalogSnapshot(_build)
+
+
+def search_pg_trgm(query: str, limit: int = 20, fields=("name",)):
+    """Database-side alternative; needs the pg_trgm extension and trigram indexes."""
+    columns = {"name": Card.name, "artist": Card.artist, "set": CardSet.name}
+    similarity = func.greatest(*[func.similarity(columns[f], query) for f in fields])
+    prefix = Card.name.ilike(query.replace("%", r"\%").replace("_", r"\_") + "%")
+    rows = db.session.execute(
+        select(Card.id, Card.name, similarity.label("score"))
+        .select_from(Card)
+        .outerjoin(Card.set)
+        .where(or_(prefix, *[columns[f].op("%")(query) for f in fields]))
+        .order_by(prefix.desc(), similarity.desc(), Card.id)
+        .limit(limit)
+    )
+    return [{"id": r.id, "name": r.name, "score": round(r.score or 0.0, 4)} for r in rows]
+
+
+def search_cards(query: str, limit: int = 20, fields=("name",)):
+    if current_app.config.get("SEARCH_BACKEND") == "pg_trgm":
+        return search_pg_trgm(query, limit, fields)
+    return index_snapshot.get().search(query, limit, fields)
+
+
+def init_app(app):
+    # Build the in-memory index in the background so startup isn't blocked
+    if app.config.get("SEARCH_WARMUP") and app.config.get("SEARCH_BACKEND") != "pg_trgm":
+        def warm():
+            with app.app_context():
+                try:
+                    index_snapshot.get()
+                except Exception as e:
+                    app.logger.warning("Search index warm-up failed: %s", e)
+        threading.Thread(target=warm, name="search-warmup", daemon=True).start()
@@ -0,0 +1,226 @@
+# app/similar.py
+""""Cards like this one" from an in-memory feature matrix.
+
+Every card is a row of float32 features in blocks:
+
+- types:    Card.types, one-hot
+- subtypes: supertype and Card.subtypes, one-hot
+- stats:    HP, converted retreat cost and mean attack energy cost, each as
+            Gaussian bumps over fixed bins, so nearby values overlap
+- attacks:  energy types across the card's attack costs (the cost profile)
+- matchups: Weakness and Resistance types, one-hot
+- price:    log Cardmarket price (Card.marketPrice) as bumps over price bands
+
+Each block is normalized to length sqrt(weight), so the cosine of two rows is
+the weighted sum of the per-block cosines over sqrt(A's block weights x B's).
+Blocks neither card has drop out; a block only one of them has lowers the score.
+Evolution line membership (following evolvesFrom back to the basic) counts as
+one more block without taking matrix columns: an exact match or nothing.
+
+A query is one matrix-vector product over the selected blocks' columns
+(only those where the card's own row is nonzero), then argpartition for the
+top k. The matrix is a CatalogSnapshot, so it is
+rebuilt when ImportMetadata.importedAt advances.
+"""
+import itertools
+import math
+import numpy as np
+from sqlalchemy import func, select
+from .catalog import CatalogSnapshot
+from .db import db
+from .models import Attack, Card, Resistance, Weakness
+
+BLOCK_WEIGHTS = {
+    "types": 1.0,
+    "subtypes": 1.0,
+    "stats": 1.0,
+    "attacks": 1.0,
+    "matchups": 0.5,
+    "price": 1.0,
+    "evolution": 1.0,
+}
+BLOCKS = tuple(BLOCK_WEIGHTS)
+
+# (first bin center, last bin center, spacing); a bump is one spacing wide
+HP_BINS = (0, 340, 20)
+RETREAT_BINS = (0, 5, 1)
+ENERGY_BINS = (0, 5, 1)
+PRICE_BINS = (-2.0, 3.0, 0.25)   # log10 of the price: $0.01 to $1000
+BUMP_CUTOFF = 1e-3               # about 3.7 bin spacings from the value
+
+
+def _centers(bins):
+    first, last, step = bins
+    return np.arange(first, last + step / 2, step, dtype=np.float64)
+
+
+def _bumps(values, bins):
+    """(n, bins) Gaussian bumps around each value; rows of NaN values are zero."""
+    centers = _centers(bins)
+    out = np.exp(-0.5 * ((values[:, None] - centers[None, :]) / bins[2]) ** 2)
+    # Drop the far tails: sparse query vectors touch fewer matrix columns
+    out[(out < BUMP_CUTOFF) | np.isnan(values)[:, None]] = 0.0
+    return out
+
+
+class _Vocabulary(dict):
+    """Term -> column index, in first-seen order."""
+
+    def __missing__(self, term):
+        self[term] = index = len(self)
+        return index
+
+
+def _one_hot(pairs, n):
+    """(n, terms) counts of each term per row, from (row, term) pairs."""
+    vocabulary = _Vocabulary()
+    cells = [(row, vocabulary[term]) for row, term in pairs]
+    out = np.zeros((n, len(vocabulary)), dtype=np.float64)
+    if cells:
+        r, c = np.array(cells).T
+        np.add.at(out, (r, c), 1.0)
+    return out
+
+
+def _evolution_roots(names, evolves_from):
+    """Index of each card's evolution line (-1 for cards outside one): the basic
+    reached by following evolvesFrom by name."""
+    parent = {}
+    for name, source in zip(names, evolves_from):
+        if source and name not in parent:
+            parent[name] = source
+    in_line = set(parent) | set(parent.values())
+
+    def root(name):
+        seen = set()
+        while name in parent and name not in seen:
+            seen.add(name)
+            name = parent[name]
+        return name
+
+    lines = _Vocabulary()
+    return np.array([lines[root(name)] if name in in_line else -1 for name in names], dtype=np.int32)
+
+
+class SimilarityIndex:
+    def __init__(self, ids, names, blocks, line):
+        self.ids = ids
+        self.row_of = {card_id: row for row, card_id in enumerate(ids)}
+        _, self.name_codes = np.unique(names, return_inverse=True)
+        self.names = names
+        self.line = line
+        self.columns = {}
+        matrices, start = [], 0
+        for name, values in blocks.items():
+            self.columns[name] = slice(start, start + values.shape[1])
+            start += values.shape[1]
+            matrices.append(values)
+        # Column-major, so a query reads only the columns where its own row is nonzero
+        self.matrix = np.asfortranarray(np.hstack(matrices), dtype=np.float32)
+        # Which blocks each card has (row x block), for the norms of any block subset
+        self.present = np.stack(
+            [np.any(self.matrix[:, self.columns[b]] != 0, axis=1) for b in self.columns]
+            + [line >= 0], axis=1).astype(np.float32)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def similar(self, card_id, limit: int = 10, blocks=BLOCKS, reprints: bool = False):
+        """[{"id", "name", "score"}] of the `limit` cards most like `card_id`, best
+        first, or None for an unknown card. Other printings of the same name are
+        skipped unless `reprints`."""
+        row = self.row_of.get(card_id)
+        if row is None:
+            return None
+        selected = np.array([b in blocks for b in BLOCKS], dtype=np.float32)
+        weights = selected * np.array([BLOCK_WEIGHTS[b] for b in BLOCKS], dtype=np.float32)
+
+        query = np.zeros(self.matrix.shape[1], dtype=np.float32)
+        for b, cols in self.columns.items():
+            if b in blocks:
+                query[cols] = self.matrix[row, cols]
+        columns = np.flatnonzero(query)
+        dots = self.matrix[:, columns] @ query[columns]
+        if "evolution" in blocks and self.line[row] >= 0:
+            dots += BLOCK_WEIGHTS["evolution"] * (self.line == self.line[row])
+        # Cosine over the blocks both cards have, never dividing by zero
+        norms = np.sqrt(self.present @ weights * (self.present[row] @ weights))
+        scores = np.divide(dots, norms, out=np.zeros_like(dots), where=norms > 0)
+
+        scores[row] = -np.inf
+        if not reprints:
+            scores[self.name_codes == self.name_codes[row]] = -np.inf
+        k = min(limit, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [
+            {"id": self.ids[i], "name": self.names[i], "score": round(float(scores[i]), 4)}
+            for i in top if scores[i] > 0
+        ]
+
+
+def _block(values, weight):
+    """Rows scaled to length sqrt(weight); all-zero rows stay zero."""
+    norms = np.linalg.norm(values, axis=1, keepdims=True)
+    return np.divide(values, norms, out=np.zeros_like(values), where=norms > 0) * math.sqrt(weight)
+
+
+def _build(previous):
+    cards = db.session.execute(
+        select(Card.id, Card.name, Card.supertype, Card.hpNum, Card.convertedRetreatCost,
+               Card.evolvesFrom, Card.marketPrice).order_by(Card.id)
+    ).all()
+    ids = [c.id for c in cards]
+    row_of = {card_id: row for row, card_id in enumerate(ids)}
+    n = len(ids)
+
+    def terms(*queries):
+        """(row, term) pairs, skipping NULL and empty terms (a 0 is a value);
+        arrays are unnested by the database."""
+        for q in queries:
+            for card_id, term in db.session.execute(q):
+                if term is not None and term != "" and card_id in row_of:
+                    yield row_of[card_id], term
+
+    def column(values):
+        return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+
+    hp = column(c.hpNum for c in cards)
+    retreat = column(c.convertedRetreatCost for c in cards)
+    mean_energy = np.full(n, np.nan)
+    for row, cost in terms(select(Attack.cardId, func.avg(Attack.convertedEnergyCost)).group_by(Attack.cardId)):
+        mean_energy[row] = cost
+    price = column(c.marketPrice if c.marketPrice and c.marketPrice > 0 else None for c in cards)
+
+    blocks = {
+        "types": _one_hot(terms(select(Card.id, func.unnest(Card.types))), n),
+        "subtypes": _one_hot(itertools.chain(((row, c.supertype) for row, c in enumerate(cards) if c.supertype),
+                                             terms(select(Card.id, func.unnest(Card.subtypes)))), n),
+        "stats": np.hstack([_block(_bumps(hp, HP_BINS), 1.0), _block(_bumps(retreat, RETREAT_BINS), 1.0),
+                            _block(_bumps(mean_energy, ENERGY_BINS), 1.0)]),
+        "attacks": _one_hot(terms(select(Attack.cardId, func.unnest(Attack.cost))), n),
+        "matchups": _one_hot(terms(select(Weakness.cardId, "weak:" + Weakness.type),
+                                   select(Resistance.cardId, "resist:" + Resistance.type)), n),
+        "price": _bumps(np.log10(price), PRICE_BINS),
+    }
+    blocks = {name: _block(values, BLOCK_WEIGHTS[name]) for name, values in blocks.items()}
+    names = np.array([c.name or "" for c in cards], dtype=object)
+    line = _evolution_roots([c.name for c in cards], [c.evolvesFrom for c in cards])
+    return SimilarityIndex(ids, names, blocks, line)
+
+
+similarity_snapshot = CatalogSnapshot(_build)
+
+
+def parse_blocks(value: str | None):
+    """Blocks named in a comma-separated `by` parameter (default: all)."""
+    if not value:
+        return BLOCKS
+    blocks = tuple(b for b in value.split(",") if b)
+    if not blocks or any(b not in BLOCK_WEIGHTS for b in blocks):
+        raise ValueError(f"by must be a subset of {', '.join(BLOCKS)}")
+    return blocks
+
+
+def similar_cards(card_id, limit: int = 10, blocks=BLOCKS, reprints: bool = False):
+    return similarity_snapshot.get().similar(card_id, limit, blocks, reprints)
@@ -0,0 +1,175 @@
+# app/snapshots.py
+"""Price snapshots into the timescale bind's PriceHistory, and its Timescale upkeep.
+
+`flask snapshot-prices` streams the current Cardmarket (or TCGplayer) prices out
+of the catalog with a server-side cursor and writes them in batches: each batch
+is COPYed into a temporary table and inserted with ON CONFLICT ("cardId", time)
+DO NOTHING. Snapshot times are truncated to --interval, so running the job twice
+in one interval writes nothing the second time.
+
+`flask install-price-rollups` turns on PriceHistory compression and creates the
+daily/weekly continuous aggregates that bucketed history reads use (see
+prices.ROLLUPS). It needs the timescaledb extension and PriceHistory as a hypertable.
+"""
+import csv
+import io
+import time
+from datetime import datetime, timezone
+import click
+from sqlalchemy import func, select
+from .db import db
+from .models import CardMarket, TcgPlayer, TcgPlayerPrices
+from .prices import ROLLUPS, parse_resolution, reset_rollups, timescale_available
+
+SOURCES = ("cardmarket", "tcgplayer")
+
+
+def source_query(source: str):
+    """(cardId, price) for every card with a current price from `source`."""
+    if source == "cardmarket":
+        price = CardMarket.averageSellPrice
+        return select(CardMarket.cardId, price).where(CardMarket.cardId.isnot(None), price.isnot(None))
+    if source == "tcgplayer":
+        price = func.coalesce(TcgPlayerPrices.normalMarket, TcgPlayerPrices.holofoilMarket,
+                              TcgPlayerPrices.reverseHolofoilMarket)
+        return (select(TcgPlayer.cardId, price)
+                .join(TcgPlayerPrices, TcgPlayer.pricesId == TcgPlayerPrices.id)
+                .where(TcgPlayer.cardId.isnot(None), price.isnot(None)))
+    raise ValueError(f"Unknown price source: {source}")
+
+
+def snapshot_time(at: datetime, width: int) -> datetime:
+    """`at` truncated to a multiple of `width` seconds since the Unix epoch (UTC)."""
+    if at.tzinfo is None:
+        at = at.replace(tzinfo=timezone.utc)
+    return datetime.fromtimestamp(at.timestamp() // width * width, timezone.utc)
+
+
+def _write_batch(cursor, rows, at: datetime, source: str) -> int:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    stamp = at.isoformat()
+    for card_id, price in rows:
+        writer.writerow([card_id, stamp, repr(float(price)), source])
+    buf.seek(0)
+    cursor.execute('TRUNCATE "stage_PriceHistory"')
+    cursor.copy_expert('COPY "stage_PriceHistory" ("cardId", time, "averageSellPrice", source) '
+                       "FROM STDIN WITH (FORMAT csv)", buf)
+    cursor.execute('INSERT INTO "PriceHistory" ("cardId", time, "averageSellPrice", source) '
+                   'SELECT "cardId", time, "averageSellPrice", source FROM "stage_PriceHistory" '
+                   'ON CONFLICT ("cardId", time) DO NOTHING')
+    return cursor.rowcount
+
+
+def snapshot_prices(source: str = "cardmarket", at: datetime | None = None,
+                    interval: int = 86400, batch_size: int = 5000) -> dict:
+    """Write one PriceHistory row per priced card at `at` (default now) truncated
+    to `interval` seconds. Returns counters."""
+    stamp = snapshot_time(at or datetime.now(timezone.utc), interval)
+    query = source_query(source)
+    stats = {"time": stamp, "read": 0, "inserted": 0}
+
+    target = db.engines["timescale"].raw_connection()
+    try:
+        with target.cursor() as cursor:
+            cursor.execute('CREATE TEMP TABLE IF NOT EXISTS "stage_PriceHistory" AS '
+                           'SELECT "cardId", time, "averageSellPrice", source FROM "PriceHistory" WITH NO DATA')
+        # Server-side cursor: the catalog is read batch_size rows at a time
+        with db.engine.connect() as conn:
+            result = conn.execution_options(stream_results=True, max_row_buffer=batch_size).execute(query)
+            for rows in result.partitions(batch_size):
+                with target.cursor() as cursor:
+                    stats["inserted"] += _write_batch(cursor, rows, stamp, source)
+                target.commit()
+                stats["read"] += len(rows)
+    except Exception:
+        target.rollback()
+        raise
+    finally:
+        target.close()
+    return stats
+
+
+def rollup_statements(name: str, width: int):
+    """Continuous aggregate `name` over `width`-second buckets, and its refresh policy."""
+    days = width // 86400
+    schedule = "1 hour" if days == 1 else "1 day"
+    return [
+        f'CREATE MATERIALIZED VIEW IF NOT EXISTS "{name}" '
+        "WITH (timescaledb.continuous, timescaledb.materialized_only = false) AS "
+        f"SELECT \"cardId\", time_bucket(INTERVAL '{days} days', time) AS bucket, "
+        'first("averageSellPrice", time) AS open, max("averageSellPrice") AS high, '
+        'min("averageSellPrice") AS low, last("averageSellPrice", time) AS close, '
+        'sum("averageSellPrice") AS total, count(*) AS count '
+        'FROM "PriceHistory" WHERE "averageSellPrice" IS NOT NULL '
+        "GROUP BY \"cardId\", bucket WITH NO DATA",
+        # Re-materialize the last few buckets; anything newer is read live (materialized_only = false)
+        f"SELECT add_continuous_aggregate_policy('\"{name}\"', "
+        f"start_offset => INTERVAL '{3 * days} days', end_offset => INTERVAL '1 hour', "
+        f"schedule_interval => INTERVAL '{schedule}', if_not_exists => true)",
+    ]
+
+
+def install_rollups(compress_after_days: int | None = 7, refresh: bool = True):
+    """Compression policy plus the ROLLUPS continuous aggregates. Safe to re-run."""
+    if not timescale_available():
+        raise click.ClickException("The timescale bind does not have the timescaledb extension")
+    engine = db.engines["timescale"]
+    # Continuous aggregates can't be refreshed inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        compressed = conn.exec_driver_sql(
+            "SELECT compression_enabled FROM timescaledb_information.hypertables "
+            "WHERE hypertable_name = 'PriceHistory'"
+        ).scalar()
+        if compressed is None:
+            raise click.ClickException('"PriceHistory" is not a hypertable (see create_hypertable)')
+        if compress_after_days:
+            if not compressed:
+                conn.exec_driver_sql(
+                    'ALTER TABLE "PriceHistory" SET (timescaledb.compress, '
+                    "timescaledb.compress_segmentby = '\"cardId\"', timescaledb.compress_orderby = 'time DESC')"
+                )
+            conn.exec_driver_sql(
+                f"SELECT add_compression_policy('\"PriceHistory\"', INTERVAL '{int(compress_after_days)} days', "
+                "if_not_exists => true)"
+            )
+        for name, width in ROLLUPS:
+            for statement in rollup_statements(name, width):
+                conn.exec_driver_sql(statement)
+            if refresh:
+                conn.exec_driver_sql(f"CALL refresh_continuous_aggregate('\"{name}\"', NULL, NULL)")
+    reset_rollups()
+
+
+def init_app(app):
+    @app.cli.command("snapshot-prices")
+    @click.option("--source", type=click.Choice(SOURCES), default="cardmarket", show_default=True,
+                  help="cardmarket: CardMarket.averageSellPrice; tcgplayer: the normal/holofoil/reverse market price.")
+    @click.option("--at", "at", help="Snapshot time (ISO 8601, default now); truncated to --interval.")
+    @click.option("--interval", default="1d", show_default=True, help="Snapshot granularity: 1h, 1d, ...")
+    @click.option("--batch-size", default=5000, show_default=True, help="Rows per COPY/insert transaction.")
+    def snapshot_prices_command(source, at, interval, batch_size):
+        """Append current catalog prices to PriceHistory (idempotent per interval)."""
+        if "timescale" not in db.engines:
+            raise click.ClickException("TIMESCALE_URL is not set")
+        try:
+            width = parse_resolution(interval)
+            when = datetime.fromisoformat(at.replace("Z", "+00:00")) if at else None
+        except ValueError as e:
+            raise click.ClickException(str(e)) from None
+        started = time.perf_counter()
+        stats = snapshot_prices(source, when, width, max(1, batch_size))
+        click.echo(f"Snapshot {stats['time'].isoformat()} ({source}): {stats['read']} prices read, "
+                   f"{stats['inserted']} rows inserted in {time.perf_counter() - started:.1f}s")
+
+    @app.cli.command("install-price-rollups")
+    @click.option("--compress-after", default=7, show_default=True,
+                  help="Compress PriceHistory chunks older than this many days (0 = no compression policy).")
+    @click.option("--no-refresh", is_flag=True, help="Create the aggregates without materializing existing history.")
+    def install_price_rollups(compress_after, no_refresh):
+        """Enable PriceHistory compression and the daily/weekly continuous aggregates."""
+        if "timescale" not in db.engines:
+            raise click.ClickException("TIMESCALE_URL is not set")
+        install_rollups(compress_after or None, refresh=not no_refresh)
+        click.echo(f"Installed {', '.join(name for name, _ in ROLLUPS)}"
+                   + (f"; compressing chunks after {compress_after} days" if compress_after else ""))
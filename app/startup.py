@@ -0,0 +1,187 @@
+# app/startup.py
+"""Startup warm-up, fork handling and cold-start timings.
+
+With STARTUP_WARMUP=1, create_app does before the first request what that
+request would otherwise pay for: importing google-auth and NumPy, fetching
+Google's signing certificates and building the in-memory indexes (facets,
+search, latest prices, valuation closes). Under `gunicorn --preload` this happens once in the
+master, and the workers share the result copy-on-write.
+
+Connections never cross a fork. A forked child drops its inherited pools
+without closing them (their sockets belong to the parent). The parent keeps
+its pools: a worker that forks (multiprocessing, libraries) goes on serving
+with them. Only the gunicorn master closes its connections, in the pre_fork
+hook, since it serves nothing. POOL_PREWARM connections per bind are opened
+by create_app, and again in each gunicorn worker by the post_fork hook
+(both hooks are imported by gunicorn.conf.py); other forks don't pre-warm
+anything.
+"""
+import logging
+import os
+import time
+import weakref
+from contextlib import contextmanager
+import click
+from .db import db
+from .metrics import registry
+
+log = logging.getLogger("app.startup")
+
+
+def _warm_google_auth(app):
+    from .auth import certs_cache
+    certs_cache.get()
+
+
+def _warm_numpy(app):
+    from . import valuation  # noqa: F401
+
+
+def _warm_facets(app):
+    from .facets import get_facets
+    get_facets()
+
+
+def _warm_search(app):
+    if app.config.get("SEARCH_BACKEND") != "pg_trgm":
+        from .search import index_snapshot
+        index_snapshot.get()
+
+
+def _warm_similar(app):
+    from .similar import similarity_snapshot
+    similarity_snapshot.get()
+
+
+def _warm_latest_prices(app):
+    if app.config.get("PRICE_LATEST_CACHE") and "timescale" in db.engines:
+        from .prices import latest_price_map
+        latest_price_map.refresh()
+
+
+def _warm_valuation(app):
+    if app.config.get("VALUATION_CACHE_DAYS") and "timescale" in db.engines:
+        from .valuation import daily_closes
+        daily_closes.warm()
+
+
+# In order; each one is skipped once the STARTUP_WARMUP_BUDGET has been spent
+WARMERS = (
+    ("google_auth", _warm_google_auth),
+    ("numpy", _warm_numpy),
+    ("facets", _warm_facets),
+    ("search", _warm_search),
+    ("similar", _warm_similar),
+    ("latest_prices", _warm_latest_prices),
+    ("valuation", _warm_valuation),
+)
+
+
+@contextmanager
+def timed_phase(name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.startup[name] = time.perf_counter() - started
+
+
+def warm_pools(app, per_bind: int):
+    """Open up to `per_bind` pooled connections on every bind and return them to the pool."""
+    with app.app_context():
+        for bind, engine in db.engines.items():
+            size = getattr(engine.pool, "size", None)
+            count = min(per_bind, size()) if size else per_bind
+            with timed_phase(f"pool_{bind or 'default'}"):
+                connections = []
+                try:
+                    for _ in range(count):
+                        connections.append(engine.connect())
+                except Exception as e:
+                    # e.g. a read replica that is down; requests fall back without it
+                    log.warning("Could not pre-warm the %s pool: %s", bind or "default", e)
+                finally:
+                    for connection in connections:
+                        connection.close()
+
+
+def warm_caches(app, budget: float):
+    """Run WARMERS in order until `budget` seconds have passed. Failures are logged, never raised."""
+    started = time.perf_counter()
+    with app.app_context():
+        for name, warm in WARMERS:
+            if time.perf_counter() - started > budget:
+                log.warning("Startup warm-up budget (%.1f s) spent; skipping %s", budget, name)
+                continue
+            with timed_phase(name):
+                try:
+                    warm(app)
+                except Exception as e:
+                    log.warning("Startup warm-up of %s failed: %s", name, e)
+            # The cache warmers share one session; hand its connections back
+            db.session.remove()
+
+
+def report() -> str:
+    return ", ".join(f"{name}={seconds * 1000:.0f}ms" for name, seconds in registry.startup.items())
+
+
+# Apps built by create_app in this process, for the fork handler and gunicorn hooks
+_apps = weakref.WeakSet()
+
+
+def _after_fork_in_child():
+    for app in list(_apps):
+        with app.app_context():
+            for engine in db.engines.values():
+                # Forget the parent's connections without closing them under it
+                engine.dispose(close=False)
+    from .auth import certs_cache
+    certs_cache.reset_transport()
+
+
+# Once per process, however many apps create_app builds
+os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def pre_fork(server, worker):
+    """gunicorn hook: with --preload the master built the app (and may have
+    pre-warmed it) but serves nothing; close its connections before forking."""
+    for app in list(_apps):
+        with app.app_context():
+            for engine in db.engines.values():
+                engine.dispose()
+
+
+def post_fork(server, worker):
+    """gunicorn hook: open POOL_PREWARM connections in a new worker (with --preload
+    the app was built, and its pools dropped, in the master)."""
+    for app in list(_apps):
+        if app.config.get("POOL_PREWARM"):
+            warm_pools(app, app.config["POOL_PREWARM"])
+            log.info("Worker %s startup: %s", os.getpid(), report())
+
+
+def init_app(app, import_seconds: float | None = None):
+    if import_seconds is not None:
+        registry.startup["imports"] = import_seconds
+    _apps.add(app)
+
+    if app.config.get("STARTUP_WARMUP"):
+        warm_caches(app, app.config.get("STARTUP_WARMUP_BUDGET", 30.0))
+    if app.config.get("POOL_PREWARM"):
+        warm_pools(app, app.config["POOL_PREWARM"])
+    if app.config.get("STARTUP_WARMUP") or app.config.get("POOL_PREWARM"):
+        log.info("Startup: %s", report())
+
+    @app.cli.command("startup-report")
+    @click.option("--pool", default=2, show_default=True, help="Connections to open per bind.")
+    def startup_report(pool):
+        """Time imports, connection setup and cache warm-up as a cold worker would see them."""
+        warm_pools(app, pool)
+        warm_caches(app, app.config.get("STARTUP_WARMUP_BUDGET", 30.0))
+        total = 0.0
+        for name, seconds in registry.startup.items():
+            total += seconds
+            click.echo(f"{name:24} {seconds * 1000:9.1f} ms")
+        click.echo(f"{'total':24} {total * 1000:9.1f} ms")
@@ -0,0 +1,253 @@
+# app/valuation.py
+"""Collection value over time, computed on a (cards x days) price grid.
+
+The prices of every held card come back from the timescale bind in one binary
+COPY, which is read straight into a NumPy record array. The value series,
+daily change and top movers are then whole-array operations: no per-card
+Python loop, however many cards a collection holds.
+
+With VALUATION_CACHE_DAYS set, the grid for every priced card in the catalog
+is kept per process (DailyCloses), and a valuation only gathers its cards'
+rows from it instead of reading their points.
+"""
+import io
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+import numpy as np
+from flask import current_app
+from sqlalchemy import select
+from .db import db
+from .models import Card
+from .prices import rollup_for
+
+DAY = 86400
+
+# (card index, seconds since the window start, price) for every held card's
+# points in the window, one index range scan per card, plus each card's last
+# price before the window (seconds -1) so the first day has a value to carry forward
+_POINTS = """
+WITH ids AS (
+    SELECT id, (ord - 1)::int4 AS idx FROM unnest(%(ids)s::text[]) WITH ORDINALITY AS t(id, ord)
+)
+SELECT ids.idx, extract(epoch FROM h.{time} - %(start)s)::int4, h.price FROM ids CROSS JOIN LATERAL (
+    SELECT {time}, {price}::float8 AS price FROM "{table}"
+    WHERE "cardId" = ids.id AND {time} >= %(start)s AND {time} < %(end)s AND {price} IS NOT NULL
+    ORDER BY {time}
+) h
+UNION ALL
+SELECT ids.idx, -1, before.price FROM ids CROSS JOIN LATERAL (
+    SELECT {price}::float8 AS price FROM "{table}"
+    WHERE "cardId" = ids.id AND {time} < %(start)s AND {price} IS NOT NULL
+    ORDER BY {time} DESC LIMIT 1
+) before
+"""
+
+# Binary COPY framing: 19-byte header, then per row a field count and
+# (length, value) per field (all fixed-width here), then a 2-byte trailer
+_COPY_SIGNATURE = b"PGCOPY\n\xff\r\n\x00"
+_COPY_ROW = np.dtype([("fields", ">i2"), ("idx_len", ">i4"), ("idx", ">i4"), ("offset_len", ">i4"), ("offset", ">i4"),
+                      ("price_len", ">i4"), ("price", ">f8")])
+
+
+def value_window(days: int, now: datetime | None = None):
+    """(start, end) of the last `days` whole UTC days, today included."""
+    now = now or datetime.now(timezone.utc)
+    end = datetime(now.year, now.month, now.day, tzinfo=timezone.utc) + timedelta(days=1)
+    return end - timedelta(days=days), end
+
+
+def fetch_points(card_ids, start: datetime, end: datetime):
+    """Record array of (idx, offset, price) for the held cards' prices in
+    [start, end) (offset in seconds from `start`), plus offset -1 for each
+    card's last price before the window. Reads the daily rollup when installed."""
+    if rollup_for(DAY, start, start, end) is not None:
+        sql = _POINTS.format(table="PriceHistoryDaily", time="bucket", price="close")
+    else:
+        sql = _POINTS.format(table="PriceHistory", time="time", price='"averageSellPrice"')
+    buf = io.BytesIO()
+    with db.engines["timescale"].connect() as conn:
+        cursor = conn.connection.cursor()
+        try:
+            query = cursor.mogrify(sql, {"ids": list(card_ids), "start": start, "end": end}).decode()
+            cursor.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT binary)", buf)
+        finally:
+            cursor.close()
+    data = buf.getbuffer()
+    if bytes(data[:11]) != _COPY_SIGNATURE or (len(data) - 21) % _COPY_ROW.itemsize:
+        raise RuntimeError("Unexpected COPY output from the timescale bind")
+    return np.frombuffer(data, dtype=_COPY_ROW, offset=19, count=(len(data) - 21) // _COPY_ROW.itemsize)
+
+
+def price_grid(rows, n_cards: int, n_days: int):
+    """(n_cards, n_days + 1) daily closes, column 0 being the price before the
+    window; gaps carry the previous price forward, NaN before a card's first price."""
+    offsets = rows["offset"].astype(np.int64)
+    cells = rows["idx"].astype(np.int64) * (n_days + 1) + np.maximum(offsets // DAY, -1) + 1
+    # Several points in one day: the latest one is the close
+    latest = np.full(n_cards * (n_days + 1), np.iinfo(np.int64).min)
+    np.maximum.at(latest, cells, offsets)
+    close = offsets == latest[cells]
+    grid = np.full(n_cards * (n_days + 1), np.nan)
+    grid[cells[close]] = rows["price"][close]
+    grid = grid.reshape(n_cards, n_days + 1)
+    last_seen = np.where(np.isnan(grid), 0, np.arange(n_days + 1))
+    np.maximum.accumulate(last_seen, axis=1, out=last_seen)
+    return np.take_along_axis(grid, last_seen, axis=1)
+
+
+# history: (priced cards, days) closes up to yesterday, column 0 being the price
+# before the window; today: the same cards' close so far today
+_Closes = namedtuple("_Closes", "end days card_ids index history today refreshed_at")
+
+
+class DailyCloses:
+    """Process-wide daily closes of every priced card over the last `days` days,
+    so a valuation slices its cards' rows instead of reading their points.
+
+    The grid is built once per UTC day. Every VALUATION_CACHE_REFRESH seconds
+    only today's column is re-read; a card priced for the first time since
+    the build triggers a full rebuild. While one thread (re)builds, the others
+    serve the previous grid, or read the database when it is for another day."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.state = None
+
+    def _today(self, card_ids, end):
+        rows = fetch_points(card_ids, end - timedelta(days=1), end)
+        return price_grid(rows, len(card_ids), 1)[:, 1]
+
+    def _build(self, days: int, end: datetime):
+        card_ids = db.session.execute(select(Card.id)).scalars().all()
+        card_ids.sort()
+        grid = price_grid(fetch_points(card_ids, end - timedelta(days=days), end), len(card_ids), days) \
+            if card_ids else np.full((0, days + 1), np.nan)
+        priced = np.flatnonzero(~np.isnan(grid).all(axis=1))
+        return _Closes(end, days, card_ids, {card_ids[i]: row for row, i in enumerate(priced)},
+                       grid[priced, :-1], grid[priced, -1], time.monotonic())
+
+    def _refresh(self, state):
+        today = self._today(state.card_ids, state.end)
+        priced = np.fromiter((card_id in state.index for card_id in state.card_ids), dtype=bool,
+                             count=len(state.card_ids))
+        if (~np.isnan(today[~priced])).any():
+            return self._build(state.days, state.end)
+        return state._replace(today=today[priced], refreshed_at=time.monotonic())
+
+    def current(self, days: int, end: datetime):
+        """The grid for the `days` days before `end`, built or refreshed as needed;
+        None while another thread builds it."""
+        max_age = current_app.config.get("VALUATION_CACHE_REFRESH", 300.0)
+        state = self.state
+        matches = state is not None and (state.end, state.days) == (end, days)
+        if matches and time.monotonic() - state.refreshed_at < max_age:
+            return state
+        if not self._lock.acquire(blocking=False):
+            return state if matches else None
+        try:
+            state = self.state
+            if state is not None and (state.end, state.days) == (end, days):
+                if time.monotonic() - state.refreshed_at >= max_age:
+                    self.state = self._refresh(state)
+            else:
+                self.state = self._build(days, end)
+            return self.state
+        finally:
+            self._lock.release()
+
+    def lookup(self, card_ids, days: int, now: datetime | None = None):
+        """price_grid's (len(card_ids), days + 1) grid for the last `days` days,
+        or None when the window is longer than VALUATION_CACHE_DAYS."""
+        cache_days = current_app.config.get("VALUATION_CACHE_DAYS", 0)
+        if days > cache_days:
+            return None
+        start, end = value_window(days, now)
+        state = self.current(cache_days, end)
+        if state is None:
+            return None
+        rows = np.fromiter((state.index.get(card_id, -1) for card_id in card_ids), dtype=np.intp,
+                           count=len(card_ids))
+        held = rows >= 0
+        grid = np.full((len(card_ids), days + 1), np.nan)
+        grid[held, :-1] = state.history[rows[held], cache_days - days:]
+        grid[held, -1] = state.today[rows[held]]
+        return grid
+
+    def warm(self):
+        """Build today's grid ahead of the first valuation."""
+        days = current_app.config.get("VALUATION_CACHE_DAYS", 0)
+        if days:
+            self.current(days, value_window(days)[1])
+
+    def clear(self):
+        with self._lock:
+            self.state = None
+
+
+daily_closes = DailyCloses()
+
+
+def _top(changes, k: int):
+    """Indices of the k largest positive entries of `changes`, largest first."""
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    candidates = np.flatnonzero(changes > 0)
+    if len(candidates) > k:
+        candidates = candidates[np.argpartition(-changes[candidates], k - 1)[:k]]
+    return candidates[np.argsort(-changes[candidates], kind="stable")]
+
+
+def _mover(card_id, quantity, start, end, change):
+    return {
+        "cardId": card_id,
+        "quantity": int(quantity),
+        "startPrice": float(start),
+        "endPrice": float(end),
+        "change": round(float(change), 2),
+        "changePct": round(float((end - start) / start * 100), 2) if start else None,
+    }
+
+
+def collection_value(holdings, days: int = 90, movers: int = 5, now: datetime | None = None,
+                     closes: DailyCloses | None = None) -> dict:
+    """Value series, latest value and change, and top gainers/losers over the
+    last `days` days for `holdings` ({cardId: quantity}). Prices come from
+    `closes` when it covers the window, else from the database."""
+    start, end = value_window(days, now)
+    card_ids = sorted(holdings)   # neighbouring index probes, in (cardId, time) order
+    quantities = np.fromiter((holdings[card_id] for card_id in card_ids), dtype=np.float64, count=len(card_ids))
+    grid = closes.lookup(card_ids, days, now) if closes is not None and card_ids else None
+    if grid is None:
+        grid = price_grid(fetch_points(card_ids, start, end), len(card_ids), days) if card_ids \
+            else np.full((0, days + 1), np.nan)
+
+    values = np.nansum(grid * quantities[:, None], axis=0)   # column 0: before the window
+    change = np.diff(values)
+    totals, previous = values[1:], values[-2]
+
+    # Movers: each card's first price in the window against its latest one
+    window = grid[:, 1:]
+    first = window[np.arange(len(card_ids)), np.argmax(~np.isnan(window), axis=1)]
+    last = window[:, -1]
+    card_change = (last - first) * quantities                  # NaN for cards never priced
+    gainers, losers = _top(card_change, movers), _top(-card_change, movers)
+
+    return {
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "days": days,
+        "cards": len(card_ids),
+        "quantity": int(quantities.sum()),
+        "pricedCards": int(np.count_nonzero(~np.isnan(last))),
+        "value": round(float(totals[-1]), 2),
+        "change": round(float(change[-1]), 2),
+        "changePct": round(float(change[-1] / previous * 100), 2) if previous else None,
+        "series": [
+            {"time": (start + timedelta(days=d)).isoformat(), "value": value, "change": delta}
+            for d, (value, delta) in enumerate(zip(totals.round(2).tolist(), change.round(2).tolist()))
+        ],
+        "gainers": [_mover(card_ids[i], quantities[i], first[i], last[i], card_change[i]) for i in gainers],
+        "losers": [_mover(card_ids[i], quantities[i], first[i], last[i], card_change[i]) for i in losers],
+    }
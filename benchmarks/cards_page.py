@@ -0,0 +1,121 @@
+# benchmarks/cards_page.py
+"""Compare the ORM and row-projection paths for one GET /cards page.
+
+Usage: python -m benchmarks.cards_page [--page-size 100] [--repeat 50] [--page 1]
+Needs DATABASE_URL pointing at a populated catalog.
+"""
+import argparse
+import statistics
+import time
+
+from sqlalchemy.orm import joinedload
+
+from app import create_app
+from app.db import db
+from app.models import Card, TcgPlayer
+from app.projections import BASIC_PROJECTION
+
+# Everything serialize_card_basic touches
+BASIC_LOADERS = (
+    joinedload(Card.set),
+    joinedload(Card.cardmarket),
+    joinedload(Card.tcgplayer).joinedload(TcgPlayer.prices),
+    joinedload(Card.images),
+)
+
+
+def serialize_card_basic(card: Card):
+    """The list view as it was built from ORM objects before the row projection."""
+    return {
+        "id": card.id,
+        "name": card.name,
+        "supertype": card.supertype,
+        "subtypes": card.subtypes or [],
+        "level": card.level,
+        "hp": card.hp,
+        "types": card.types or [],
+        "rarity": card.rarity,
+        "artist": card.artist,
+        "number": card.number,
+        "nationalPokedexNumbers": card.nationalPokedexNumbers or [],
+        "retreatCost": card.retreatCost or [],
+        "createdAt": card.createdAt.isoformat() if card.createdAt else None,
+
+        # Set info (minimal)
+        "set": {
+            "id": card.set.id if card.set else None,
+            "name": card.set.name if card.set else None,
+            "series": card.set.series if card.set else None
+        } if card.set else None,
+
+        # Market snapshot
+        "market": {
+            "averageSellPrice": card.cardmarket.averageSellPrice if card.cardmarket else None,
+            "trendPrice": card.cardmarket.trendPrice if card.cardmarket else None,
+            "lowPrice": card.cardmarket.lowPrice if card.cardmarket else None
+        } if card.cardmarket else None,
+
+        # TCGPlayer quick prices
+        "tcgplayerPrices": {
+            "normalMarket": card.tcgplayer.prices.normalMarket if card.tcgplayer and card.tcgplayer.prices else None,
+            "holofoilMarket": card.tcgplayer.prices.holofoilMarket if card.tcgplayer and card.tcgplayer.prices else None,
+            "reverseHolofoilMarket": card.tcgplayer.prices.reverseHolofoilMarket if card.tcgplayer and card.tcgplayer.prices else None
+        } if card.tcgplayer and card.tcgplayer.prices else None,
+
+        # Images
+        "images": {
+            "small": card.images.small if card.images else None,
+            "large": card.images.large if card.images else None
+        } if card.images else None
+    }
+
+
+def orm_page(offset, limit):
+    cards = (Card.query
+             .options(*BASIC_LOADERS)
+             .order_by(Card.id)
+             .limit(limit).offset(offset)
+             .all())
+    return [serialize_card_basic(card) for card in cards]
+
+
+def rows_page(offset, limit):
+    rows = db.session.execute(
+        BASIC_PROJECTION.select().order_by(Card.id).limit(limit).offset(offset)
+    )
+    return [BASIC_PROJECTION.assemble(row) for row in rows]
+
+
+def timed(fn, app, offset, limit, repeat):
+    samples = []
+    for _ in range(repeat):
+        db.session.remove()  # fresh identity map, as in a real request
+        start = time.perf_counter()
+        app.json.dumps(fn(offset, limit))
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--page", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    app = create_app()
+    offset = (args.page - 1) * args.page_size
+    with app.app_context():
+        orm_bytes = app.json.dumps(orm_page(offset, args.page_size))
+        rows_bytes = app.json.dumps(rows_page(offset, args.page_size))
+        if orm_bytes != rows_bytes:
+            raise SystemExit("Row projection output differs from serialize_card_basic")
+
+        for name, fn in (("orm", orm_page), ("rows", rows_page)):
+            samples = timed(fn, app, offset, args.page_size, args.repeat)
+            print(f"{name:5} median {statistics.median(samples):8.2f} ms"
+                  f"  min {min(samples):8.2f} ms  ({args.repeat} runs, {args.page_size} cards)")
+
+
+if __name__ == "__main__":
+    main()
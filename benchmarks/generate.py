@@ -0,0 +1,270 @@
+# benchmarks/generate.py
+"""Populate Postgres (and the timescale bind) with a synthetic catalog.
+
+Usage: python -m benchmarks.generate [--cards 100000] [--sets 150] [--history-cards 1000]
+                                     [--history-days 1095] [--history-end 2025-01-01|today]
+                                     [--seed 1] [--create-schema] [--reset]
+Needs DATABASE_URL (and TIMESCALE_URL for PriceHistory). Refuses to touch a
+non-empty catalog unless --reset is given, which TRUNCATEs every card table.
+"""
+import argparse
+import csv
+import io
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, select, text
+
+from app import create_app
+from app.db import db
+from app.importer import pg_array
+from app.migrations import apply_migrations, migration_binds
+from app.models import Card
+
+POKEMON = [
+    "Bulbasaur", "Ivysaur", "Venusaur", "Charmander", "Charmeleon", "Charizard", "Squirtle",
+    "Wartortle", "Blastoise", "Caterpie", "Pikachu", "Raichu", "Clefairy", "Vulpix", "Jigglypuff",
+    "Zubat", "Oddish", "Psyduck", "Growlithe", "Arcanine", "Abra", "Kadabra", "Alakazam", "Machop",
+    "Geodude", "Gastly", "Haunter", "Gengar", "Onix", "Eevee", "Vaporeon", "Jolteon", "Flareon",
+    "Snorlax", "Articuno", "Zapdos", "Moltres", "Dratini", "Dragonite", "Mewtwo", "Mew", "Lugia",
+    "Ho-Oh", "Umbreon", "Espeon", "Tyranitar", "Rayquaza", "Lucario", "Garchomp", "Greninja",
+]
+SUFFIXES = ["", "", "", "", " ex", " V", " VMAX", " GX", " δ"]
+TYPES = ["Grass", "Fire", "Water", "Lightning", "Psychic", "Fighting", "Darkness", "Metal", "Dragon", "Colorless", "Fairy"]
+SUBTYPES = [["Basic"], ["Stage 1"], ["Stage 2"], ["Basic", "V"], ["VMAX"], ["Basic", "ex"], ["Item"], ["Supporter"]]
+RARITIES = ["Common"] * 6 + ["Uncommon"] * 4 + ["Rare"] * 3 + ["Rare Holo", "Rare Holo V", "Rare Ultra", "Rare Secret", "Promo"]
+ARTISTS = ["Ken Sugimori", "Mitsuhiro Arita", "Kagemaru Himeno", "5ban Graphics", "Atsuko Nishida",
+           "Naoki Saito", "Tomokazu Komiya", "Kouki Saitou", "Sanosuke Sakuma", None]
+ATTACKS = ["Tackle", "Ember", "Water Gun", "Thunder Shock", "Psybeam", "Hyper Beam", "Slash", "Flamethrower"]
+LEGAL = ["Legal", "Legal", None]
+
+# Tables in dependency order; TRUNCATE ... CASCADE handles the reverse
+CARD_TABLES = ["CardSet", "SetLegalities", "Card", "Ability", "Attack", "Weakness", "Resistance",
+               "CardLegalities", "CardImages", "CardMarket", "TcgPlayerPrices", "TcgPlayer", "ImportMetadata"]
+
+
+class CopyWriter:
+    """Buffers rows per table as CSV and COPYs them in one round trip each."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.buffers = {}
+
+    def add(self, table, row: dict):
+        if table not in self.buffers:
+            self.buffers[table] = (list(row), io.StringIO())
+        columns, buf = self.buffers[table]
+        csv.writer(buf).writerow(["\\N" if row[c] is None else row[c] for c in columns])
+
+    def flush(self):
+        cursor = self.conn.cursor()
+        for table in CARD_TABLES + ["PriceHistory"]:
+            if table not in self.buffers:
+                continue
+            columns, buf = self.buffers.pop(table)
+            buf.seek(0)
+            cols = ", ".join(f'"{c}"' for c in columns)
+            cursor.copy_expert(f'COPY "{table}" ({cols}) FROM STDIN WITH (FORMAT csv, NULL \'\\N\')', buf)
+        self.conn.commit()
+
+
+def _price(rng, base):
+    return round(base * rng.uniform(0.8, 1.25), 2) if rng.random() > 0.05 else None
+
+
+def generate_sets(out, rng, n_sets, now):
+    sets = []
+    release = datetime(1999, 1, 9)
+    for i in range(n_sets):
+        set_id = f"bench{i}"
+        release += timedelta(days=rng.randint(40, 120))
+        out.add("CardSet", {
+            "id": set_id, "name": f"Benchmark Set {i}", "series": f"Series {i // 12}",
+            "printedTotal": None, "total": None, "ptcgoCode": f"B{i:03}",
+            "releaseDate": release, "updatedAt": now,
+            "symbol": f"https://images.example/{set_id}/symbol.png",
+            "logo": f"https://images.example/{set_id}/logo.png",
+        })
+        out.add("SetLegalities", {"id": f"{set_id}-legal", "setId": set_id, "unlimited": "Legal",
+                                  "standard": rng.choice(LEGAL), "expanded": rng.choice(LEGAL)})
+        sets.append(set_id)
+    return sets
+
+
+def generate_card(out, rng, card_id, set_id, number, now):
+    pokemon = rng.choice(POKEMON)
+    trainer = rng.random() < 0.15
+    subtypes = rng.choice(SUBTYPES[-2:] if trainer else SUBTYPES[:-2])
+    types = None if trainer else rng.sample(TYPES, k=1 if rng.random() < 0.9 else 2)
+    updated = now - timedelta(days=rng.randint(0, 900))
+    out.add("Card", {
+        "id": card_id,
+        "name": f"{pokemon}'s Training" if trainer else pokemon + rng.choice(SUFFIXES),
+        "supertype": "Trainer" if trainer else "Pokémon",
+        "subtypes": pg_array(subtypes),
+        "level": None if trainer or rng.random() < 0.8 else str(rng.randint(5, 80)),
+        "hp": None if trainer else str(rng.randrange(30, 340, 10)),
+        "types": pg_array(types),
+        "evolvesFrom": None if trainer or "Basic" in subtypes else rng.choice(POKEMON),
+        "evolvesTo": None if trainer or rng.random() < 0.5 else pg_array(rng.sample(POKEMON, k=rng.randint(1, 2))),
+        "rules": pg_array(["Pokémon ex rule: When your Pokémon ex is Knocked Out, your opponent takes 2 Prize cards."])
+                 if rng.random() < 0.1 else None,
+        "flavorText": None if rng.random() < 0.5 else f"{pokemon} is often seen in the wild.",
+        "artist": rng.choice(ARTISTS),
+        "rarity": rng.choice(RARITIES),
+        "number": str(number) if rng.random() < 0.95 else f"TG{number}",
+        "nationalPokedexNumbers": None if trainer else pg_array([POKEMON.index(pokemon) + 1]),
+        "setId": set_id,
+        "retreatCost": None if trainer else pg_array(["Colorless"] * rng.randint(0, 4)),
+        "convertedRetreatCost": None if trainer else rng.randint(0, 4),
+        "createdAt": updated - timedelta(days=rng.randint(0, 365)),
+        "updatedAt": updated,
+    })
+
+    if not trainer:
+        if rng.random() < 0.3:
+            out.add("Ability", {"id": f"{card_id}-ab", "cardId": card_id, "name": f"{pokemon} Aura",
+                                "text": "Once during your turn, you may draw a card.", "type": "Ability"})
+        for a in range(rng.randint(1, 3)):
+            cost = ["Colorless"] * rng.randint(0, 3) + [types[0]]
+            out.add("Attack", {"id": f"{card_id}-at{a}", "cardId": card_id, "name": rng.choice(ATTACKS),
+                               "cost": pg_array(cost), "convertedEnergyCost": len(cost),
+                               "damage": str(rng.randrange(10, 250, 10)), "text": None})
+        if rng.random() < 0.85:
+            out.add("Weakness", {"id": f"{card_id}-wk", "cardId": card_id, "type": rng.choice(TYPES), "value": "×2"})
+        if rng.random() < 0.3:
+            out.add("Resistance", {"id": f"{card_id}-rs", "cardId": card_id, "type": rng.choice(TYPES), "value": "-30"})
+
+    out.add("CardLegalities", {"id": f"{card_id}-legal", "cardId": card_id, "unlimited": "Legal",
+                               "standard": rng.choice(LEGAL), "expanded": rng.choice(LEGAL)})
+    out.add("CardImages", {"id": f"{card_id}-img", "cardId": card_id,
+                           "small": f"https://images.example/{set_id}/{number}.png",
+                           "large": f"https://images.example/{set_id}/{number}_hires.png"})
+
+    base = rng.lognormvariate(0.5, 1.2)
+    if rng.random() < 0.9:
+        out.add("CardMarket", {
+            "id": f"{card_id}-cm", "cardId": card_id, "url": f"https://prices.example/cm/{card_id}",
+            "updatedAt": now - timedelta(days=rng.randint(0, 7)),
+            "averageSellPrice": _price(rng, base), "lowPrice": _price(rng, base * 0.6),
+            "trendPrice": _price(rng, base), "germanProLow": None, "suggestedPrice": None,
+            "reverseHoloSell": _price(rng, base * 1.3), "reverseHoloLow": _price(rng, base),
+            "reverseHoloTrend": _price(rng, base * 1.3), "lowPriceExPlus": _price(rng, base * 0.7),
+            "avg1": _price(rng, base), "avg7": _price(rng, base), "avg30": _price(rng, base),
+            "reverseHoloAvg1": _price(rng, base * 1.3), "reverseHoloAvg7": _price(rng, base * 1.3),
+            "reverseHoloAvg30": _price(rng, base * 1.3),
+        })
+    if rng.random() < 0.85:
+        holo = rng.random() < 0.3
+        prices = {"id": f"{card_id}-tp-prices"}
+        for variant, present in (("normal", not holo), ("holofoil", holo), ("reverseHolofoil", rng.random() < 0.5)):
+            for kind, factor in (("Low", 0.7), ("Mid", 1.0), ("High", 2.0), ("Market", 1.0), ("DirectLow", 0.9)):
+                prices[variant + kind] = _price(rng, base * factor) if present else None
+        out.add("TcgPlayerPrices", prices)
+        out.add("TcgPlayer", {"id": f"{card_id}-tp", "cardId": card_id, "url": f"https://prices.example/tcg/{card_id}",
+                              "updatedAt": now - timedelta(days=rng.randint(0, 7)), "pricesId": prices["id"]})
+    return base
+
+
+def generate_history(out, rng, card_id, base, days, end):
+    """One point per day with a random walk, newest at `end`."""
+    price = base
+    start = end - timedelta(days=days)
+    for d in range(days):
+        price = max(0.05, price * rng.uniform(0.96, 1.045))
+        out.add("PriceHistory", {"cardId": card_id, "time": start + timedelta(days=d),
+                                 "averageSellPrice": round(price, 2), "source": "cardmarket"})
+
+
+def history_end(value: str) -> datetime:
+    """Midnight UTC of a YYYY-MM-DD date; 'today' ends history with yesterday's
+    point, so windows relative to now (collection values) see recent data."""
+    if value == "today":
+        today = datetime.now(timezone.utc)
+        return datetime(today.year, today.month, today.day, tzinfo=timezone.utc)
+    return datetime.fromisoformat(value).replace(tzinfo=timezone.utc)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cards", type=int, default=100_000)
+    parser.add_argument("--sets", type=int, default=150)
+    parser.add_argument("--history-cards", type=int, default=1000, help="cards that get PriceHistory")
+    parser.add_argument("--history-days", type=int, default=3 * 365)
+    parser.add_argument("--history-end", default="2025-01-01",
+                        help="day after the last PriceHistory point (YYYY-MM-DD or 'today')")
+    parser.add_argument("--batch", type=int, default=5000, help="cards per COPY batch")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--create-schema", action="store_true", help="run db.create_all() and apply migrations first")
+    parser.add_argument("--reset", action="store_true", help="TRUNCATE existing card and price data")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    now = datetime(2025, 1, 1)
+    started = time.perf_counter()
+    app = create_app()
+    with app.app_context():
+        has_timescale = "timescale" in db.engines
+        if args.create_schema:
+            db.create_all()
+            # Triggers and indexes the models don't declare
+            for bind in migration_binds(app):
+                apply_migrations(bind)
+        existing = db.session.execute(select(func.count()).select_from(Card)).scalar()
+        if existing and not args.reset:
+            raise SystemExit(f"Catalog already has {existing} cards; pass --reset to replace them")
+        if args.reset:
+            tables = ", ".join(f'"{t}"' for t in CARD_TABLES)
+            db.session.execute(text(f"TRUNCATE {tables} CASCADE"))
+            db.session.commit()
+            if has_timescale:
+                with db.engines["timescale"].begin() as conn:
+                    conn.execute(text('TRUNCATE "PriceHistory"'))
+
+        conn = db.engine.raw_connection()
+        out = CopyWriter(conn)
+        sets = generate_sets(out, rng, args.sets, now)
+        out.flush()
+
+        history_every = max(1, args.cards // args.history_cards) if args.history_cards else 0
+        history = []  # (card id, base price)
+        per_set = -(-args.cards // len(sets))
+        for i in range(args.cards):
+            set_id = sets[i // per_set]
+            card_id = f"{set_id}-{i % per_set + 1}"
+            base = generate_card(out, rng, card_id, set_id, i % per_set + 1, now)
+            if history_every and i % history_every == 0 and len(history) < args.history_cards:
+                history.append((card_id, base))
+            if (i + 1) % args.batch == 0:
+                out.flush()
+                print(f"  {i + 1} cards", flush=True)
+        out.add("ImportMetadata", {"id": f"bench-{args.seed}", "totalCount": args.cards,
+                                   "importedAt": now, "isFullImport": 1})
+        out.flush()
+        conn.close()
+
+        if history and has_timescale:
+            ts_conn = db.engines["timescale"].raw_connection()
+            ts_out = CopyWriter(ts_conn)
+            end = history_end(args.history_end)
+            for n, (card_id, base) in enumerate(history, 1):
+                generate_history(ts_out, rng, card_id, base, args.history_days, end)
+                if n % 100 == 0:
+                    ts_out.flush()
+            ts_out.flush()
+            ts_conn.close()
+        elif history:
+            print("TIMESCALE_URL not set; skipping PriceHistory")
+
+        for engine in db.engines.values():
+            with engine.begin() as c:
+                c.execute(text("ANALYZE"))
+
+    points = len(history) * args.history_days if has_timescale else 0
+    print(f"Generated {args.cards} cards in {args.sets} sets and {points} price points "
+          f"in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
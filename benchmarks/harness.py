@@ -0,0 +1,218 @@
+# benchmarks/harness.py
+"""End-to-end latency, throughput and query counts for the main routes.
+
+Usage: python -m benchmarks.harness [--requests 200] [--warmup 20] [--only cards_filtered,card_detail]
+                                    [--baseline benchmarks/baseline.json] [--write-baseline] [--tolerance 0.5]
+Drives create_app() through Flask's test client with Google token verification
+stubbed out, against the catalog DATABASE_URL / TIMESCALE_URL point at (see
+benchmarks.generate). Exits with status 1 when --baseline shows a regression.
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import event, func, select
+
+from app import auth as auth_module
+from app import create_app
+from app.db import db
+from app.models import Card, CardMarket, Collection, CollectionCard, PriceHistory
+
+AUTH = {"Authorization": "Bearer benchmark"}
+AUTH_SUB = "benchmark"
+# Collection valued by the collection_value_10k scenario
+BENCH_COLLECTION = "benchmark-10k"
+COLLECTION_CARDS = 10_000
+
+
+def stub_auth():
+    # require_auth looks verify_google_token up at call time, so patching the module is enough
+    auth_module.verify_google_token = lambda token: {"sub": AUTH_SUB, "iss": "accounts.google.com"}
+
+
+class QueryCounter:
+    def __init__(self, engines):
+        self.count = 0
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+
+def sample_data(rng):
+    """IDs and parameters the scenarios draw from, read once from the catalog."""
+    ids = db.session.execute(select(Card.id).order_by(Card.id)).scalars().all()
+    if not ids:
+        raise SystemExit("The catalog is empty; run python -m benchmarks.generate first")
+    set_id = db.session.execute(
+        select(Card.setId).group_by(Card.setId).order_by(func.count().desc()).limit(1)
+    ).scalar()
+    median_price = db.session.execute(
+        select(func.percentile_cont(0.5).within_group(CardMarket.averageSellPrice))
+    ).scalar() or 1.0
+    history_ids, collection_id = [], None
+    if "timescale" in db.engines:
+        history_ids = db.session.execute(select(PriceHistory.cardId).distinct()).scalars().all()
+        collection_id = benchmark_collection(history_ids + ids)
+    return {
+        "ids": rng.sample(ids, min(len(ids), 2000)),
+        "deep_page": max(1, int(len(ids) / 100 * 0.9)),
+        "set_id": set_id,
+        "price": round(median_price, 2),
+        "history_ids": history_ids[:200],
+        "collection_id": collection_id,
+    }
+
+
+def benchmark_collection(card_ids):
+    """The benchmark user's COLLECTION_CARDS-card collection (the first of
+    `card_ids`, cards with price history first), created on first use."""
+    if db.session.get(Collection, BENCH_COLLECTION) is None:
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        db.session.add(Collection(id=BENCH_COLLECTION, ownerId=AUTH_SUB, name="Benchmark",
+                                  createdAt=now, updatedAt=now))
+        db.session.flush()
+        db.session.add_all(
+            CollectionCard(collectionId=BENCH_COLLECTION, cardId=card_id, variant="normal",
+                           quantity=1 + i % 3, addedAt=now)
+            for i, card_id in enumerate(list(dict.fromkeys(card_ids))[:COLLECTION_CARDS])
+        )
+        db.session.commit()
+    return BENCH_COLLECTION
+
+
+def scenarios(data, rng):
+    """name -> callable returning (method, path, json body, extra headers)."""
+    ids, history_ids = data["ids"], data["history_ids"]
+    s = {
+        "cards_first_page": lambda: ("GET", "/cards?page_size=100", None, {}),
+        "cards_filtered": lambda: ("GET", f"/cards?setId={data['set_id']}&averageSellPrice_gte={data['price']}&page_size=50", None, {}),
+        "cards_deep_page": lambda: ("GET", f"/cards?page={data['deep_page']}&page_size=100", None, {}),
+        "cards_cursor_sorted": lambda: ("GET", "/cards?cursor=&sort=-price&page_size=100", None, {}),
+        "cards_bulk": lambda: ("POST", "/cards/bulk", {"ids": rng.sample(ids, 100)}, {}),
+        "card_detail": lambda: ("GET", f"/cards/{rng.choice(ids)}", None, {}),
+        "card_filters": lambda: ("GET", "/cards/filters", None, {}),
+        "card_search": lambda: ("GET", "/cards/search?q=chari&limit=20", None, {}),
+        "cards_sparse": lambda: ("GET", "/cards?fields=id,name,images.small,market.averageSellPrice&page_size=100", None, {}),
+        "cards_array_filter": lambda: ("GET", "/cards?types=Fire&subtypes=Stage%202&page_size=50", None, {}),
+        "card_similar": lambda: ("GET", f"/cards/{rng.choice(ids)}/similar?limit=20", None, {}),
+    }
+    if history_ids:
+        s.update({
+            "price_history_raw": lambda: ("GET", f"/cards/{rng.choice(history_ids)}/price/history", None, {}),
+            "price_history_weekly": lambda: ("GET", f"/cards/{rng.choice(history_ids)}/price/history?resolution=1w", None, {}),
+            "price_history_lttb": lambda: ("GET", f"/cards/{rng.choice(history_ids)}/price/history?points=200", None, {}),
+            "price_latest": lambda: ("GET", f"/cards/{rng.choice(history_ids)}/price/latest", None, {}),
+            "price_latest_batch": lambda: ("POST", "/cards/price/latest", {"ids": rng.sample(history_ids, min(100, len(history_ids)))}, {}),
+            "card_overview": lambda: ("GET", f"/cards/{rng.choice(history_ids)}/overview", None, {}),
+            "collection_value_10k": lambda: ("GET", f"/collections/{data['collection_id']}/value?days=90", None, {}),
+        })
+    return s
+
+
+def percentile(sorted_samples, p):
+    k = (len(sorted_samples) - 1) * p
+    lo, hi = int(k), min(int(k) + 1, len(sorted_samples) - 1)
+    return sorted_samples[lo] + (sorted_samples[hi] - sorted_samples[lo]) * (k - lo)
+
+
+def run(client, counter, make_request, n, warmup):
+    for _ in range(warmup):
+        method, path, body, headers = make_request()
+        client.open(path, method=method, json=body, headers={**AUTH, **headers}).close()
+
+    samples, queries, statuses = [], 0, set()
+    started = time.perf_counter()
+    for _ in range(n):
+        method, path, body, headers = make_request()
+        counter.count = 0
+        t0 = time.perf_counter()
+        response = client.open(path, method=method, json=body, headers={**AUTH, **headers})
+        response.get_data()
+        response.close()
+        samples.append((time.perf_counter() - t0) * 1000)
+        queries += counter.count
+        statuses.add(response.status_code)
+    wall = time.perf_counter() - started
+
+    samples.sort()
+    return {
+        "p50_ms": round(percentile(samples, 0.50), 3),
+        "p95_ms": round(percentile(samples, 0.95), 3),
+        "p99_ms": round(percentile(samples, 0.99), 3),
+        "mean_ms": round(statistics.fmean(samples), 3),
+        "rps": round(n / wall, 1),
+        "queries": round(queries / n, 2),
+        "statuses": sorted(statuses),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Regressions against a baseline: more queries per request, or a slower p95."""
+    problems = []
+    for name, result in results.items():
+        base = baseline.get("scenarios", {}).get(name)
+        if base is None:
+            continue
+        if result["queries"] > base["queries"] * 1.1 + 0.25:
+            problems.append(f"{name}: {result['queries']} queries/request (baseline {base['queries']})")
+        if result["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            problems.append(f"{name}: p95 {result['p95_ms']} ms (baseline {base['p95_ms']} ms, +{tolerance:.0%} allowed)")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200, help="measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=20, help="unmeasured requests per scenario")
+    parser.add_argument("--only", help="comma-separated scenario names")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--baseline", help="compare against this baseline file")
+    parser.add_argument("--write-baseline", action="store_true", help="write the results to --baseline instead")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed p95 slowdown (0.5 = +50%%)")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    stub_auth()
+    app = create_app()
+    with app.app_context():
+        counter = QueryCounter(db.engines.values())
+        data = sample_data(rng)
+        cards = db.session.execute(select(func.count()).select_from(Card)).scalar()
+        db.session.remove()
+    available = scenarios(data, rng)
+    selected = args.only.split(",") if args.only else list(available)
+    unknown = [name for name in selected if name not in available]
+    if unknown:
+        raise SystemExit(f"Unknown scenarios: {', '.join(unknown)} (available: {', '.join(available)})")
+
+    client = app.test_client()
+    results = {}
+    print(f"{'scenario':24} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>8} {'queries':>8}  status")
+    for name in selected:
+        r = results[name] = run(client, counter, available[name], args.requests, args.warmup)
+        print(f"{name:24} {r['p50_ms']:9.2f} {r['p95_ms']:9.2f} {r['p99_ms']:9.2f} {r['rps']:8.1f} "
+              f"{r['queries']:8.2f}  {','.join(map(str, r['statuses']))}")
+
+    if args.baseline and args.write_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({"cards": cards, "requests": args.requests, "scenarios": results}, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Wrote {args.baseline}")
+    elif args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        problems = compare(results, baseline, args.tolerance)
+        for problem in problems:
+            print("REGRESSION", problem)
+        if problems:
+            raise SystemExit(1)
+        print(f"No regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,3 @@
+# gunicorn.conf.py
+# gunicorn -c gunicorn.conf.py --preload -w 4 "app:create_app()"
+from app.startup import post_fork, pre_fork  # noqa: F401  (master closes its pools; workers re-open POOL_PREWARM)
@@ -1,7 +1,5 @@
 # main.py
 from app import create_app
-from dotenv import load_dotenv
-load_dotenv()
 
 app = create_app()
 
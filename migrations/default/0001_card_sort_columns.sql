@@ -0,0 +1,84 @@
+-- Numeric shadow columns for Card.hp / level / number and denormalized sort keys,
+-- so range filters and sort= are served by B-tree indexes.
+--
+-- The first run of digits is the value: '120' -> 120, 'TG12' -> 12, 'SV001' -> 1,
+-- '2a' -> 2; values without digits ('—', 'X') become NULL.
+
+ALTER TABLE "Card"
+    ADD COLUMN IF NOT EXISTS "hpNum" integer
+        GENERATED ALWAYS AS ((substring("hp" from '[0-9]{1,9}'))::integer) STORED,
+    ADD COLUMN IF NOT EXISTS "levelNum" integer
+        GENERATED ALWAYS AS ((substring("level" from '[0-9]{1,9}'))::integer) STORED,
+    ADD COLUMN IF NOT EXISTS "numberNum" integer
+        GENERATED ALWAYS AS ((substring("number" from '[0-9]{1,9}'))::integer) STORED,
+    ADD COLUMN IF NOT EXISTS "setReleaseDate" timestamp without time zone,
+    ADD COLUMN IF NOT EXISTS "marketPrice" double precision;
+
+-- Card."setReleaseDate" follows CardSet."releaseDate"
+CREATE OR REPLACE FUNCTION card_set_release_date() RETURNS trigger AS $$
+BEGIN
+    NEW."setReleaseDate" := (SELECT "releaseDate" FROM "CardSet" WHERE id = NEW."setId");
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS card_set_release_date ON "Card";
+CREATE TRIGGER card_set_release_date
+    BEFORE INSERT OR UPDATE OF "setId" ON "Card"
+    FOR EACH ROW EXECUTE FUNCTION card_set_release_date();
+
+CREATE OR REPLACE FUNCTION cardset_release_date_sync() RETURNS trigger AS $$
+BEGIN
+    UPDATE "Card" SET "setReleaseDate" = NEW."releaseDate"
+    WHERE "setId" = NEW.id AND "setReleaseDate" IS DISTINCT FROM NEW."releaseDate";
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS cardset_release_date_sync ON "CardSet";
+CREATE TRIGGER cardset_release_date_sync
+    AFTER UPDATE OF "releaseDate" ON "CardSet"
+    FOR EACH ROW EXECUTE FUNCTION cardset_release_date_sync();
+
+-- Card."marketPrice" follows CardMarket."averageSellPrice"
+CREATE OR REPLACE FUNCTION cardmarket_price_sync() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' OR (TG_OP = 'UPDATE' AND OLD."cardId" IS DISTINCT FROM NEW."cardId") THEN
+        UPDATE "Card" SET "marketPrice" = NULL WHERE id = OLD."cardId";
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        UPDATE "Card" SET "marketPrice" = NEW."averageSellPrice"
+        WHERE id = NEW."cardId" AND "marketPrice" IS DISTINCT FROM NEW."averageSellPrice";
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS cardmarket_price_sync ON "CardMarket";
+CREATE TRIGGER cardmarket_price_sync
+    AFTER INSERT OR UPDATE OF "averageSellPrice", "cardId" OR DELETE ON "CardMarket"
+    FOR EACH ROW EXECUTE FUNCTION cardmarket_price_sync();
+
+-- Backfill rows that existed before the triggers
+UPDATE "Card" c SET "setReleaseDate" = s."releaseDate"
+FROM "CardSet" s
+WHERE s.id = c."setId" AND c."setReleaseDate" IS DISTINCT FROM s."releaseDate";
+
+UPDATE "Card" c SET "marketPrice" = m."averageSellPrice"
+FROM "CardMarket" m
+WHERE m."cardId" = c.id AND c."marketPrice" IS DISTINCT FROM m."averageSellPrice";
+
+-- Range filters and ascending sorts: (col ASC NULLS LAST, id). Descending sorts are
+-- DESC NULLS LAST, which a backward scan of the first index can't produce, so the
+-- sortable columns get a second index in that order.
+CREATE INDEX IF NOT EXISTS "Card_hpNum_id_idx" ON "Card" ("hpNum", id);
+CREATE INDEX IF NOT EXISTS "Card_hpNum_desc_id_idx" ON "Card" ("hpNum" DESC NULLS LAST, id DESC);
+CREATE INDEX IF NOT EXISTS "Card_levelNum_id_idx" ON "Card" ("levelNum", id);
+CREATE INDEX IF NOT EXISTS "Card_numberNum_id_idx" ON "Card" ("numberNum", id);
+CREATE INDEX IF NOT EXISTS "Card_numberNum_desc_id_idx" ON "Card" ("numberNum" DESC NULLS LAST, id DESC);
+CREATE INDEX IF NOT EXISTS "Card_setReleaseDate_id_idx" ON "Card" ("setReleaseDate", id);
+CREATE INDEX IF NOT EXISTS "Card_setReleaseDate_desc_id_idx" ON "Card" ("setReleaseDate" DESC NULLS LAST, id DESC);
+CREATE INDEX IF NOT EXISTS "Card_marketPrice_id_idx" ON "Card" ("marketPrice", id);
+CREATE INDEX IF NOT EXISTS "Card_marketPrice_desc_id_idx" ON "Card" ("marketPrice" DESC NULLS LAST, id DESC);
+
+ANALYZE "Card";
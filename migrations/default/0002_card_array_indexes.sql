@@ -0,0 +1,11 @@
+-- GIN indexes for the /cards array filters: `types=` / `subtypes=` / `pokedex=` /
+-- `evolvesTo=` compile to @> (all of) and their `_any` forms to && (any of),
+-- both served by the default array_ops opclass. evolvesFrom is a plain string.
+
+CREATE INDEX IF NOT EXISTS "Card_types_gin_idx" ON "Card" USING gin ("types");
+CREATE INDEX IF NOT EXISTS "Card_subtypes_gin_idx" ON "Card" USING gin ("subtypes");
+CREATE INDEX IF NOT EXISTS "Card_nationalPokedexNumbers_gin_idx" ON "Card" USING gin ("nationalPokedexNumbers");
+CREATE INDEX IF NOT EXISTS "Card_evolvesTo_gin_idx" ON "Card" USING gin ("evolvesTo");
+CREATE INDEX IF NOT EXISTS "Card_evolvesFrom_idx" ON "Card" ("evolvesFrom");
+
+ANALYZE "Card";
@@ -0,0 +1,3 @@
+-- Hash of each card's source record, written by `flask import-cards` so delta
+-- imports can skip cards whose record has not changed.
+ALTER TABLE "Card" ADD COLUMN IF NOT EXISTS "contentHash" text;
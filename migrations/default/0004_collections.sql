@@ -0,0 +1,21 @@
+-- User collections: cards (with quantity and printing variant) owned by a Google account
+
+CREATE TABLE IF NOT EXISTS "Collection" (
+    id          text PRIMARY KEY,
+    "ownerId"   text NOT NULL,
+    name        text NOT NULL,
+    "createdAt" timestamp(3) NOT NULL DEFAULT now(),
+    "updatedAt" timestamp(3) NOT NULL DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS "Collection_ownerId_idx" ON "Collection" ("ownerId");
+
+CREATE TABLE IF NOT EXISTS "CollectionCard" (
+    "collectionId" text NOT NULL REFERENCES "Collection" (id) ON DELETE CASCADE,
+    "cardId"       text NOT NULL REFERENCES "Card" (id),
+    variant        text NOT NULL DEFAULT 'normal',
+    quantity       integer NOT NULL CHECK (quantity > 0),
+    "addedAt"      timestamp(3) NOT NULL DEFAULT now(),
+    PRIMARY KEY ("collectionId", "cardId", variant)
+);
+-- Foreign-key checks when a card is deleted
+CREATE INDEX IF NOT EXISTS "CollectionCard_cardId_idx" ON "CollectionCard" ("cardId");
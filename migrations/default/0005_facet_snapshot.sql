@@ -0,0 +1,8 @@
+-- Persisted /cards/filters payloads (FACETS_PERSIST=1), one per catalog version
+-- and payload format, written by `flask import-cards` and `flask build-facets`
+
+CREATE TABLE IF NOT EXISTS "FacetSnapshot" (
+    id          text PRIMARY KEY,
+    payload     jsonb NOT NULL,
+    "builtAt"   timestamp
+);
@@ -0,0 +1,78 @@
+# tests/conftest.py
+"""Fixtures shared by the test modules.
+
+Pure tests (parsing, NumPy math) run anywhere. Tests that take the `app`
+fixture need DATABASE_URL pointing at a migrated, seeded catalog
+(python -m benchmarks.generate --create-schema) and are skipped without one.
+"""
+import os
+import time
+from contextlib import contextmanager
+import pytest
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+
+
+@pytest.fixture(scope="session")
+def app():
+    if not os.getenv("DATABASE_URL"):
+        pytest.skip("DATABASE_URL is not set")
+    from app import create_app
+    from app.db import db
+    app = create_app()
+    app.config["TESTING"] = True
+    with app.app_context():
+        try:
+            with db.engine.connect():
+                pass
+        except OperationalError as e:
+            pytest.skip(f"Database unavailable: {e.orig}")
+    return app
+
+
+@pytest.fixture
+def db_session(app):
+    from app.db import db
+    with app.app_context():
+        yield db.session
+        db.session.remove()
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, *args):
+        self.count += 1
+        self.statements.append(statement)
+
+
+@pytest.fixture
+def count_queries(app):
+    """`with count_queries() as counter:` counts statements on every bind."""
+    from app.db import db
+
+    @contextmanager
+    def counting():
+        counter = QueryCounter()
+        engines = list(db.engines.values())
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", counter)
+        try:
+            yield counter
+        finally:
+            for engine in engines:
+                event.remove(engine, "before_cursor_execute", counter)
+    return counting
+
+
+@pytest.fixture
+def client(app):
+    """Test client whose Bearer token is already in the verified-token cache (user "test-user")."""
+    from app.auth import token_cache
+    token_cache.put("test-token", {"sub": "test-user", "iss": "https://accounts.google.com",
+                                   "exp": time.time() + 3600})
+    client = app.test_client()
+    client.environ_base["HTTP_AUTHORIZATION"] = "Bearer test-token"
+    return client
@@ -0,0 +1,40 @@
+# tests/test_array_filters.py
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.dialects import postgresql
+from app.models import Card
+from app.routes import _array_condition
+
+FILTERS = [
+    (Card.types, ["Fire", "Water"], "Card_types_gin_idx"),
+    (Card.subtypes, ["Basic"], "Card_subtypes_gin_idx"),
+    (Card.evolvesTo, ["Raichu"], "Card_evolvesTo_gin_idx"),
+    (Card.nationalPokedexNumbers, [25], "Card_nationalPokedexNumbers_gin_idx"),
+]
+
+
+@pytest.mark.parametrize("column, values, index", FILTERS)
+@pytest.mark.parametrize("match_any", [False, True])
+def test_array_filters_use_gin_indexes(db_session, column, values, index, match_any):
+    query = select(Card.id).where(_array_condition(column, values, match_any))
+    sql = query.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+    # The test catalog is small enough for a sequential scan to win on cost
+    db_session.execute(text("SET LOCAL enable_seqscan = off"))
+    try:
+        plan = "\n".join(db_session.execute(text(f"EXPLAIN {sql}")).scalars())
+    finally:
+        db_session.rollback()
+    assert index in plan
+
+
+def test_all_of_and_any_of(client):
+    both = client.get("/cards?types=Fire,Water&page_size=100&fields=id,types").get_json()
+    either = client.get("/cards?types_any=Fire,Water&page_size=100&fields=id,types").get_json()
+    assert both["cards"] and all({"Fire", "Water"} <= set(c["types"]) for c in both["cards"])
+    assert either["cards"] and all({"Fire", "Water"} & set(c["types"]) for c in either["cards"])
+    assert either["total"] > both["total"]
+
+
+def test_invalid_array_filters(client):
+    assert client.get("/cards?pokedex=pikachu").status_code == 400
+    assert client.get("/cards?types=,").status_code == 400
@@ -0,0 +1,41 @@
+# tests/test_bulk.py
+import pytest
+from app.blobstore import card_blobs
+from app.loaders import chunked
+
+IDS = ["s0-120", "nope-1", "s0-102", "s0-120", "s1-130", "nope-2", "s0-102"]
+UNIQUE = ["s0-120", "s0-102", "s1-130"]
+
+
+def test_chunked():
+    assert list(chunked(list(range(5)), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(chunked([], 3)) == []
+
+
+@pytest.fixture
+def small_chunks(app, monkeypatch):
+    """Chunks of 2, so every request below spans several chunks."""
+    monkeypatch.setitem(app.config, "BULK_CHUNK_SIZE", 2)
+    monkeypatch.setattr(card_blobs, "chunk_size", 2)
+    card_blobs.memory.clear()
+
+
+@pytest.mark.parametrize("query", ["", "?fields=id,name,set.id"])
+def test_bulk_keeps_order_dedupes_and_reports_missing(client, small_chunks, query):
+    body = client.post(f"/cards/bulk{query}", json={"ids": IDS}).get_json()
+    assert [card["id"] for card in body["cards"]] == UNIQUE
+    assert body["count"] == 3
+    assert body["missing"] == ["nope-1", "nope-2"]
+
+
+def test_bulk_cards_match_the_single_card_route(client, small_chunks):
+    body = client.post("/cards/bulk", json={"ids": UNIQUE}).get_json()
+    for card in body["cards"]:
+        assert card == client.get(f"/cards/{card['id']}").get_json()
+
+
+def test_bulk_limits(client, app, monkeypatch):
+    monkeypatch.setitem(app.config, "BULK_MAX_IDS", 2)
+    assert client.post("/cards/bulk", json={"ids": UNIQUE}).status_code == 400
+    assert client.post("/cards/bulk", json={"ids": [""]}).status_code == 400
+    assert client.post("/cards/bulk", json={"id": "s0-120"}).status_code == 400
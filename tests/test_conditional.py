@@ -0,0 +1,46 @@
+# tests/test_conditional.py
+from datetime import datetime, timedelta
+from app import routes
+
+CARD = "/cards/s0-60"
+
+
+def test_list_etag_and_304(client):
+    first = client.get("/cards?page_size=5&types=Fire")
+    assert first.status_code == 200 and first.headers["Cache-Control"] == "private, no-cache"
+    etag = first.headers["ETag"]
+    # The same query in another parameter order shares the ETag
+    again = client.get("/cards?types=Fire&page_size=5", headers={"If-None-Match": etag})
+    assert (again.status_code, again.get_data(), again.headers["ETag"]) == (304, b"", etag)
+    other = client.get("/cards?page_size=6&types=Fire", headers={"If-None-Match": etag})
+    assert other.status_code == 200 and other.headers["ETag"] != etag
+
+
+def test_import_changes_the_list_etag(client, monkeypatch):
+    monkeypatch.setattr(routes, "catalog_version", lambda: datetime(2024, 1, 1))
+    before = client.get("/cards/filters")
+    assert before.last_modified.replace(tzinfo=None) == datetime(2024, 1, 1)
+    monkeypatch.setattr(routes, "catalog_version", lambda: datetime(2024, 1, 2))
+    after = client.get("/cards/filters", headers={"If-None-Match": before.headers["ETag"]})
+    assert after.status_code == 200 and after.headers["ETag"] != before.headers["ETag"]
+
+
+def test_card_validators(client):
+    first = client.get(CARD)
+    etag, last_modified = first.headers["ETag"], first.last_modified
+    assert first.status_code == 200 and last_modified is not None
+    assert client.get(CARD, headers={"If-None-Match": etag}).status_code == 304
+    assert client.get(CARD, headers={"If-None-Match": '"stale"'}).status_code == 200
+    assert client.get(CARD, headers={"If-Modified-Since": first.headers["Last-Modified"]}).status_code == 304
+    earlier = (last_modified - timedelta(seconds=1)).strftime("%a, %d %b %Y %H:%M:%S GMT")
+    assert client.get(CARD, headers={"If-Modified-Since": earlier}).status_code == 200
+    # If-None-Match wins over If-Modified-Since
+    assert client.get(CARD, headers={"If-None-Match": '"stale"',
+                                     "If-Modified-Since": first.headers["Last-Modified"]}).status_code == 200
+
+
+def test_errors_carry_no_validators(client):
+    resp = client.get("/cards/no-such-card")
+    assert resp.status_code == 404 and "ETag" not in resp.headers
+    resp = client.get("/cards?page_size=abc")
+    assert resp.status_code == 400 and "ETag" not in resp.headers
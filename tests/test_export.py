@@ -0,0 +1,43 @@
+# tests/test_export.py
+import json
+from datetime import datetime
+import pytest
+from sqlalchemy import or_, select
+from app.models import Card, CardMarket, TcgPlayer
+
+SINCE = datetime(2021, 6, 1)
+
+
+def _export(client, query=""):
+    resp = client.get(f"/cards/export{query}")
+    assert resp.status_code == 200 and resp.is_streamed
+    assert resp.mimetype == "application/x-ndjson"
+    assert datetime.fromisoformat(resp.headers["X-Export-Started-At"])
+    body = resp.get_data()
+    return body, [json.loads(line) for line in body.decode("utf-8").splitlines()]
+
+
+def test_full_export(client, db_session):
+    body, cards = _export(client)
+    ids = [card["id"] for card in cards]
+    assert ids == sorted(db_session.execute(select(Card.id)).scalars())
+    assert cards[0] == client.get(f"/cards/{ids[0]}").get_json()
+    # Chunks only change how the rows are fetched
+    assert _export(client, "?chunk_size=7")[0] == body
+
+
+def test_since_exports_changed_cards(client, db_session):
+    _, cards = _export(client, f"?since={SINCE.isoformat()}Z")
+    expected = db_session.execute(select(Card.id).where(or_(
+        Card.updatedAt > SINCE,
+        Card.cardmarket.has(CardMarket.updatedAt > SINCE),
+        Card.tcgplayer.has(TcgPlayer.updatedAt > SINCE),
+    ))).scalars().all()
+    total = db_session.execute(select(Card.id)).scalars().all()
+    assert 0 < len(expected) < len(total)
+    assert [card["id"] for card in cards] == sorted(expected)
+
+
+@pytest.mark.parametrize("query", ["?since=yesterday", "?chunk_size=0", "?chunk_size=many"])
+def test_bad_parameters(client, query):
+    assert client.get(f"/cards/export{query}").status_code == 400
@@ -0,0 +1,50 @@
+# tests/test_facets.py
+import pytest
+from app import facets
+from app.models import FacetSnapshot
+
+
+@pytest.fixture
+def persisted(app, db_session, monkeypatch):
+    """FACETS_PERSIST on, with a fresh in-process snapshot; stored rows are removed afterwards."""
+    monkeypatch.setitem(app.config, "FACETS_PERSIST", True)
+    facets.snapshot.clear()
+    yield
+    facets.snapshot.clear()
+    db_session.query(FacetSnapshot).delete()
+    db_session.commit()
+
+
+def test_serving_facets_never_writes(client, count_queries, persisted):
+    with count_queries() as counter:
+        resp = client.get("/cards/filters")
+    assert resp.status_code == 200
+    assert not [s for s in counter.statements if not s.lstrip().upper().startswith("SELECT")]
+
+
+def test_stored_snapshot_is_served(client, db_session, persisted):
+    key = facets.persist_facets()
+    stored = db_session.get(FacetSnapshot, key)
+    stored.payload = {**stored.payload, "categories": {**stored.payload["categories"], "artists": ["Stored"]}}
+    db_session.commit()
+    assert client.get("/cards/filters").get_json()["categories"]["artists"] == ["Stored"]
+
+
+def test_missing_snapshot_falls_back_to_the_newest_stored(app, client, db_session, persisted, monkeypatch):
+    key = facets.persist_facets()
+    stored = db_session.get(FacetSnapshot, key)
+    stored.id = "2000-01-01T00:00:00/v%d" % facets.PAYLOAD_FORMAT    # an older catalog's snapshot
+    stored.payload = {**stored.payload, "categories": {**stored.payload["categories"], "artists": ["Older"]}}
+    db_session.commit()
+
+    def no_builds():
+        raise AssertionError("the payload was built instead of read")
+    build = facets.build_facets_payload
+    monkeypatch.setattr(facets, "build_facets_payload", no_builds)
+    monkeypatch.setitem(app.config, "CATALOG_VERSION_TTL", 0)
+    assert client.get("/cards/filters").get_json()["categories"]["artists"] == ["Older"]
+
+    # Once the current snapshot is stored it is picked up without a new import
+    monkeypatch.setattr(facets, "build_facets_payload", build)
+    facets.persist_facets()
+    assert client.get("/cards/filters").get_json()["categories"]["artists"] != ["Older"]
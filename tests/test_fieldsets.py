@@ -0,0 +1,70 @@
+# tests/test_fieldsets.py
+import pytest
+from app.fieldsets import FULL_SHAPE, full_fieldset, list_fieldset, parse_fieldset, prune
+
+
+def test_parse_fieldset_builds_a_tree():
+    assert parse_fieldset("id,name,images.small,set.legalities.standard") == {
+        "id": True, "name": True, "images": {"small": True}, "set": {"legalities": {"standard": True}},
+    }
+    # A whole block wins over its members, in either order
+    assert parse_fieldset("images.small,images") == {"images": True}
+    assert parse_fieldset("images,images.small") == {"images": True}
+    assert parse_fieldset(None) is None
+    with pytest.raises(ValueError):
+        parse_fieldset(" , ")
+
+
+@pytest.mark.parametrize("fields", [
+    "name.P",                       # a scalar has no parts
+    "convertedRetreatCost.x",
+    "subtypes.first",               # nor does an array of scalars
+    "set.name.first",
+    "set.legalities.banned",
+    "attacks.power",
+    "tcgplayer.prices.normalMarket.x",
+    "nope",
+])
+def test_parse_fieldset_rejects_paths_outside_the_shape(fields):
+    with pytest.raises(ValueError, match="Unknown fields"):
+        parse_fieldset(fields, FULL_SHAPE)
+
+
+def test_full_fieldset_rejects_subpaths_of_scalars():
+    with pytest.raises(ValueError, match="name.P"):
+        full_fieldset("name.P", None)
+    keys, tree = full_fieldset("id,attacks.name,tcgplayer.prices.normalMarket", "images")
+    assert sorted(keys) == ["attacks", "id", "images", "tcgplayer"]
+    assert tree["attacks"] == {"name": True}
+
+
+def test_list_fieldset_uses_the_basic_shape():
+    with pytest.raises(ValueError, match="convertedRetreatCost.x"):
+        list_fieldset("convertedRetreatCost.x", None)
+    with pytest.raises(ValueError, match="market.url"):
+        list_fieldset("market.url", None)
+    projection, extra, tree = list_fieldset("id,market.trendPrice,attacks.cost", None)
+    assert extra == ["attacks"]
+    assert tree == {"id": True, "market": {"trendPrice": True}, "attacks": {"cost": True}}
+
+
+def test_prune():
+    card = {
+        "id": "base1-4", "name": "Charizard", "images": {"small": "s.png", "large": "l.png"},
+        "attacks": [{"name": "Fire Spin", "cost": ["Fire"] * 4}, {"name": "Burn", "cost": []}],
+        "set": None,
+    }
+    tree = {"id": True, "images": {"small": True}, "attacks": {"name": True}, "set": {"name": True}}
+    assert prune(card, tree) == {
+        "id": "base1-4", "images": {"small": "s.png"},
+        "attacks": [{"name": "Fire Spin"}, {"name": "Burn"}], "set": None,
+    }
+
+
+@pytest.mark.parametrize("path", ["/cards/{id}?fields=name.P", "/cards?fields=convertedRetreatCost.x"])
+def test_routes_reject_subpaths_of_scalars(client, db_session, path):
+    from app.models import Card
+    card_id = db_session.query(Card.id).order_by(Card.id).limit(1).scalar()
+    response = client.get(path.format(id=card_id))
+    assert response.status_code == 400
+    assert "Unknown fields" in response.get_json()["error"]
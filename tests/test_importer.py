@@ -0,0 +1,125 @@
+# tests/test_importer.py
+import json
+from datetime import timedelta
+import click
+import pytest
+from app.catalog import catalog_version, invalidate_catalog_version
+from app.db import db
+from app.importer import CatalogImporter, copy_rows, import_paths, pg_array
+
+
+class _Uncommitted:
+    """A DBAPI connection whose commits are dropped, so the test can roll back."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def cursor(self):
+        return self.conn.cursor()
+
+    def commit(self):
+        pass
+
+
+def _set_record(cursor, set_id):
+    cursor.execute('SELECT s.name, s.series, s."printedTotal", s.total, s."ptcgoCode", s."releaseDate", '
+                   's."updatedAt", s.symbol, s.logo, l.unlimited, l.standard, l.expanded '
+                   'FROM "CardSet" s LEFT JOIN "SetLegalities" l ON l."setId" = s.id WHERE s.id = %s', (set_id,))
+    (name, series, printed, total, code, released, updated, symbol, logo,
+     unlimited, standard, expanded) = cursor.fetchone()
+    return {
+        "id": set_id, "name": name, "series": series, "printedTotal": printed, "total": total,
+        "ptcgoCode": code, "releaseDate": released and released.isoformat(),
+        "updatedAt": updated and updated.isoformat(), "images": {"symbol": symbol, "logo": logo},
+        "legalities": {"unlimited": unlimited, "standard": standard, "expanded": expanded},
+    }
+
+
+def _bumped(cursor, now):
+    cursor.execute('SELECT DISTINCT "setId" FROM "Card" WHERE "updatedAt" = %s', (now,))
+    return {row[0] for row in cursor.fetchall()}
+
+
+def test_set_changes_bump_their_cards(app):
+    with app.app_context():
+        conn = db.engine.raw_connection()
+    try:
+        importer = CatalogImporter(_Uncommitted(conn))
+        with conn.cursor() as cursor:
+            cursor.execute('SELECT "setId" FROM "Card" WHERE "setId" IS NOT NULL ORDER BY id LIMIT 1')
+            set_id = cursor.fetchone()[0]
+            record = _set_record(cursor, set_id)
+
+            importer.add_set(record)
+            importer.flush()
+            assert _bumped(cursor, importer.now) == set()
+
+            importer.added_sets.clear()
+            renamed = {**record, "name": f"{record['name']} (renamed)"}
+            importer.add_set(renamed)
+            importer.flush()
+            assert _bumped(cursor, importer.now) == {set_id}
+
+            importer.added_sets.clear()
+            importer.now += timedelta(seconds=1)
+            importer.add_set({**renamed, "legalities": {**record["legalities"], "standard": "Banned"}})
+            importer.flush()
+            assert _bumped(cursor, importer.now) == {set_id}
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+def test_pg_array():
+    assert pg_array(None) is None
+    assert pg_array(["a", None, 'q"uote', "back\\slash"]) == '{"a",NULL,"q\\"uote","back\\\\slash"}'
+
+
+def test_copy_round_trips_null_markers(app):
+    rows = [
+        {"id": "literal", "value": "\\N", "items": ["\\N", None, "NULL", 'q"uote', "comma, ok"]},
+        {"id": "nulls", "value": None, "items": None},
+        {"id": "empty", "value": "", "items": []},
+    ]
+    with app.app_context():
+        conn = db.engine.raw_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("CREATE TEMP TABLE copy_test (id text, value text, items text[])")
+            copy_rows(cursor, "copy_test", ["id", "value", "items"], rows)
+            cursor.execute("SELECT id, value, items FROM copy_test")
+            assert {row[0]: row[1:] for row in cursor.fetchall()} == {
+                "literal": ("\\N", ["\\N", None, "NULL", 'q"uote', "comma, ok"]),
+                "nulls": (None, None),
+                "empty": ("", []),
+            }
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+def test_failed_import_still_moves_the_catalog_version(app, tmp_path):
+    """The first batch commits before the second fails: the import is still recorded."""
+    with app.app_context():
+        before = catalog_version()
+        imports = set(db.session.execute(db.text('SELECT id FROM "ImportMetadata"')).scalars())
+        set_id = db.session.execute(db.text('SELECT id FROM "CardSet" ORDER BY id LIMIT 1')).scalar()
+        db.session.remove()
+    cards = [{"id": "partial-import-1", "name": "Partial", "number": "1", "set": {"id": set_id}},
+             {"id": "partial-import-2", "name": "Orphan", "number": "2", "set": {"id": "no-such-set"}}]
+    dump = tmp_path / "cards.json"
+    dump.write_text(json.dumps(cards))
+    with app.app_context():
+        try:
+            with pytest.raises(click.ClickException, match="no-such-set"):
+                import_paths([str(dump)], batch_size=1)
+            assert catalog_version() != before
+            assert db.session.execute(db.text('SELECT name FROM "Card" WHERE id = \'partial-import-1\'')).scalar() \
+                == "Partial"
+        finally:
+            db.session.execute(db.text('DELETE FROM "Card" WHERE id = \'partial-import-1\''))
+            db.session.execute(db.text('DELETE FROM "ImportMetadata" WHERE NOT (id = ANY(:ids))'),
+                               {"ids": list(imports)})
+            db.session.commit()
+            db.session.remove()
+            invalidate_catalog_version()
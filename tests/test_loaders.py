@@ -0,0 +1,43 @@
+# tests/test_loaders.py
+import pytest
+from sqlalchemy import select
+from app.loaders import card_loader_options
+from app.models import Card
+from app.routes import serialize_card_full
+
+
+def _serialized_query_count(db_session, count_queries, profile, serializer, page_size):
+    db_session.expunge_all()
+    with count_queries() as counter:
+        cards = db_session.execute(
+            select(Card).options(*card_loader_options(profile)).order_by(Card.id).limit(page_size)
+        ).unique().scalars().all()
+        for card in cards:
+            serializer(card)
+    assert len(cards) == page_size, "the test catalog needs at least 50 cards"
+    return counter.count
+
+
+@pytest.mark.parametrize("profile, serializer, expected", [
+    # The card SELECT (one-to-one relations joined) plus one IN query per collection
+    ("full", serialize_card_full, 5),
+])
+def test_profile_query_count_does_not_grow_with_page_size(db_session, count_queries, profile, serializer, expected):
+    small = _serialized_query_count(db_session, count_queries, profile, serializer, 5)
+    large = _serialized_query_count(db_session, count_queries, profile, serializer, 50)
+    assert small == large == expected
+
+
+def test_list_query_count_does_not_grow_with_page_size(client, db_session, count_queries):
+    client.get("/cards?page_size=1")   # reads the catalog version for the validators
+    counts = []
+    for page_size in (5, 50):
+        with count_queries() as counter:
+            assert len(client.get(f"/cards?page_size={page_size}").get_json()["cards"]) == page_size
+        counts.append(counter.count)
+    assert counts == [2, 2]   # count + page
+
+
+def test_unknown_profile():
+    with pytest.raises(ValueError):
+        card_loader_options("everything")
@@ -0,0 +1,28 @@
+# tests/test_metrics.py
+import os
+import pytest
+from flask import Flask
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import ProgrammingError
+from app.metrics import _install_engine_events, normalize_sql
+
+
+def test_normalize_sql():
+    statement = """SELECT * FROM "Card"
+        WHERE name = 'Pika''chu' AND "hpNum" >= 120 AND id IN (%(id_1_1)s, %(id_1_2)s)"""
+    assert normalize_sql(statement) == 'SELECT * FROM "Card" WHERE name = ? AND "hpNum" >= ? AND id IN (?, ...)'
+
+
+def test_failed_statements_leave_no_start_times(app):
+    engine = create_engine(os.environ["DATABASE_URL"])
+    _install_engine_events(Flask(__name__), "default", engine)
+    try:
+        with engine.connect() as conn:
+            for _ in range(3):
+                with pytest.raises(ProgrammingError):
+                    conn.execute(text('SELECT * FROM "NoSuchTable"'))
+                conn.rollback()
+            conn.execute(text("SELECT 1"))
+            assert conn.info["metrics_started"] == []
+    finally:
+        engine.dispose()
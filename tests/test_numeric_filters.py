@@ -0,0 +1,50 @@
+# tests/test_numeric_filters.py
+import re
+import pytest
+from sqlalchemy import select
+from app.models import Card, CardSet
+
+
+def _digits(value):
+    """What the shadow columns hold: the first run of digits, or None."""
+    match = re.search(r"[0-9]+", value or "")
+    return int(match.group()) if match else None
+
+
+def _cards(client, query):
+    body = client.get(f"/cards?{query}&fields=id,hp,number&page_size=100&count=exact").get_json()
+    assert body["total"] <= 100, "narrow the filter so the whole result fits on one page"
+    return body["cards"]
+
+
+@pytest.mark.parametrize("query, column, low, high", [
+    ("hp_gte=100&hp_lt=130", "hp", 100, 129),
+    ("hp_gt=100&hp_lte=130", "hp", 101, 130),
+    ("number_gte=2&number_lt=12", "number", 2, 11),
+])
+def test_range_filters_use_the_digits(client, db_session, query, column, low, high):
+    cards = _cards(client, query)
+    shadow = Card.hpNum if column == "hp" else Card.numberNum
+    expected = set(db_session.execute(select(Card.id).where(shadow.between(low, high))).scalars())
+    assert cards and {card["id"] for card in cards} == expected
+    assert all(low <= _digits(card[column]) <= high for card in cards)
+
+
+@pytest.mark.parametrize("sort, column", [
+    ("hp", Card.hpNum), ("-hp", Card.hpNum), ("number", Card.numberNum), ("-number", Card.numberNum),
+    ("releaseDate", CardSet.releaseDate), ("-releaseDate", CardSet.releaseDate),
+])
+def test_sort_keys(client, db_session, sort, column):
+    ids = [card["id"] for card in
+           client.get(f"/cards?sort={sort}&fields=id&page_size=100&count=none").get_json()["cards"]]
+    descending = sort.startswith("-")
+    values = dict(db_session.execute(select(Card.id, column).outerjoin(Card.set)).all())
+    # id breaks ties; NULLs come last in both directions
+    known = sorted((i for i in values if values[i] is not None), key=lambda i: (values[i], i), reverse=descending)
+    nulls = sorted((i for i in values if values[i] is None), reverse=descending)
+    assert ids == (known + nulls)[:100]
+
+
+@pytest.mark.parametrize("query", ["sort=weight", "hp_gte=lots", "number_lt="])
+def test_bad_values(client, query):
+    assert client.get(f"/cards?{query}").status_code == 400
@@ -0,0 +1,47 @@
+# tests/test_overview.py
+import time
+import pytest
+from app import overview
+from app.db import db
+
+CARD = "s0-60"
+
+
+@pytest.fixture
+def timescale(app):
+    with app.app_context():
+        if "timescale" not in db.engines:
+            pytest.skip("TIMESCALE_URL is not set")
+
+
+def test_overview(client, timescale):
+    body = client.get(f"/cards/{CARD}/overview?days=3650&points=50").get_json()
+    assert body["card"] == client.get(f"/cards/{CARD}").get_json()
+    points = body["history"]["points"]
+    assert 0 < len(points) <= 50
+    assert body["latest"]["time"] == points[-1]["time"]
+
+
+def test_slow_prices_fall_back_to_nulls(app, client, timescale, monkeypatch):
+    def slow(*args):
+        time.sleep(0.5)
+    monkeypatch.setattr(overview, "_price_block", slow)
+    monkeypatch.setitem(app.config, "OVERVIEW_PRICE_TIMEOUT", 0.05)
+    started = time.perf_counter()
+    body = client.get(f"/cards/{CARD}/overview").get_json()
+    assert time.perf_counter() - started < 0.4
+    assert (body["card"]["id"], body["latest"], body["history"]) == (CARD, None, None)
+
+
+def test_failed_prices_fall_back_to_nulls(client, timescale, monkeypatch):
+    def failing(*args):
+        raise RuntimeError("timescale is down")
+    monkeypatch.setattr(overview, "_price_block", failing)
+    body = client.get(f"/cards/{CARD}/overview").get_json()
+    assert (body["card"]["id"], body["latest"], body["history"]) == (CARD, None, None)
+
+
+@pytest.mark.parametrize("query, status", [("", 404), ("?days=0", 400), ("?points=2", 400)])
+def test_errors(client, query, status):
+    card = "no-such-card" if status == 404 else CARD
+    assert client.get(f"/cards/{card}/overview{query}").status_code == status
@@ -0,0 +1,66 @@
+# tests/test_pagination.py
+from datetime import datetime
+import pytest
+from sqlalchemy import select
+from app.models import Card
+from app.pagination import decode_cursor, encode_cursor
+
+
+@pytest.mark.parametrize("page_size", ["0", "-5", "abc", "2.5"])
+def test_invalid_page_size(client, page_size):
+    resp = client.get(f"/cards?page_size={page_size}&count=exact")
+    assert resp.status_code == 400
+
+
+def test_page_size_is_capped(client):
+    body = client.get("/cards?page_size=1000&count=exact").get_json()
+    assert body["page_size"] == 100
+    assert body["total_pages"] == (body["total"] + 99) // 100
+
+
+def _walk(client, query):
+    """Every card id, following next_cursor from the first page."""
+    ids, cursor, pages = [], "", 0
+    while cursor is not None:
+        body = client.get(f"/cards?{query}&fields=id&cursor={cursor}").get_json()
+        ids += [card["id"] for card in body["cards"]]
+        cursor, pages = body["next_cursor"], pages + 1
+    return ids, pages
+
+
+def test_cursor_pages_match_offset_pages(client):
+    ids, pages = _walk(client, "page_size=40")
+    total = client.get("/cards?page_size=1&count=exact").get_json()["total"]
+    offset = [card["id"] for page in range(1, pages + 1)
+              for card in client.get(f"/cards?page={page}&page_size=40&fields=id&count=none").get_json()["cards"]]
+    assert len(ids) == len(set(ids)) == total
+    assert ids == offset
+
+
+@pytest.mark.parametrize("sort, descending", [("price", False), ("-price", True)])
+def test_cursor_sorts_nulls_last(client, db_session, sort, descending):
+    ids, _ = _walk(client, f"sort={sort}&page_size=25")
+    prices = dict(db_session.execute(select(Card.id, Card.marketPrice)).all())
+    priced = [card_id for card_id in ids if prices[card_id] is not None]
+    assert priced and len(priced) < len(ids)
+    # Priced cards first, in price order with id as the tie-breaker, then the NULL block by id
+    assert ids[:len(priced)] == sorted(priced, key=lambda i: (prices[i], i), reverse=descending)
+    assert ids[len(priced):] == sorted(ids[len(priced):], reverse=descending)
+
+
+def test_cursor_round_trip():
+    released = datetime(2023, 3, 31, 12)
+    assert decode_cursor(encode_cursor("releaseDate", released, "sv2-1"), "releaseDate") == (released, "sv2-1")
+    assert decode_cursor(encode_cursor("price", None, "base1-4"), "price") == (None, "base1-4")
+    assert decode_cursor("", "id") is None
+
+
+@pytest.mark.parametrize("cursor", [
+    "not-a-cursor",
+    encode_cursor("id", None, "base1-4"),        # issued for another sort
+    encode_cursor("price", "cheap", "base1-4"),  # value of the wrong type
+])
+def test_bad_cursor(client, cursor):
+    resp = client.get(f"/cards?sort=price&cursor={cursor}")
+    assert resp.status_code == 400
+    assert "cursor" in resp.get_json()["error"].lower()
@@ -0,0 +1,154 @@
+# tests/test_prices.py
+from datetime import datetime, timezone
+import pytest
+from app.downsample import lttb
+from app.prices import MIN_BUCKET_SECONDS, bucket_width_for, newest_price_time
+
+CARD = "s0-60"   # a seeded card with daily price history
+
+
+def test_lttb_keeps_endpoints_and_spikes():
+    xs = list(range(100))
+    ys = [1.0] * 100
+    ys[37], ys[71] = 50.0, -20.0
+    keep = lttb(xs, ys, 10)
+    assert len(keep) == 10
+    assert keep[0] == 0 and keep[-1] == 99
+    assert keep == sorted(keep)
+    assert 37 in keep and 71 in keep
+
+
+def test_lttb_short_series_and_threshold():
+    assert lttb([0, 1, 2], [1, 2, 3], 5) == [0, 1, 2]
+    with pytest.raises(ValueError):
+        lttb(list(range(10)), [0.0] * 10, 2)
+
+
+@pytest.mark.parametrize("from_ts", [
+    datetime(2023, 6, 1, tzinfo=timezone.utc),
+    None,
+])
+def test_bucket_width_for_open_window(db_session, from_ts):
+    newest = newest_price_time(CARD)
+    width, origin = bucket_width_for(CARD, from_ts, None, 10)
+    start = from_ts or origin
+    assert origin == start and origin.tzinfo is not None
+    span = (newest - start).total_seconds()
+    # At most 10 buckets, the newest point inside the last one
+    assert width * 10 > span >= width * 9
+    assert width >= MIN_BUCKET_SECONDS
+
+
+def test_bucket_width_for_without_history(db_session):
+    assert bucket_width_for("no-such-card", None, None, 10) == (MIN_BUCKET_SECONDS, None)
+
+
+@pytest.mark.parametrize("start", ["2023-06-01", "2023-06-01T00:00:00Z", "2023-06-01T02:00:00%2B02:00"])
+def test_bucketed_history_from_without_offset_is_utc(client, start):
+    resp = client.get(f"/cards/{CARD}/price/history?mode=bucket&points=10&from={start}")
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert 0 < body["count"] <= 10
+    first = datetime.fromisoformat(body["history"][0]["time"])
+    assert first == datetime(2023, 6, 1, tzinfo=timezone.utc)
+
+
+def test_price_history_rejects_bad_timestamps(client):
+    resp = client.get(f"/cards/{CARD}/price/history?from=yesterday")
+    assert resp.status_code == 400
+
+
+def test_latest_price_map_picks_up_rows_at_the_watermark(db_session):
+    from app.models import PriceHistory
+    from app.prices import LatestPriceMap
+    prices = LatestPriceMap()
+    prices.refresh()
+    watermark = prices.watermark
+    # A snapshot batch committed after the refresh, with the same time
+    db_session.add(PriceHistory(cardId="test-late-batch", time=watermark, averageSellPrice=1.5, source="test"))
+    db_session.flush()
+    try:
+        prices.refresh()
+        assert prices.prices["test-late-batch"]["averageSellPrice"] == 1.5
+        assert prices.watermark == watermark
+    finally:
+        db_session.rollback()
+
+
+def test_rollup_checks_expire(app, db_session, monkeypatch):
+    from app import prices
+    monkeypatch.setitem(app.config, "TIMESCALE_CHECK_INTERVAL", 60.0)
+    now = [1000.0]
+    monkeypatch.setattr(prices._time, "monotonic", lambda: now[0])
+    prices.reset_rollups()
+    checks = []
+    real = prices._cached_check
+
+    def counted(name, check):
+        return real(name, lambda conn: checks.append(name) or check(conn))
+
+    monkeypatch.setattr(prices, "_cached_check", counted)
+    first = prices.rollups_available()
+    assert prices.rollups_available() == first and checks == ["rollups"]
+    now[0] += 60.0   # e.g. install-price-rollups ran in another process
+    prices.rollups_available()
+    assert checks == ["rollups", "rollups"]
+
+
+@pytest.fixture
+def daily_rollup(app, monkeypatch):
+    """A plain view standing in for the PriceHistoryDaily continuous aggregate."""
+    from sqlalchemy import text
+    from app import prices
+    from app.db import db
+    with app.app_context():
+        if "timescale" not in db.engines:
+            pytest.skip("TIMESCALE_URL is not set")
+        engine = db.engines["timescale"]
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE VIEW "PriceHistoryDaily" AS
+            SELECT "cardId", date_trunc('day', time, 'UTC') AS bucket,
+                   (array_agg("averageSellPrice" ORDER BY time DESC))[1] AS close
+            FROM "PriceHistory" WHERE "averageSellPrice" IS NOT NULL
+            GROUP BY 1, 2
+        """))
+    monkeypatch.setattr(prices, "daily_rollup", lambda: "PriceHistoryDaily")
+    yield
+    with engine.begin() as conn:
+        conn.execute(text('DROP VIEW "PriceHistoryDaily"'))
+
+
+WINDOW = "from=2023-03-01&to=2023-09-01"
+
+
+def test_long_default_reads_use_daily_closes(app, client, daily_rollup, monkeypatch):
+    monkeypatch.setitem(app.config, "PRICE_HISTORY_RAW_DAYS", 30.0)
+    body = client.get(f"/cards/{CARD}/price/history?{WINDOW}").get_json()
+    raw = client.get(f"/cards/{CARD}/price/history?{WINDOW}&limit=1000").get_json()
+    assert body["resolutionSeconds"] == 86400 and "resolutionSeconds" not in raw
+    assert body["count"] == 184
+    assert {e["source"] for e in body["history"]} == {"daily"}
+    # The seed has one point per day, so each close is that day's raw price
+    assert ([(e["time"][:10], e["averageSellPrice"]) for e in body["history"]]
+            == [(e["time"][:10], e["averageSellPrice"]) for e in raw["history"]])
+
+    desc = client.get(f"/cards/{CARD}/price/history?{WINDOW}&order=desc").get_json()
+    assert desc["history"] == body["history"][::-1]
+
+
+def test_short_or_unlimited_default_reads_stay_raw(app, client, daily_rollup, monkeypatch):
+    monkeypatch.setitem(app.config, "PRICE_HISTORY_RAW_DAYS", 365.0)
+    assert "resolutionSeconds" not in client.get(f"/cards/{CARD}/price/history?{WINDOW}").get_json()
+    monkeypatch.setitem(app.config, "PRICE_HISTORY_RAW_DAYS", 0.0)
+    assert "resolutionSeconds" not in client.get(f"/cards/{CARD}/price/history?from=2023-01-01").get_json()
+
+
+def test_long_range_lttb_thins_daily_closes(client, daily_rollup):
+    body = client.get(f"/cards/{CARD}/price/history?{WINDOW}&points=20").get_json()
+    assert body["count"] == 20
+    assert {e["source"] for e in body["history"]} == {"daily"}
+    assert body["history"][0]["time"].startswith("2023-03-01T00:00:00")
+    # Fewer days than points: every raw point is a candidate
+    body = client.get(f"/cards/{CARD}/price/history?from=2023-03-01&to=2023-03-11&points=20").get_json()
+    assert body["count"] == 10 and "daily" not in {e["source"] for e in body["history"]}
@@ -0,0 +1,88 @@
+# tests/test_replicas.py
+from types import SimpleNamespace
+import pytest
+from flask import Flask, current_app
+from app import replicas
+from app.replicas import Replica, ReplicaRouter
+
+VERSION = "2024-01-01 00:00:00"
+
+
+class StubReplica(Replica):
+    """A replica whose health check reports canned results instead of connecting."""
+
+    def __init__(self, bind, up=True, lag=0.0, version=VERSION, connections=0):
+        super().__init__(bind)
+        self.state = (up, lag, version)
+        self.checks = 0
+        self.stub_engine = SimpleNamespace(name=bind, pool=SimpleNamespace(checkedout=lambda: connections))
+
+    @property
+    def engine(self):
+        return self.stub_engine
+
+    def check(self):
+        self.checks += 1
+        self.up, self.lag, self.version = self.state
+        self.checked_at = replicas.time.monotonic()
+
+
+@pytest.fixture
+def router(monkeypatch):
+    monkeypatch.setattr(replicas, "catalog_version", lambda: VERSION)
+    app = Flask(__name__)
+    app.config.update(REPLICA_CHECK_INTERVAL=60.0, REPLICA_MAX_LAG=30.0)
+    with app.app_context():
+        yield ReplicaRouter()
+
+
+def _chosen(router, n=4):
+    return [getattr(router.choose(), "name", None) for _ in range(n)]
+
+
+def test_no_replicas_reads_the_primary(router):
+    assert router.choose() is None
+
+
+def test_round_robin_over_usable_replicas(router):
+    router.replicas = [StubReplica("replica1"), StubReplica("replica2")]
+    assert _chosen(router) == ["replica1", "replica2", "replica1", "replica2"]
+
+
+@pytest.mark.parametrize("unusable", [
+    {"up": False},
+    {"lag": 120.0},
+    {"version": "2023-12-01 00:00:00"},   # hasn't replayed the latest import
+])
+def test_unusable_replicas_are_skipped(router, unusable):
+    router.replicas = [StubReplica("replica1", **unusable), StubReplica("replica2")]
+    assert _chosen(router) == ["replica2"] * 4
+
+
+def test_falls_back_to_the_primary(router):
+    router.replicas = [StubReplica("replica1", up=False), StubReplica("replica2", lag=120.0)]
+    assert router.choose() is None
+
+
+def test_lag_limit_off(router):
+    current_app.config["REPLICA_MAX_LAG"] = 0
+    router.replicas = [StubReplica("replica1", lag=3600.0)]
+    assert _chosen(router, 1) == ["replica1"]
+
+
+def test_least_connections(router):
+    current_app.config["REPLICA_BALANCE"] = "least_connections"
+    router.replicas = [StubReplica("replica1", connections=3), StubReplica("replica2", connections=1)]
+    assert _chosen(router, 2) == ["replica2", "replica2"]
+
+
+def test_checks_are_rate_limited_and_mark_down_sticks(router):
+    replica = StubReplica("replica1")
+    router.replicas = [replica]
+    assert _chosen(router, 3) == ["replica1"] * 3
+    assert replica.checks == 1
+    replica.mark_down(Exception("connection reset"))
+    assert router.choose() is None
+    replica.checked_at -= 61.0   # the check interval has passed
+    assert _chosen(router, 1) == ["replica1"]
+    assert replica.checks == 2
@@ -0,0 +1,110 @@
+# tests/test_responsecache.py
+import importlib.util
+import pytest
+from flask import Flask
+from werkzeug.datastructures import MultiDict
+from app import responsecache
+from app.responsecache import MemoryBackend, RedisBackend, canonical_query, response_cache
+
+
+class FakeRedis:
+    """The part of the redis client the backend uses, in a dict."""
+
+    def __init__(self, fail=False):
+        self.data = {}
+        self.expiry = {}
+        self.fail = fail
+
+    def get(self, key):
+        if self.fail:
+            raise ConnectionError("redis is down")
+        return self.data.get(key)
+
+    def set(self, key, value, px):
+        if self.fail:
+            raise ConnectionError("redis is down")
+        self.data[key], self.expiry[key] = value, px
+
+    def scan_iter(self, match):
+        return [k for k in list(self.data) if k.startswith(match.rstrip("*"))]
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+
+def test_canonical_query():
+    a = canonical_query(MultiDict([("page_size", "05"), ("hp_gte", "100"), ("types", "Fire")]))
+    b = canonical_query(MultiDict([("types", "Fire"), ("hp_gte", "100.0"), ("page_size", "5")]))
+    assert a == b == "hp_gte=100.0&page_size=5&types=Fire"
+
+
+def test_memory_backend_lru_and_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(responsecache.time, "monotonic", lambda: now[0])
+    cache = MemoryBackend(max_entries=2, ttl=10)
+    cache.set("a", b"1")
+    cache.set("b", b"2")
+    assert cache.get("a") == b"1"        # a is now the most recently used
+    cache.set("c", b"3")
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (b"1", None, b"3")
+    now[0] += 10
+    assert cache.get("a") is None
+
+
+def test_redis_backend():
+    client = FakeRedis()
+    cache = RedisBackend(client, ttl=1.5)
+    cache.set("k", b"body")
+    assert client.expiry["cards-cache:k"] == 1500
+    assert cache.get("k") == b"body"
+    client.data["other:k"] = b"kept"
+    cache.clear()
+    assert list(client.data) == ["other:k"]
+
+
+def test_redis_errors_are_misses():
+    app = Flask(__name__)
+    cache = RedisBackend(FakeRedis(fail=True), ttl=1)
+    with app.app_context():
+        cache.set("k", b"body")
+        assert cache.get("k") is None
+
+
+def _configured(**config):
+    app = Flask(__name__)
+    app.config.update(config)
+    responsecache.init_app(app)
+    return response_cache.backend
+
+
+def test_backends_are_opt_in():
+    try:
+        assert _configured() is None
+        assert isinstance(_configured(RESPONSE_CACHE_BACKEND="memory"), MemoryBackend)
+        with pytest.raises(RuntimeError, match="REDIS_URL"):
+            _configured(RESPONSE_CACHE_BACKEND="redis")
+        with pytest.raises(RuntimeError, match="Unknown"):
+            _configured(RESPONSE_CACHE_BACKEND="memcached")
+    finally:
+        response_cache.configure(None)
+
+
+@pytest.mark.skipif(importlib.util.find_spec("redis") is not None, reason="redis is installed")
+def test_redis_backend_needs_the_package():
+    with pytest.raises(RuntimeError, match="pip install redis"):
+        _configured(RESPONSE_CACHE_BACKEND="redis", RESPONSE_CACHE_REDIS_URL="redis://localhost")
+    response_cache.configure(None)
+
+
+def test_cached_listing(client):
+    response_cache.configure(MemoryBackend(16, 60))
+    try:
+        first = client.get("/cards?page_size=3&types=Fire")
+        second = client.get("/cards?types=Fire&page_size=03")
+        assert (first.headers["X-Cache"], second.headers["X-Cache"]) == ("MISS", "HIT")
+        assert first.get_data() == second.get_data()
+        # Errors are not stored
+        client.get("/cards?page_size=abc")
+        assert client.get("/cards?page_size=abc").headers["X-Cache"] == "MISS"
+    finally:
+        response_cache.configure(None)
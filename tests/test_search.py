@@ -0,0 +1,46 @@
+# tests/test_search.py
+from datetime import datetime
+from app.search import SearchIndex, _build, tokenize
+
+
+def test_tokenize_folds_case_and_accents():
+    assert tokenize("Pokémon Trainer's-Kit") == ["pokemon", "trainer", "s", "kit"]
+
+
+def test_exact_prefix_and_fuzzy_matches():
+    index = SearchIndex()
+    index.add("a", "Pikachu", "Atsuko Nishida", "Base")
+    index.add("b", "Pikachu V", "Ryuta Fuse", "Vivid Voltage")
+    index.add("c", "Raichu", "Ken Sugimori", "Base")
+    index.finish()
+    assert [r["id"] for r in index.search("pikachu")] == ["a", "b"]
+    assert [r["id"] for r in index.search("pika")] == ["a", "b"]
+    assert [r["id"] for r in index.search("pikachi")] == ["a", "b"]
+    assert sorted(r["id"] for r in index.search("base", fields=("set",))) == ["a", "c"]
+    assert index.search("pikachu raichu") == []
+
+
+def test_update_replaces_postings():
+    index = SearchIndex()
+    index.add("a", "Pikachu", None, None)
+    index.add("a", "Raichu", None, None)
+    index.finish()
+    assert index.search("pikachu") == []
+    assert [r["id"] for r in index.search("raichu")] == ["a"]
+
+
+def test_incremental_build_drops_deleted_cards(db_session):
+    from app.models import Card
+    previous = _build(None)
+    # A card that has since been deleted, and one added with an updatedAt
+    # older than the watermark: the count alone would still match
+    previous.add("test-deleted", "Zzyzx Deleted", None, None)
+    previous.finish()
+    db_session.add(Card(id="test-added", name="Zzyzx Added", number="1", updatedAt=datetime(2000, 1, 1)))
+    db_session.flush()
+    try:
+        index = _build(previous)
+        assert "test-deleted" not in index.doc_of
+        assert [r["id"] for r in index.search("zzyzx")] == ["test-added"]
+    finally:
+        db_session.rollback()
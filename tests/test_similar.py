@@ -0,0 +1,70 @@
+# tests/test_similar.py
+import numpy as np
+import pytest
+from app.similar import BLOCKS, ENERGY_BINS, HP_BINS, RETREAT_BINS, SimilarityIndex, _block, _build, parse_blocks
+
+IDS = ["a", "b", "c", "d", "e"]
+NAMES = np.array(["Pikachu", "Raichu", "Charmander", "Potion", "Pikachu"], dtype=object)
+
+
+def _index():
+    """a: Lightning, 60 HP; b: Lightning, 120 HP; c: Fire, 60 HP; d: no features;
+    e: a reprint of a."""
+    types = np.array([[1, 0], [1, 0], [0, 1], [0, 0], [1, 0]], dtype=np.float64)
+    stats = np.array([[1, 0], [0, 1], [1, 0], [0, 0], [1, 0]], dtype=np.float64)
+    blocks = {name: np.zeros((len(IDS), 0)) for name in BLOCKS if name != "evolution"}
+    blocks.update(types=_block(types, 1.0), stats=_block(stats, 1.0))
+    line = np.array([0, 0, -1, -1, 0], dtype=np.int32)   # Pikachu evolves into Raichu
+    return SimilarityIndex(IDS, NAMES, blocks, line)
+
+
+def test_ranking_skips_reprints_and_featureless_cards():
+    result = _index().similar("a")
+    assert [r["id"] for r in result] == ["b", "c"]
+    # a has types, stats and an evolution line. b matches on types and the line (2 of 3);
+    # c has no line, matches on stats only: 1 / sqrt(3 x 2)
+    assert result[0]["score"] == pytest.approx(2 / 3, abs=1e-4)
+    assert result[1]["score"] == pytest.approx(1 / 6 ** 0.5, abs=1e-4)
+
+
+def test_reprints():
+    result = _index().similar("a", reprints=True)
+    assert result[0] == {"id": "e", "name": "Pikachu", "score": 1.0}
+    assert "a" not in [r["id"] for r in result]
+
+
+def test_block_subset():
+    index = _index()
+    assert [r["id"] for r in index.similar("a", blocks=("stats",))] == ["c"]
+    assert [r["id"] for r in index.similar("a", blocks=("types",))] == ["b"]
+    assert index.similar("a", blocks=("types",))[0]["score"] == 1.0
+
+
+def test_limit_and_unknown_card():
+    index = _index()
+    assert [r["id"] for r in index.similar("a", limit=1)] == ["b"]
+    assert index.similar("zz") is None
+
+
+def test_parse_blocks():
+    assert parse_blocks(None) == BLOCKS
+    assert parse_blocks("types,stats") == ("types", "stats")
+    with pytest.raises(ValueError):
+        parse_blocks("types,colour")
+
+
+def test_zero_energy_cost_is_a_feature(db_session):
+    from app.models import Attack, Card
+    db_session.add(Card(id="test-free", name="Test Free Attacker", number="1"))
+    db_session.add(Attack(id="test-free-at0", cardId="test-free", cost=[], convertedEnergyCost=0))
+    db_session.flush()
+    try:
+        index = _build(None)
+        row = index.row_of["test-free"]
+        stats = index.matrix[row, index.columns["stats"]]
+        hp_bins, retreat_bins = (len(np.arange(b[0], b[1] + b[2] / 2, b[2])) for b in (HP_BINS, RETREAT_BINS))
+        energy = stats[hp_bins + retreat_bins:]
+        assert len(energy) == len(np.arange(ENERGY_BINS[0], ENERGY_BINS[1] + 0.5, ENERGY_BINS[2]))
+        assert energy.argmax() == 0 and energy[0] > 0
+    finally:
+        db_session.rollback()
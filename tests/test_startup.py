@@ -0,0 +1,82 @@
+# tests/test_startup.py
+import os
+from app import startup
+from app.db import db
+
+
+def test_create_app_does_not_register_fork_handlers(app, monkeypatch):
+    registered = []
+    monkeypatch.setattr(os, "register_at_fork", lambda **hooks: registered.append(hooks))
+    from app import create_app
+    create_app()
+    assert registered == []
+
+
+def test_forked_child_drops_pools_without_prewarming(app, monkeypatch):
+    monkeypatch.setitem(app.config, "POOL_PREWARM", 1)
+    warmed = []
+    monkeypatch.setattr(startup, "warm_pools", lambda *args: warmed.append(args))
+    with app.app_context():
+        pool = db.engine.pool
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:   # child
+        try:
+            with app.app_context():
+                replaced = db.engine.pool is not pool
+            os.write(write, b"%d %d" % (replaced, len(warmed)))
+        finally:
+            os._exit(0)
+    os.close(write)
+    os.waitpid(pid, 0)
+    with os.fdopen(read, "rb") as f:
+        assert f.read() == b"1 0"
+
+
+def test_forking_keeps_the_parents_pools(app):
+    with app.app_context():
+        pool = db.engine.pool
+    pid = os.fork()
+    if pid == 0:   # child
+        os._exit(0)
+    os.waitpid(pid, 0)
+    with app.app_context():
+        assert db.engine.pool is pool
+
+
+def test_pre_fork_closes_the_masters_pools(app):
+    with app.app_context():
+        pool = db.engine.pool
+    startup.pre_fork(None, None)
+    with app.app_context():
+        assert db.engine.pool is not pool
+
+
+def test_post_fork_prewarms_configured_apps(app, monkeypatch):
+    warmed = []
+    monkeypatch.setattr(startup, "warm_pools", lambda app, n: warmed.append((app, n)))
+    monkeypatch.setitem(app.config, "POOL_PREWARM", 0)
+    startup.post_fork(None, None)
+    assert app not in [a for a, _ in warmed]
+    monkeypatch.setitem(app.config, "POOL_PREWARM", 3)
+    startup.post_fork(None, None)
+    assert (app, 3) in warmed
+
+
+def test_warm_caches_budget_and_failures(app, monkeypatch, caplog):
+    ran = []
+
+    def failing(app):
+        ran.append("failing")
+        raise RuntimeError("no network")
+
+    def slow(app):
+        ran.append("slow")
+        startup.time.sleep(0.02)
+
+    monkeypatch.setattr(startup, "WARMERS", (("failing", failing), ("slow", slow), ("skipped", ran.append)))
+    startup.warm_caches(app, budget=0.01)
+    assert ran == ["failing", "slow"]
+    assert "failing failed: no network" in caplog.text
+    assert "skipping skipped" in caplog.text
+    assert {"failing", "slow"} <= set(startup.registry.startup)
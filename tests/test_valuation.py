@@ -0,0 +1,109 @@
+# tests/test_valuation.py
+from datetime import datetime, timedelta, timezone
+import numpy as np
+import pytest
+from sqlalchemy import text
+from app import valuation
+from app.db import db
+from app.valuation import DAY, _COPY_ROW, collection_value, fetch_points, price_grid, value_window
+
+NOW = datetime(2024, 1, 3, 12, tzinfo=timezone.utc)   # 3-day window: Jan 1 to Jan 4
+
+
+def _rows(points):
+    rows = np.zeros(len(points), dtype=_COPY_ROW)
+    for i, (idx, offset, price) in enumerate(points):
+        rows[i]["idx"], rows[i]["offset"], rows[i]["price"] = idx, offset, price
+    return rows
+
+
+# a: 10 before the window, two points on day 0 (12 closes it), 15 on day 2
+# b: first priced on day 1; c: never priced
+POINTS = [(0, -1, 10.0), (0, 7200, 12.0), (0, 3600, 11.0), (0, 2 * DAY + 5, 15.0), (1, DAY, 4.0)]
+
+
+def test_value_window():
+    assert value_window(3, NOW) == (datetime(2024, 1, 1, tzinfo=timezone.utc),
+                                     datetime(2024, 1, 4, tzinfo=timezone.utc))
+
+
+def test_price_grid_closes_and_carries_forward():
+    grid = price_grid(_rows(POINTS), 3, 3)
+    np.testing.assert_array_equal(grid[0], [10, 12, 12, 15])
+    np.testing.assert_array_equal(grid[1], [np.nan, np.nan, 4, 4])
+    assert np.isnan(grid[2]).all()
+
+
+def test_collection_value(monkeypatch):
+    monkeypatch.setattr(valuation, "fetch_points", lambda card_ids, start, end: _rows(POINTS))
+    result = collection_value({"a": 2, "b": 1, "c": 1}, days=3, movers=2, now=NOW)
+    assert (result["cards"], result["quantity"], result["pricedCards"]) == (3, 4, 2)
+    assert [(p["value"], p["change"]) for p in result["series"]] == [(24, 4), (28, 4), (34, 6)]
+    assert result["series"][0]["time"] == "2024-01-01T00:00:00+00:00"
+    assert (result["value"], result["change"], result["changePct"]) == (34, 6, 21.43)
+    assert result["gainers"] == [{"cardId": "a", "quantity": 2, "startPrice": 12.0, "endPrice": 15.0,
+                                  "change": 6.0, "changePct": 25.0}]
+    assert result["losers"] == []
+
+
+def test_empty_collection():
+    result = collection_value({}, days=3, now=NOW)
+    assert result["value"] == 0 and len(result["series"]) == 3
+
+
+@pytest.mark.parametrize("card_ids", [["s0-60"], ["s0-60", "s2-20", "no-such-card"]])
+def test_fetch_points_reads_the_binary_copy(db_session, card_ids):
+    start, end = datetime(2023, 2, 1, tzinfo=timezone.utc), datetime(2023, 2, 8, tzinfo=timezone.utc)
+    rows = fetch_points(card_ids, start, end)
+    expected = []
+    with db.engines["timescale"].connect() as conn:
+        for idx, card_id in enumerate(card_ids):
+            points = conn.execute(text(
+                'SELECT extract(epoch FROM time - :start)::int, "averageSellPrice" FROM "PriceHistory" '
+                'WHERE "cardId" = :id AND time < :end AND "averageSellPrice" IS NOT NULL ORDER BY time'
+            ), {"id": card_id, "start": start, "end": end}).all()
+            before = [price for offset, price in points if offset < 0][-1:]
+            expected += [(idx, -1, price) for price in before]
+            expected += [(idx, offset, price) for offset, price in points if offset >= 0]
+    got = [(int(r["idx"]), int(r["offset"]), float(r["price"])) for r in rows]
+    assert got and sorted(got) == sorted(expected)
+
+
+@pytest.fixture
+def closes(app, db_session, monkeypatch):
+    monkeypatch.setitem(app.config, "VALUATION_CACHE_DAYS", 90)
+    monkeypatch.setitem(app.config, "VALUATION_CACHE_REFRESH", 300.0)
+    closes = valuation.DailyCloses()
+    yield closes
+    closes.clear()
+
+
+HOLDINGS = {"s0-60": 2, "s2-20": 1, "s1-250": 3, "no-such-card": 1}
+MIDYEAR = datetime(2023, 6, 15, 12, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize("days", [1, 30, 90])
+def test_cached_closes_match_the_database(closes, days):
+    cached = collection_value(HOLDINGS, days=days, now=MIDYEAR, closes=closes)
+    assert cached == collection_value(HOLDINGS, days=days, now=MIDYEAR)
+    assert closes.state is not None and closes.state.days == 90
+    assert 0 < len(closes.state.index) < len(closes.state.card_ids)
+
+
+def test_longer_windows_read_the_database(closes):
+    assert closes.lookup(list(HOLDINGS), 91, MIDYEAR) is None
+    assert closes.state is None
+
+
+def test_refresh_rereads_only_today(closes, monkeypatch):
+    closes.lookup(list(HOLDINGS), 30, MIDYEAR)
+    built = closes.state
+    reads = []
+    real = valuation.fetch_points
+    monkeypatch.setattr(valuation, "fetch_points", lambda *args: reads.append(args[1:]) or real(*args))
+    monkeypatch.setattr(valuation.time, "monotonic", lambda: built.refreshed_at + 301)
+    grid = closes.lookup(list(HOLDINGS), 30, MIDYEAR)
+    assert reads == [(built.end - timedelta(days=1), built.end)]
+    assert closes.state.history is built.history
+    np.testing.assert_array_equal(closes.state.today, built.today)
+    assert grid.shape == (4, 31) and np.isnan(grid[3]).all()